@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Throughput benchmarks of the simulator hot paths.
+
+Measures steps per second and peak memory of the integrators, the random
+force generation and the output writer, and saves them as JSON. Comparing
+with an earlier result file flags the cases that got slower::
+
+    python benchmarks/run_benchmarks.py -o before.json
+    python benchmarks/run_benchmarks.py -o after.json -c before.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import lds
+import lds.langevin_dynamics_simulator as simulator
+from lds.ensemble import ensemble_integrator
+from lds.kernels import BACKENDS, resolve_backend
+from lds.noise import NoiseSource
+
+# walls far away so that every run lasts the whole simulation
+WALL = 1e12
+
+
+def parse_args(args):
+    """
+    An parsing argument function for the benchmark runner.
+
+    Args:
+        args: Unparsed argument variable.
+
+    Returns:
+        vars: a dict containing parsed arguments
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', type=str, default='benchmarks.json', \
+    help='JSON file receiving the results, default to benchmarks.json')
+    parser.add_argument('-c', '--compare', type=str, default=None, \
+    help='JSON file of an earlier run to compare with')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.2, \
+    help='Relative slowdown reported as a regression, default to 0.2')
+    parser.add_argument('-r', '--repeat', type=int, default=3, \
+    help='Repetitions of each case, the fastest one is kept, default to 3')
+    parser.add_argument('-q', '--quick', action='store_true', \
+    help='Run smaller cases only')
+    return vars(parser.parse_args(args))
+
+
+def measure(function, steps, repeat):
+    """
+    Time a benchmark case.
+
+    Args:
+        function: a callable running the case once.
+        steps: the number of steps (or samples, or lines) of one call.
+        repeat: how many times to run the case.
+
+    Returns:
+        result: a dict with the best wall time, steps per second and the
+        peak memory traced during one call.
+    """
+    function() # warm up, e.g. compile numba kernels
+    best = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': best, 'steps_per_second': steps / best, 'peak_bytes': peak}
+
+
+def cases(quick):
+    """
+    Enumerate the benchmark cases.
+
+    Args:
+        quick: only yield the smaller cases.
+
+    Yields:
+        name: a unique name of the case.
+        parameters: a dict describing the case.
+        steps: the amount of work of one call.
+        function: a callable running the case once.
+    """
+    lengths = (10 ** 4, 10 ** 5) if quick else (10 ** 4, 10 ** 5, 10 ** 6)
+    time_steps = (0.1, 0.001)
+    backends = [b for b in BACKENDS if resolve_backend(b) == b]
+
+    for backend in backends:
+        for steps in lengths:
+            if backend == 'python' and steps > 10 ** 5:
+                continue
+            for time_step in time_steps:
+                def run(backend=backend, steps=steps, time_step=time_step):
+                    simulator.euler_trajectory(0.1, 0, steps * time_step, time_step, 1, \
+                        WALL / 2, WALL, noise=NoiseSource(1, 0.1, seed=0), backend=backend)
+                yield 'euler_trajectory[{0},{1},{2}]'.format(backend, steps, time_step), \
+                    {'backend': backend, 'steps': steps, 'time_step': time_step}, steps, run
+
+        steps = 10 ** 4 if quick else 10 ** 5
+        def run_list(backend=backend, steps=steps):
+            simulator.euler_integrator(0.1, 0, steps * 0.1, 0.1, 1, WALL / 2, WALL, \
+                noise=NoiseSource(1, 0.1, seed=0), backend=backend)
+        yield 'euler_integrator[{0},{1}]'.format(backend, steps), \
+            {'backend': backend, 'steps': steps}, steps, run_list
+
+        sizes = (10 ** 2, 10 ** 4) if quick else (10 ** 2, 10 ** 4, 10 ** 5)
+        for particles in sizes:
+            if backend == 'python' and particles > 10 ** 3:
+                continue
+            ensemble_steps = 1000
+            def run_ensemble(backend=backend, particles=particles):
+                ensemble_integrator(0.1, 0, ensemble_steps * 0.1, 0.1, 1, WALL / 2, WALL, \
+                    particles, noise=NoiseSource(1, 0.1, seed=0), backend=backend)
+            yield 'ensemble_integrator[{0},{1}]'.format(backend, particles), \
+                {'backend': backend, 'particles': particles, 'steps': ensemble_steps}, \
+                particles * ensemble_steps, run_ensemble
+
+    samples = 10 ** 4 if quick else 10 ** 5
+    def run_random_force():
+        for i in range(samples):
+            simulator.random_force(1, 0.1)
+    yield 'random_force[{0}]'.format(samples), {'samples': samples}, samples, run_random_force
+
+    def run_noise_source():
+        noise = NoiseSource(1, 0.1, seed=0)
+        for i in range(samples):
+            noise.draw()
+    yield 'NoiseSource.draw[{0}]'.format(samples), {'samples': samples}, samples, \
+        run_noise_source
+
+    for steps in lengths[:2]:
+        trajectory = simulator.euler_trajectory(0.1, 0, steps * 0.1, 0.1, 1, WALL / 2, \
+                                                WALL, noise=NoiseSource(1, 0.1, seed=0))
+        def run_output(trajectory=trajectory):
+            simulator.output_file(trajectory, io.StringIO())
+        yield 'output_file[{0}]'.format(steps), {'lines': steps + 1}, steps + 1, run_output
+
+
+def compare(results, previous, tolerance):
+    """
+    Find the cases that got slower than in an earlier run.
+
+    Args:
+        results: the current benchmark results.
+        previous: earlier benchmark results.
+        tolerance: the relative slowdown that is tolerated.
+
+    Returns:
+        regressions: a list of (name, ratio) with the throughput ratio of
+        current over earlier runs, for cases below ``1 - tolerance``.
+    """
+    regressions = list()
+    for name, result in results['cases'].items():
+        if name not in previous['cases']:
+            continue
+        ratio = result['steps_per_second'] / previous['cases'][name]['steps_per_second']
+        if ratio < 1 - tolerance:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(args):
+    results = {
+        'version': lds.__version__,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases': dict(),
+    }
+    for name, parameters, steps, function in cases(args['quick']):
+        result = measure(function, steps, args['repeat'])
+        result.update(parameters)
+        results['cases'][name] = result
+        print('{0:<45} {1:>14.0f} steps/s {2:>10.1f} MiB'.format( \
+              name, result['steps_per_second'], result['peak_bytes'] / 2 ** 20))
+
+    with open(args['output'], 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    print('results saved to {0}'.format(args['output']))
+
+    if args['compare'] is not None:
+        with open(args['compare']) as file:
+            regressions = compare(results, json.load(file), args['tolerance'])
+        for name, ratio in regressions:
+            print('REGRESSION {0}: {1:.2f}x the earlier throughput'.format(name, ratio))
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Correctness and throughput regression runs of the integrators.
+
+Runs every backend and path of the simulator with fixed seeds, checks the
+results against the reference statistics of ``lds.validation`` and times
+them, and saves both as JSON. Comparing with an earlier result file flags
+the cases that got slower as well, so a change is only accepted when it
+keeps every check and the speed::
+
+    python benchmarks/run_regression.py -o before.json
+    python benchmarks/run_regression.py -o after.json -c before.json
+
+The exit status is 1 when a check fails or a case got slower.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import lds
+from lds.validation import CHECKED_SCHEMES, cases, run_case
+from run_benchmarks import compare
+
+
+def parse_args(args):
+    """
+    An parsing argument function for the regression runner.
+
+    Args:
+        args: Unparsed argument variable.
+
+    Returns:
+        vars: a dict containing parsed arguments
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', type=str, default='regression.json', \
+    help='JSON file receiving the results, default to regression.json')
+    parser.add_argument('-c', '--compare', type=str, default=None, \
+    help='JSON file of an earlier run to compare the throughput with')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.2, \
+    help='Relative slowdown reported as a regression, default to 0.2')
+    parser.add_argument('-b', '--backend', type=str, action='append', default=None, \
+    help='Backend to run, may be repeated, default to every available backend')
+    parser.add_argument('-i', '--integrator', type=str, action='append', default=None, \
+    choices=CHECKED_SCHEMES, help='Integration scheme to run, may be repeated, '\
+    'default to all of them')
+    parser.add_argument('-r', '--repeat', type=int, default=3, \
+    help='Repetitions of each case, the fastest one is kept, default to 3')
+    parser.add_argument('-q', '--quick', action='store_true', \
+    help='Run a tenth of the runs and steps, with wider tolerances')
+    return vars(parser.parse_args(args))
+
+
+def main(args):
+    results = {
+        'version': lds.__version__,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases': dict(),
+    }
+    schemes = args['integrator'] or CHECKED_SCHEMES
+    failures = list()
+    for name, parameters, function in cases(args['backend'], schemes, \
+                                            0.1 if args['quick'] else 1.0):
+        result = run_case(function, parameters, args['repeat'])
+        results['cases'][name] = result
+        for c in result['checks']:
+            if not c['passed']:
+                failures.append((name, c))
+        print('{0:<30} {1:>14.0f} steps/s {2}'.format(name, result['steps_per_second'], \
+              '  '.join('{0} {1:.4g} ({2:.4g} +- {3:.2g}) {4}'.format(c['statistic'], \
+              c['value'], c['reference'], c['tolerance'], 'ok' if c['passed'] else 'FAIL') \
+              for c in result['checks'])))
+
+    with open(args['output'], 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    print('results saved to {0}'.format(args['output']))
+
+    for name, c in failures:
+        print('FAILED {0}: {1} is {2:.6g}, expected {3:.6g} +- {4:.2g}'.format( \
+              name, c['statistic'], c['value'], c['reference'], c['tolerance']))
+    regressions = list()
+    if args['compare'] is not None:
+        with open(args['compare']) as file:
+            regressions = compare(results, json.load(file), args['tolerance'])
+        for name, ratio in regressions:
+            print('REGRESSION {0}: {1:.2f}x the earlier throughput'.format(name, ratio))
+    return 1 if failures or regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -6,4 +6,27 @@ __author__ = """Chenxiao Guan"""
 __email__ = 'cguan3@u.rochester.edu'
 __version__ = '0.1.0'
 
-from lds import langevin_dynamics_simulator
\ No newline at end of file
+from lds import langevin_dynamics_simulator
+from lds import noise
+from lds import potentials
+from lds import trajectory
+from lds import schemes
+from lds import kernels
+from lds import storage
+from lds import textio
+from lds import decimate
+from lds import ensemble
+from lds import adaptive
+from lds import first_passage
+from lds import weighted_ensemble
+from lds import system
+from lds import observers
+from lds import profiling
+from lds import cache
+
+__all__ = [
+    'langevin_dynamics_simulator', 'noise', 'potentials', 'trajectory',
+    'schemes', 'kernels', 'storage', 'textio', 'decimate', 'ensemble',
+    'adaptive', 'first_passage', 'weighted_ensemble', 'system', 'observers',
+    'profiling', 'cache'
+]
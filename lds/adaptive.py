@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive time steps for first-passage runs.
+
+Far from the walls, a particle cannot reach them within a step, so it can
+take steps of up to ``max_time_step``. Closer to a wall, the step is halved
+until the mean displacement plus ``safety`` standard deviations of the
+position fits within the distance to the wall, down to ``time_step``. Every
+step is a multiple of ``time_step``, so exit times fall on the same grid as
+a fixed-step run.
+
+Steps use the exact Ornstein-Uhlenbeck update of the ``'ou'`` scheme,
+which is exact at any time step between the walls. What a large step can
+miss is a crossing of a wall and a return within the step. Its probability
+is estimated with the Brownian bridge of the position between both ends of
+the step::
+
+    p = exp(-2 d0 d1 / s2)
+
+with ``d0`` and ``d1`` the distances to the wall before and after the step
+and ``s2`` the variance of the position over the step. The bridge is exact
+in the diffusive limit ``damping_coefficient * dt >> 1``, and the crossing
+probability vanishes for the small, nearly ballistic steps taken near the
+walls.
+"""
+
+import numpy as np
+
+from lds import profiling
+from lds.noise import NoiseSource
+from lds.schemes import scheme_coefficients
+
+# standard normal numbers per particle and step, two for the OU update and
+# two for the bridge, whose squares give an exponential number
+NOISE_WIDTH = 4
+
+
+def step_levels(damping_coefficient, time_step, max_time_step, temperature, \
+                kB=1, dirac_delta=1):
+    """
+    Coefficients of the OU update at each allowed step size.
+
+    Level k steps ``2 ** k`` times ``time_step``, up to the largest power of
+    two not above ``max_time_step``.
+
+    Args:
+        damping_coefficient: the damping coefficient of the system.
+        time_step: the smallest time step, taken next to the walls.
+        max_time_step: the largest time step, taken in the bulk.
+        temperature: the temperature of the system.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+
+    Returns:
+        levels: a dict of arrays indexed by level, ``ticks`` (the step in
+        units of ``time_step``), ``a``, ``c``, ``d``, ``g``, ``h`` (see
+        ``lds.kernels.linear_chunk_python``) and ``variance`` (of the
+        position over the step).
+    """
+    if max_time_step < time_step:
+        raise ValueError('The max time step {0} is below the time step {1}'\
+                         .format(max_time_step, time_step))
+    count = int(np.floor(np.log2(max_time_step / time_step) + 1e-9)) + 1
+    ticks = 2 ** np.arange(count)
+    rows = [scheme_coefficients('ou', damping_coefficient, 0.0, tick * time_step, \
+                                temperature, kB, dirac_delta) for tick in ticks]
+    a, c, d, _, g, h = (np.array(column) for column in zip(*rows))
+    return {'ticks': ticks, 'a': a, 'c': c, 'd': d, 'g': g, 'h': h, \
+            'variance': g ** 2 + h ** 2}
+
+
+def choose_levels(velocity, position, remaining, wall, levels, safety=4.0):
+    """
+    Pick the largest step of each particle which cannot reach a wall.
+
+    Args:
+        velocity: an array with the velocity of each particle.
+        position: an array with the position of each particle.
+        remaining: an array with the number of ``time_step`` left in the run
+        of each particle.
+        wall: the wall boundary for the system.
+        levels: the step levels, see ``step_levels``.
+        safety: the number of standard deviations of the position kept away
+        from the walls. Default to 4.
+
+    Returns:
+        level: an integer array with the level of each particle.
+    """
+    distance = np.minimum(position, wall - position)
+    reach = np.abs(velocity)[:, None] * levels['d'][1:] \
+        + safety * np.sqrt(levels['variance'][1:])
+    # both conditions only get stricter at larger steps
+    fits = (reach <= distance[:, None]) & (levels['ticks'][1:] <= remaining[:, None])
+    return fits.sum(axis=1)
+
+
+def bridge_crossing(position, new_position, variance, wall):
+    """
+    Probabilities that the position crossed a wall during a step and came back.
+
+    Args:
+        position: an array of positions before the step, inside the walls.
+        new_position: an array of positions after the step, inside the walls.
+        variance: an array with the variance of the position over each step.
+        wall: the wall boundary for the system.
+
+    Returns:
+        low: the probability of a crossing of the wall at 0.
+        high: the probability of a crossing of the wall at ``wall``.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(variance > 0, 2.0 / variance, np.inf)
+        # steps ending outside of the walls give positive exponents, cut to 0
+        low = np.exp(np.minimum(-scale * position * new_position, 0.0))
+        high = np.exp(np.minimum(-scale * (wall - position) * (wall - new_position), 0.0))
+    return low, high
+
+
+def adaptive_ensemble(damping_coefficient, initial_velocity, total_time, time_step, \
+                      temperature, initial_position, wall, num_particles, \
+                      max_time_step, kB=1, dirac_delta=1, noise=None, safety=4.0):
+    """
+    Advance an ensemble of independent particles with adaptive time steps.
+
+    Every particle takes its own steps, see the module documentation, and
+    all particles still inside the walls take one step per iteration. The
+    number of particle steps is counted in the ``ensemble_steps`` counter of
+    ``lds.profiling``.
+
+    Args:
+        damping_coefficient: the damping coefficient of the system.
+        initial_velocity: the initial velocity of every particle.
+        total_time: the total simulation time.
+        time_step: the smallest time step, taken next to the walls.
+        temperature: the temperature of the system.
+        initial_position: the initial position of every particle.
+        wall: the wall boundary for the system.
+        num_particles: the number of trajectories in the ensemble.
+        max_time_step: the largest time step, taken in the bulk.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+        noise: a NoiseSource providing the standard normal numbers. Default
+        to None, which creates an unseeded one from the given parameters.
+        safety: see ``choose_levels``. Default to 4.
+
+    Returns:
+        velocities, positions, exit_times, alive: see
+        ``lds.ensemble.ensemble_integrator``.
+    """
+    num_steps = int(total_time // time_step) # calculate the number of steps
+    num_particles = int(num_particles)
+    if noise is None:
+        noise = NoiseSource(temperature, damping_coefficient, kB, dirac_delta)
+    levels = step_levels(damping_coefficient, time_step, max_time_step, temperature, \
+                         kB, dirac_delta)
+
+    velocities = np.full(num_particles, float(initial_velocity))
+    positions = np.full(num_particles, float(initial_position))
+    exit_times = np.full(num_particles, num_steps * time_step)
+    alive = np.ones(num_particles, dtype=bool)
+
+    # compact copies of the particles that are still running
+    active = np.arange(num_particles)
+    v = velocities.copy()
+    x = positions.copy()
+    done = np.zeros(num_particles, dtype=np.int64)
+
+    with profiling.stage('ensemble'):
+        while active.size > 0 and num_steps > 0:
+            level = choose_levels(v, x, num_steps - done, wall, levels, safety)
+            z = noise.draw(active.size * NOISE_WIDTH, standard=True)\
+                .reshape(active.size, NOISE_WIDTH)
+            new_v = levels['a'][level] * v + levels['c'][level] * z[:, 0]
+            new_x = x + levels['d'][level] * v + levels['g'][level] * z[:, 0] \
+                + levels['h'][level] * z[:, 1]
+            done += levels['ticks'][level]
+            profiling.count('ensemble_steps', active.size)
+
+            above = new_x > wall
+            below = new_x < 0
+            inside = ~(above | below)
+            low, high = bridge_crossing(x, new_x, levels['variance'][level], wall)
+            # a uniform number, as exp(-E) with E = (z2^2 + z3^2) / 2 exponential
+            uniform = np.exp(-0.5 * (z[:, 2] ** 2 + z[:, 3] ** 2))
+            below |= inside & (uniform < low)
+            above |= inside & (uniform >= low) & (uniform < low + high)
+            v = new_v
+            x = np.where(above, wall, np.where(below, 0.0, new_x))
+
+            exited = above | below
+            if exited.any():
+                gone = active[exited]
+                exit_times[gone] = done[exited] * time_step
+                alive[gone] = False
+            stop = exited | (done >= num_steps)
+            if stop.any():
+                velocities[active[stop]] = v[stop]
+                positions[active[stop]] = x[stop]
+                keep = ~stop
+                active = active[keep]
+                v = v[keep]
+                x = x[keep]
+                done = done[keep]
+    return velocities, positions, exit_times, alive
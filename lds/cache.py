@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of ensemble and first-passage results.
+
+Results are stored in one ``.npz`` file per entry, named after a SHA-256
+hash of everything that determines them: the parameters of the run, the
+scheme, the backend, the external potential, the exact state of the noise
+source (which covers the seed and stream) and the version of the package.
+A cached result also restores the noise source to the state the run would
+have left it in, so what is drawn next does not depend on the cache.
+
+The directory is kept under a size limit by removing the least recently
+used entries.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import lds
+from lds.potentials import CallablePotential, Potential
+
+# default size limit of the cache directory, in bytes
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def default_directory():
+    """
+    The cache directory used when none is given.
+
+    Returns:
+        path: ``$LDS_CACHE_DIR``, or ``~/.cache/lds``.
+    """
+    return os.environ.get('LDS_CACHE_DIR') or \
+        os.path.join(os.path.expanduser('~'), '.cache', 'lds')
+
+
+def describe_potential(potential):
+    """
+    A plain description of a potential, usable in a cache key.
+
+    Args:
+        potential: a Potential, or None.
+
+    Returns:
+        description: a dict of the class and parameters of the potential,
+        None without a potential. Arrays are replaced by their hash.
+
+    Raises:
+        ValueError: for callables, whose behaviour cannot be described.
+    """
+    if potential is None:
+        return None
+    if not isinstance(potential, Potential) or isinstance(potential, CallablePotential):
+        raise ValueError('Results in a force callable cannot be cached')
+    description = {'class': type(potential).__name__}
+    for name, value in sorted(vars(potential).items()):
+        if isinstance(value, np.ndarray):
+            value = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+        description[name] = value
+    return description
+
+
+class ResultCache(object):
+    """
+    A directory of cached results with least recently used eviction.
+
+    Args:
+        directory: the cache directory, created if needed. Default to None,
+        see ``default_directory``.
+        max_bytes: the size limit of the directory. Default to 1 GiB.
+        enabled: False to bypass the cache, which then never finds nor
+        stores anything. Default to True.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+        self.directory = directory or default_directory()
+        self.max_bytes = int(max_bytes)
+        self.enabled = enabled
+        if enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, kind, parameters):
+        """
+        Hash the identity of a result.
+
+        Args:
+            kind: the kind of result, e.g. 'first_passage'.
+            parameters: a dict of plain values, which can be dumped as JSON.
+
+        Returns:
+            key: a hexadecimal digest.
+        """
+        identity = {'kind': kind, 'version': lds.__version__, 'parameters': parameters}
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8'))\
+            .hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        """
+        Look up a result, marking it as recently used.
+
+        Args:
+            key: a key from ``key``.
+
+        Returns:
+            arrays: a dict of numpy arrays, or None if it is not cached.
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                arrays = dict((name, data[name]) for name in data.files)
+        except (OSError, ValueError): # missing, or removed by another process
+            return None
+        os.utime(path)
+        return arrays
+
+    def put(self, key, arrays):
+        """
+        Store a result atomically, then evict old entries above the size limit.
+
+        Args:
+            key: a key from ``key``.
+            arrays: a dict of numpy arrays.
+        """
+        if not self.enabled:
+            return
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self.evict()
+
+    def entries(self):
+        """
+        The cached entries, least recently used first.
+
+        Returns:
+            entries: a list of (path, size, last use) tuples.
+        """
+        entries = list()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        """the total size of the cached entries, in bytes."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its limit."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Remove every entry."""
+        for path, _, _ in self.entries():
+            os.remove(path)
+
+
+def result_key(cache, kind, parameters, noise, potential=None):
+    """
+    The cache key of a result, if it can be cached.
+
+    Args:
+        cache: a ResultCache, or None.
+        kind: the kind of result, e.g. 'first_passage'.
+        parameters: a dict of the plain parameters of the run.
+        noise: the NoiseSource the run draws from, or None for an unseeded
+        run, which is not cached.
+        potential: the external potential of the run.
+
+    Returns:
+        key: a key of ``cache``, or None when the result is not cached.
+    """
+    if cache is None or not cache.enabled or noise is None:
+        return None
+    try:
+        potential = describe_potential(potential)
+    except ValueError:
+        return None
+    parameters = dict(parameters, potential=potential, noise_std_dev=noise.std_dev, \
+                      noise_state=noise.get_state())
+    return cache.key(kind, parameters)
+
+
+def noise_state_array(noise):
+    """The state of a noise source, as an array to store with a result."""
+    return np.array(json.dumps(noise.get_state()))
+
+
+def restore_noise(noise, array):
+    """Move a noise source to a state stored by ``noise_state_array``."""
+    noise.set_state(json.loads(str(array)))
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Checkpoints of long runs, to resume them after an interruption."""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from lds import profiling
+
+# name of the checkpoint file in the output directory
+CHECKPOINT_FILE = 'checkpoint.npz'
+
+# arguments of the command line which determine the trajectory
+PARAMETERS = ('initial_position', 'initial_velocity', 'temperature', \
+              'damping_coefficient', 'time_step', 'total_time', 'wall_size', \
+              'seed', 'record_every', 'integrator', 'potential', 'format')
+
+
+class Checkpoint(object):
+    """
+    State of a run between two integrated chunks.
+
+    ``stream_integrator`` updates the checkpoint it is given after every
+    chunk, and starts from it when it already holds a state.
+
+    Args:
+        step: the number of steps done.
+        velocity: the velocity after ``step`` steps.
+        position: the position after ``step`` steps.
+        noise_state: the state of the NoiseSource, see
+        ``NoiseSource.get_state``. Default to None, a run not started yet.
+        finished: True once the run hit a wall or reached its last step.
+        output_size: the size of the output file written up to ``step``.
+        parameters: a dict of the parameters of the run, to check that a run
+        is resumed with the same ones.
+    """
+
+    def __init__(self, step=0, velocity=0.0, position=0.0, noise_state=None, \
+                 finished=False, output_size=0, parameters=None):
+        self.step = int(step)
+        self.velocity = float(velocity)
+        self.position = float(position)
+        self.noise_state = noise_state
+        self.finished = bool(finished)
+        self.output_size = int(output_size)
+        self.parameters = parameters
+
+    def save(self, path):
+        """
+        Write the checkpoint atomically.
+
+        The checkpoint is written to a temporary file in the same directory
+        and moved over ``path``, so an interruption leaves either the previous
+        checkpoint or the new one.
+
+        Args:
+            path: the path of the checkpoint file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with profiling.stage('checkpoint'), os.fdopen(handle, 'wb') as file:
+                np.savez(file, step=self.step, velocity=self.velocity, \
+                         position=self.position, finished=self.finished, \
+                         output_size=self.output_size, \
+                         state=json.dumps({'noise': self.noise_state, \
+                                           'parameters': self.parameters}))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a checkpoint written by ``save``.
+
+        Args:
+            path: the path of the checkpoint file.
+
+        Returns:
+            checkpoint: a Checkpoint.
+        """
+        with np.load(path) as data:
+            state = json.loads(str(data['state']))
+            return cls(int(data['step']), float(data['velocity']), \
+                       float(data['position']), state['noise'], \
+                       bool(data['finished']), int(data['output_size']), \
+                       state['parameters'])
+
+    def check(self, parameters):
+        """
+        Make sure a run is resumed with the parameters it was started with.
+
+        Args:
+            parameters: a dict of the parameters of the resumed run.
+        """
+        if self.parameters != parameters:
+            changed = sorted(key for key in set(self.parameters or {}) | set(parameters) \
+                             if (self.parameters or {}).get(key) != parameters.get(key))
+            raise ValueError('Cannot resume, the parameters {0} differ from the '\
+                             'checkpoint'.format(', '.join(changed)))
+
+
+def run_parameters(args):
+    """
+    Pick the parameters of a run that a checkpoint must match.
+
+    Args:
+        args: a dict of arguments as returned by ``parse_args``.
+
+    Returns:
+        parameters: a dict of plain values, see ``PARAMETERS``.
+    """
+    return dict((key, args.get(key)) for key in PARAMETERS)
+
+
+def open_output(path, size=None):
+    """
+    Open the text output file of a run.
+
+    Args:
+        path: the path of the output file.
+        size: resume an existing file, cut to its first ``size`` bytes.
+        Default to None, which starts a new file.
+
+    Returns:
+        file: the file, open for writing at its end.
+    """
+    if size is None:
+        return open(path, 'w')
+    file = open(path, 'r+')
+    file.truncate(size)
+    file.seek(size)
+    return file
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Reduction of long series to what a figure can show.
+
+A figure is a few hundred pixels wide, so drawing every step of a long
+trajectory only costs time and memory. ``minmax_decimate`` keeps the lowest
+and the highest position of each bucket of steps, in time order, which
+draws the same envelope as the full trajectory with a bounded number of
+points. ``BinnedHistogram`` counts values into bins a chunk at a time, so a
+histogram never needs the raw samples at once.
+
+Neither imports matplotlib.
+"""
+
+import numpy as np
+
+# points kept of a trajectory, two per bucket, a few per pixel column
+PLOT_POINTS = 4000
+# values binned at once
+CHUNK_SIZE = 65536
+
+
+def minmax_decimate(time, position, max_points=PLOT_POINTS):
+    """
+    Keep the extreme positions of each bucket of a trajectory.
+
+    The steps are split into ``max_points // 2`` buckets of consecutive
+    steps, and the lowest and highest position of each bucket are kept, in
+    the order they were reached.
+
+    Args:
+        time: an array or a list of times.
+        position: an array or a list of positions, one per time.
+        max_points: the largest number of points kept. Default to 4000.
+
+    Returns:
+        time: an array of at most ``max_points`` times.
+        position: an array with the position at each kept time.
+    """
+    time = np.asarray(time)
+    position = np.asarray(position)
+    if time.shape != position.shape:
+        raise ValueError('Got {0} times for {1} positions'.format(time.size, position.size))
+    buckets = int(max_points) // 2
+    if buckets < 1:
+        raise ValueError('Need at least two points, got {0}'.format(max_points))
+    if position.size <= max_points:
+        return time, position
+    size = -(-position.size // buckets) # ceil, the last bucket may be shorter
+    full = position.size // size
+    rows = position[:full * size].reshape(full, size)
+    start = np.arange(full) * size
+    low = start + rows.argmin(axis=1)
+    high = start + rows.argmax(axis=1)
+    if full * size < position.size:
+        rest = position[full * size:]
+        low = np.append(low, full * size + rest.argmin())
+        high = np.append(high, full * size + rest.argmax())
+    kept = np.sort(np.stack([low, high], axis=1), axis=1).ravel()
+    return time[kept], position[kept]
+
+
+class BinnedHistogram(object):
+    """
+    Counts of values in equal bins, updated a chunk at a time.
+
+    With a given ``high``, the bins cover ``[low, high]``, as ``np.histogram``
+    does. Without it, the range is taken from the first chunk, and doubled
+    by merging pairs of bins whenever a later value falls above it, so the
+    number of bins stays the same.
+
+    Attributes:
+        counts: an array with the number of values in each bin.
+        low: the lower edge of the first bin.
+        high: the upper edge of the last bin with a fixed range, else None.
+        width: the width of every bin.
+    """
+
+    def __init__(self, bins=10, low=0.0, high=None):
+        self.bins = int(bins)
+        if self.bins < 1:
+            raise ValueError('Need at least one bin, got {0}'.format(bins))
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.low = float(low)
+        self.width = None
+        self.high = None
+        self.fixed = high is not None
+        if self.fixed:
+            self.high = float(high)
+            span = self.high - self.low
+            if span < 0:
+                raise ValueError('The upper edge {0} is below the lower edge {1}'\
+                                 .format(high, low))
+            # np.histogram widens an empty range the same way
+            self.width = span / self.bins if span > 0 else 1.0 / self.bins
+            if span == 0:
+                self.low -= 0.5
+                self.high += 0.5
+
+    @property
+    def edges(self):
+        """the ``bins + 1`` edges of the bins."""
+        width = 1.0 / self.bins if self.width is None else self.width
+        edges = self.low + width * np.arange(self.bins + 1)
+        if self.fixed: # exactly, even when low + width * bins rounds off
+            edges[-1] = self.high
+        return edges
+
+    def _grow(self, largest):
+        """Merge pairs of bins until ``largest`` falls in the last one."""
+        if self.bins % 2:
+            raise ValueError('A histogram without fixed range needs an even number '\
+                             'of bins, got {0}'.format(self.bins))
+        half = self.bins // 2
+        while largest >= self.low + self.width * self.bins:
+            merged = self.counts.reshape(half, 2).sum(axis=1)
+            self.counts = np.concatenate([merged, np.zeros(half, dtype=np.int64)])
+            self.width *= 2
+
+    def update(self, values, chunk_size=CHUNK_SIZE):
+        """
+        Count values into the bins.
+
+        Args:
+            values: an array or a list of values, none below ``low``. With a
+            fixed range, values outside of it are left out, as
+            ``np.histogram`` does.
+            chunk_size: the number of values binned at once. Default to 65536.
+
+        Returns:
+            self
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        for begin in range(0, values.size, chunk_size):
+            chunk = values[begin:begin + chunk_size]
+            if self.fixed:
+                chunk = chunk[(chunk >= self.low) & (chunk <= self.high)]
+            else:
+                if chunk.min() < self.low:
+                    raise ValueError('Got a value {0} below the lower edge {1}'\
+                                     .format(chunk.min(), self.low))
+                largest = chunk.max()
+                if self.width is None:
+                    span = largest - self.low
+                    self.width = span * (1 + 1e-9) / self.bins if span > 0 \
+                        else 1.0 / self.bins
+                self._grow(largest)
+            index = ((chunk - self.low) / self.width).astype(np.int64)
+            # the upper edge belongs to the last bin
+            np.minimum(index, self.bins - 1, out=index)
+            if self.fixed: # move values rounded into a neighbour bin, as np.histogram
+                edges = self.edges
+                index -= chunk < edges[index]
+                index += (chunk >= edges[index + 1]) & (index != self.bins - 1)
+            self.counts += np.bincount(index, minlength=self.bins)
+        return self
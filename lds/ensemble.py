@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Vectorized ensemble integration of many independent particles."""
+
+import numpy as np
+
+from lds import profiling
+from lds.cache import noise_state_array, restore_noise, result_key
+from lds.kernels import resolve_backend
+from lds.noise import NoiseSource
+from lds.potentials import as_potential
+from lds.schemes import draw_noise, noise_width, scheme_coefficients, scheme_kernels
+
+
+def ensemble_integrator(damping_coefficient, initial_velocity, total_time, time_step, \
+                        temperature, initial_position, wall, num_particles, \
+                        kB=1, dirac_delta=1, noise=None, backend=None, \
+                        chunk_size=1048576, scheme='euler', potential=None, cache=None):
+    """
+    Advance an ensemble of independent particles.
+
+    Every particle follows the same update rule as ``euler_integrator`` (or
+    the chosen scheme), but
+    all particles that have not hit a wall yet are advanced together, block by
+    block, by the kernel of the chosen backend. A particle is removed from the
+    active set at the step where it crosses ``0`` or ``wall``.
+
+    Args:
+        damping_coefficient: the damping coefficient of the system.
+        initial_velocity: the initial velocity of every particle.
+        total_time: the total simulation time.
+        time_step: the time step (dt) to be integrated on.
+        temperature: the temperature of the system.
+        initial_position: the initial position of every particle.
+        wall: the wall boundary for the system.
+        num_particles: the number of trajectories in the ensemble.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+        noise: a NoiseSource providing the random forces. Default to None,
+        which creates an unseeded one from the given parameters.
+        backend: 'numba', 'numpy' or 'python'. Default to None, which uses
+        Numba when it is installed and NumPy otherwise.
+        chunk_size: about how many random forces are drawn per block.
+        scheme: 'euler', 'baoab' or 'ou', see ``lds.schemes``. Default to
+        'euler'.
+        potential: a ``lds.potentials.Potential`` or a callable returning
+        the force at an array of positions. Default to None, a free particle.
+        cache: a ``lds.cache.ResultCache`` to look the result up in and store
+        it to. Runs without a given noise source, or in a force callable,
+        are never cached. Default to None.
+
+    Returns:
+        velocities: a numpy array with the final velocity of each particle.
+        positions: a numpy array with the final position of each particle,
+        clamped to the wall it hit.
+        exit_times: a numpy array with the first-passage time of each
+        particle, or the final simulated time if it never hit a wall.
+        alive: a boolean numpy array, True for particles that never hit a wall.
+    """
+
+    num_steps = int(total_time // time_step) # calculate the number of steps
+    num_particles = int(num_particles)
+    potential = as_potential(potential)
+    key = result_key(cache, 'ensemble', {
+        'damping_coefficient': float(damping_coefficient),
+        'initial_velocity': float(initial_velocity),
+        'total_time': float(total_time),
+        'time_step': float(time_step),
+        'temperature': float(temperature),
+        'initial_position': float(initial_position),
+        'wall': float(wall),
+        'num_particles': num_particles,
+        'kB': float(kB),
+        'dirac_delta': float(dirac_delta),
+        'chunk_size': int(chunk_size),
+        'scheme': scheme,
+        'backend': resolve_backend(backend)}, noise, potential)
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            restore_noise(noise, cached['noise_state'])
+            return cached['velocities'], cached['positions'], cached['exit_times'], \
+                cached['alive']
+    if noise is None:
+        noise = NoiseSource(temperature, damping_coefficient, kB, dirac_delta)
+    coefficients = scheme_coefficients(scheme, damping_coefficient, initial_velocity, \
+                                       time_step, temperature, kB, dirac_delta)
+    _, ensemble_chunk = scheme_kernels(scheme, damping_coefficient, time_step, \
+                                       backend, potential)
+
+    velocities = np.full(num_particles, float(initial_velocity))
+    positions = np.full(num_particles, float(initial_position))
+    exit_times = np.full(num_particles, num_steps * time_step)
+    alive = np.ones(num_particles, dtype=bool)
+
+    # compact copies of the particles that are still inside the walls
+    active = np.arange(num_particles)
+    v = velocities.copy()
+    x = positions.copy()
+    exit_step = np.zeros(num_particles, dtype=np.int64)
+    exit_side = np.zeros(num_particles, dtype=np.int64)
+
+    done = 0
+    while done < num_steps and active.size > 0:
+        # integrate a block of steps with about chunk_size random forces
+        size = min(max(chunk_size // (active.size * max(noise_width(scheme), 1)), 1), \
+                   num_steps - done)
+        with profiling.stage('ensemble'):
+            noise_block = draw_noise(noise, scheme, size, active.size)
+            ensemble_chunk(v, x, noise_block, coefficients, wall, \
+                           exit_step[:active.size], exit_side[:active.size])
+        exited = exit_step[:active.size] > 0
+        profiling.count('ensemble_steps', \
+                        int(np.where(exited, exit_step[:active.size], size).sum()))
+        if exited.any():
+            gone = active[exited]
+            velocities[gone] = v[exited]
+            positions[gone] = x[exited]
+            exit_times[gone] = (done + exit_step[:active.size][exited]) * time_step
+            alive[gone] = False
+            keep = ~exited
+            active = active[keep]
+            v = v[keep]
+            x = x[keep]
+        done += size
+
+    # write back the particles that never hit a wall
+    velocities[active] = v
+    positions[active] = x
+    if key is not None:
+        cache.put(key, {'velocities': velocities, 'positions': positions, \
+                        'exit_times': exit_times, 'alive': alive, \
+                        'noise_state': noise_state_array(noise)})
+    return velocities, positions, exit_times, alive
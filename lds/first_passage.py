@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""First-passage time statistics of ensembles of trajectories."""
+
+import numpy as np
+
+from lds.adaptive import adaptive_ensemble
+from lds.cache import noise_state_array, restore_noise, result_key
+from lds.ensemble import ensemble_integrator
+from lds.kernels import resolve_backend
+from lds.noise import NoiseSource
+from lds.potentials import as_potential
+
+
+class RunningStats(object):
+    """
+    Online mean and variance of a stream of values.
+
+    Batches are merged with the parallel form of Welford's algorithm, so the
+    values themselves don't need to be kept.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, values):
+        """
+        Add a batch of values.
+
+        Args:
+            values: an array of values.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+        count = self.count + values.size
+        batch_mean = float(np.mean(values))
+        delta = batch_mean - self.mean
+        self._m2 += float(np.sum((values - batch_mean) ** 2)) \
+            + delta ** 2 * self.count * values.size / count
+        self.mean += delta * values.size / count
+        self.count = count
+
+    @property
+    def variance(self):
+        """the unbiased sample variance, nan with less than two values."""
+        return self._m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    @property
+    def std_error(self):
+        """the standard error of the mean, nan with less than two values."""
+        return float(np.sqrt(self.variance / self.count)) if self.count > 1 else float('nan')
+
+    def confidence_interval(self, level=0.95):
+        """
+        Normal confidence interval of the mean.
+
+        Args:
+            level: the confidence level. Default to 0.95.
+
+        Returns:
+            low: the lower bound.
+            high: the upper bound.
+        """
+        from scipy.stats import norm
+        z = norm.ppf(0.5 + level / 2)
+        return self.mean - z * self.std_error, self.mean + z * self.std_error
+
+
+class FirstPassageResult(object):
+    """
+    First passages of an ensemble of runs.
+
+    Attributes:
+        exit_times: an array with the first-passage time of each run, or the
+        total simulated time for censored runs.
+        exit_side: an int8 array, 1 for runs that hit the wall at ``wall``,
+        -1 for the wall at 0 and 0 for censored runs.
+        censored: a boolean array, True for runs that never hit a wall.
+        stats: the RunningStats of the uncensored exit times.
+    """
+
+    def __init__(self, exit_times, exit_side, stats):
+        self.exit_times = exit_times
+        self.exit_side = exit_side
+        self.censored = exit_side == 0
+        self.stats = stats
+
+    @property
+    def runs(self):
+        """the number of runs."""
+        return self.exit_times.size
+
+    @property
+    def mean(self):
+        """the mean first-passage time of the uncensored runs."""
+        return self.stats.mean if self.stats.count else float('nan')
+
+    @property
+    def variance(self):
+        """the variance of the first-passage time of the uncensored runs."""
+        return self.stats.variance
+
+    @property
+    def std_error(self):
+        """the standard error of the mean first-passage time."""
+        return self.stats.std_error
+
+    def confidence_interval(self, level=0.95):
+        """
+        Normal confidence interval of the mean first-passage time.
+
+        Args:
+            level: the confidence level. Default to 0.95.
+
+        Returns:
+            low: the lower bound.
+            high: the upper bound.
+        """
+        return self.stats.confidence_interval(level)
+
+    def quantiles(self, q):
+        """
+        Quantiles of the first-passage time of the uncensored runs.
+
+        Args:
+            q: a quantile or an array of quantiles, between 0 and 1.
+
+        Returns:
+            the quantiles, nan when every run is censored.
+        """
+        times = self.exit_times[~self.censored]
+        if times.size == 0:
+            return np.full(np.shape(q), np.nan)
+        return np.quantile(times, q)
+
+    def side_fractions(self):
+        """
+        Fraction of the runs ending at each wall.
+
+        Returns:
+            low: the fraction of runs that hit the wall at 0.
+            high: the fraction of runs that hit the wall at ``wall``.
+            censored: the fraction of runs that never hit a wall.
+        """
+        runs = max(self.runs, 1)
+        return float(np.sum(self.exit_side == -1)) / runs, \
+            float(np.sum(self.exit_side == 1)) / runs, \
+            float(np.sum(self.censored)) / runs
+
+
+def first_passage(damping_coefficient, initial_velocity, total_time, time_step, \
+                  temperature, initial_position, wall, runs=100, kB=1, dirac_delta=1, \
+                  noise=None, backend=None, batch_size=None, target_std_error=None, \
+                  scheme='euler', potential=None, cache=None, max_time_step=None):
+    """
+    Collect the first-passage times of an ensemble of runs.
+
+    Runs are integrated by ``ensemble_integrator`` in batches of
+    ``batch_size``. When ``target_std_error`` is given, no new batch is
+    started once the standard error of the mean first-passage time is below
+    it, so ``runs`` is then an upper bound.
+
+    With ``max_time_step``, runs take adaptive steps between ``time_step``
+    next to the walls and ``max_time_step`` in the bulk, see
+    ``lds.adaptive``. This needs the 'ou' scheme and a free particle.
+
+    Args:
+        damping_coefficient: the damping coefficient of the system.
+        initial_velocity: the initial velocity of every run.
+        total_time: the total simulation time of each run.
+        time_step: the time step (dt) to be integrated on.
+        temperature: the temperature of the system.
+        initial_position: the initial position of every run.
+        wall: the wall boundary for the system.
+        runs: the (maximum) number of runs. Default to 100.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+        noise: a NoiseSource providing the random forces. Default to None,
+        which creates an unseeded one from the given parameters.
+        backend: the integration backend, see ``lds.kernels``.
+        batch_size: the number of runs integrated together. Default to None,
+        which is ``runs`` without a target and ``runs // 10`` with one.
+        target_std_error: stop once the standard error of the mean is below
+        this. Default to None, which always does ``runs`` runs.
+        scheme: 'euler', 'baoab' or 'ou', see ``lds.schemes``. Default to
+        'euler'.
+        potential: the external potential, see ``ensemble_integrator``.
+        cache: a ``lds.cache.ResultCache`` to look the result up in and store
+        it to. Runs without a given noise source, or in a force callable,
+        are never cached. Default to None.
+        max_time_step: the largest adaptive time step. Default to None, which
+        takes fixed steps of ``time_step``.
+
+    Returns:
+        result: a FirstPassageResult.
+    """
+    runs = int(runs)
+    potential = as_potential(potential)
+    if max_time_step is not None and (scheme != 'ou' or potential is not None):
+        raise ValueError("Adaptive time steps need the 'ou' scheme and no potential")
+    key = result_key(cache, 'first_passage', {
+        'damping_coefficient': float(damping_coefficient),
+        'initial_velocity': float(initial_velocity),
+        'total_time': float(total_time),
+        'time_step': float(time_step),
+        'temperature': float(temperature),
+        'initial_position': float(initial_position),
+        'wall': float(wall),
+        'runs': runs,
+        'kB': float(kB),
+        'dirac_delta': float(dirac_delta),
+        'batch_size': batch_size,
+        'target_std_error': target_std_error,
+        'scheme': scheme,
+        'backend': resolve_backend(backend),
+        'max_time_step': max_time_step}, noise, potential)
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            restore_noise(noise, cached['noise_state'])
+            stats = RunningStats()
+            stats.count = int(cached['count'])
+            stats.mean = float(cached['mean'])
+            stats._m2 = float(cached['m2'])
+            return FirstPassageResult(cached['exit_times'], cached['exit_side'], stats)
+    if noise is None:
+        noise = NoiseSource(temperature, damping_coefficient, kB, dirac_delta)
+    if batch_size is None:
+        batch_size = runs if target_std_error is None else max(runs // 10, 2)
+    stats = RunningStats()
+    exit_times = list()
+    exit_sides = list()
+    done = 0
+    while done < runs:
+        size = min(int(batch_size), runs - done)
+        if max_time_step is None:
+            _, positions, times, alive = ensemble_integrator(damping_coefficient, \
+                initial_velocity, total_time, time_step, temperature, initial_position, \
+                wall, size, kB, dirac_delta, noise=noise, backend=backend, scheme=scheme, \
+                potential=potential)
+        else:
+            _, positions, times, alive = adaptive_ensemble(damping_coefficient, \
+                initial_velocity, total_time, time_step, temperature, initial_position, \
+                wall, size, max_time_step, kB, dirac_delta, noise=noise)
+        # exited runs sit exactly on the wall they hit
+        side = np.where(positions <= 0, -1, 1).astype(np.int8)
+        side[alive] = 0
+        stats.update(times[~alive])
+        exit_times.append(times)
+        exit_sides.append(side)
+        done += size
+        if target_std_error is not None and stats.std_error < target_std_error:
+            break
+    result = FirstPassageResult(np.concatenate(exit_times) if exit_times else np.empty(0), \
+                                np.concatenate(exit_sides) if exit_sides else \
+                                np.empty(0, dtype=np.int8), stats)
+    if key is not None:
+        cache.put(key, {'exit_times': result.exit_times, 'exit_side': result.exit_side, \
+                        'count': stats.count, 'mean': stats.mean, 'm2': stats._m2, \
+                        'noise_state': noise_state_array(noise)})
+    return result
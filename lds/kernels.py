@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+"""
+Integration kernels of the integration schemes for the different backends.
+
+Every kernel advances particles over a block of pre-drawn random forces, so
+that all backends consume the noise stream in the same order and give the
+same result for the same seed. Three backends are available:
+
+* ``'python'``: plain python loops, the reference implementation.
+* ``'numpy'``: array operations over a whole block.
+* ``'numba'``: the python loops compiled with Numba, if it is installed.
+
+The Euler scheme has its own kernels, while BAOAB and the exact
+Ornstein-Uhlenbeck update share the kernels of linear gaussian schemes.
+Runs in an external potential use the kernels of ``force_kernels``, which
+evaluate the force of all particles with one vectorized call per step.
+"""
+
+import warnings
+from importlib.util import find_spec
+
+import numpy as np
+
+# numba is optional, and only imported when its kernels are first used
+HAVE_NUMBA = find_spec('numba') is not None
+
+BACKENDS = ('numba', 'numpy', 'python')
+
+
+def euler_chunk_python(velocity, position, noise_block, coefficients, wall, \
+                       out_velocity, out_position):
+    """
+    Advance one particle over a block of steps with the Euler scheme.
+
+    Args:
+        velocity: the velocity before the first step of the block.
+        position: the position before the first step of the block.
+        noise_block: an array with the random force of each step.
+        coefficients: a tuple (drag_force, time_step) with the (constant)
+        drag force of the run and the time step (dt).
+        wall: the wall boundary for the system.
+        out_velocity: an array receiving the velocity after each step.
+        out_position: an array receiving the position after each step.
+
+    Returns:
+        steps: the number of steps done, less than the block when a wall is hit.
+        side: 1 if the particle hit the wall at ``wall``, -1 if it hit the wall
+        at 0, 0 if it is still inside.
+    """
+    drag_force, time_step = coefficients
+    for i in range(noise_block.shape[0]):
+        new_velocity = velocity + (drag_force + noise_block[i]) * time_step
+        new_position = position + velocity * time_step
+        out_velocity[i] = new_velocity
+        if new_position > wall: # if hit wall at wall_size
+            out_position[i] = wall
+            return i + 1, 1
+        elif new_position < 0: # if hit wall at 0
+            out_position[i] = 0.0
+            return i + 1, -1
+        out_position[i] = new_position # if not hitting the wall
+        velocity = new_velocity
+        position = new_position
+    return noise_block.shape[0], 0
+
+
+def euler_chunk_numpy(velocity, position, noise_block, coefficients, wall, \
+                      out_velocity, out_position):
+    """
+    Vectorized version of ``euler_chunk_python``.
+
+    Velocities and positions of the whole block are running sums, computed
+    with ``np.cumsum`` in the same order as the python loop.
+    """
+    drag_force, time_step = coefficients
+    size = noise_block.shape[0]
+    velocities = np.empty(size + 1)
+    velocities[0] = velocity
+    np.multiply(drag_force + noise_block, time_step, out=velocities[1:])
+    np.cumsum(velocities, out=velocities)
+    positions = np.empty(size + 1)
+    positions[0] = position
+    np.multiply(velocities[:-1], time_step, out=positions[1:])
+    np.cumsum(positions, out=positions)
+    return _first_exit(velocities, positions, wall, out_velocity, out_position)
+
+
+def _first_exit(velocities, positions, wall, out_velocity, out_position):
+    """
+    Copy a block of steps up to the first one outside of the walls.
+
+    Args:
+        velocities: the velocity before and after each step of the block.
+        positions: the position before and after each step of the block,
+        not yet clamped to the walls.
+        wall: the wall boundary for the system.
+        out_velocity: an array receiving the velocity after each step.
+        out_position: an array receiving the position after each step.
+
+    Returns:
+        steps: the number of steps done, less than the block when a wall is hit.
+        side: the wall that was hit, see ``euler_chunk_python``.
+    """
+    size = positions.shape[0] - 1
+    above = positions[1:] > wall
+    below = positions[1:] < 0
+    outside = above | below
+    steps, side = size, 0
+    if outside.any(): # stop at the first step outside of the walls
+        steps = int(np.argmax(outside)) + 1
+        side = 1 if above[steps - 1] else -1
+    out_velocity[:steps] = velocities[1:steps + 1]
+    out_position[:steps] = positions[1:steps + 1]
+    if side == 1:
+        out_position[steps - 1] = wall
+    elif side == -1:
+        out_position[steps - 1] = 0.0
+    return steps, side
+
+
+def ensemble_chunk_python(velocity, position, noise_block, coefficients, wall, \
+                          exit_step, exit_side):
+    """
+    Advance independent particles over a block of steps with the Euler scheme.
+
+    Args:
+        velocity: an array with the velocity of each particle, updated in place.
+        position: an array with the position of each particle, updated in place.
+        noise_block: an array of shape (steps, particles) of random forces.
+        coefficients: a tuple (drag_force, time_step), see ``euler_chunk_python``.
+        wall: the wall boundary for the system.
+        exit_step: an integer array receiving, for each particle, the step of
+        the block at which it hit a wall (counting from 1), 0 otherwise.
+        exit_side: an integer array receiving 1 for particles that hit the wall
+        at ``wall``, -1 for the wall at 0 and 0 otherwise.
+    """
+    drag_force, time_step = coefficients
+    for j in range(noise_block.shape[1]):
+        v = velocity[j]
+        x = position[j]
+        exit_step[j] = 0
+        exit_side[j] = 0
+        for i in range(noise_block.shape[0]):
+            new_v = v + (drag_force + noise_block[i, j]) * time_step
+            new_x = x + v * time_step
+            v = new_v
+            if new_x > wall:
+                x = wall
+                exit_step[j] = i + 1
+                exit_side[j] = 1
+                break
+            elif new_x < 0:
+                x = 0.0
+                exit_step[j] = i + 1
+                exit_side[j] = -1
+                break
+            x = new_x
+        velocity[j] = v
+        position[j] = x
+
+
+def ensemble_chunk_numpy(velocity, position, noise_block, coefficients, wall, \
+                         exit_step, exit_side):
+    """
+    Vectorized version of ``ensemble_chunk_python``, one array operation per step.
+    """
+    drag_force, time_step = coefficients
+    live = np.ones(velocity.shape[0], dtype=bool)
+    exit_step[:] = 0
+    exit_side[:] = 0
+    for i in range(noise_block.shape[0]):
+        new_x = position + velocity * time_step
+        new_v = velocity + (drag_force + noise_block[i]) * time_step
+        if not _ensemble_update(velocity, position, new_v, new_x, live, wall, \
+                                i, exit_step, exit_side):
+            break
+
+
+def _ensemble_update(velocity, position, new_v, new_x, live, wall, step, \
+                     exit_step, exit_side):
+    """
+    Store one vectorized step of the particles still inside the walls.
+
+    Returns:
+        a boolean, False once every particle hit a wall.
+    """
+    above = live & (new_x > wall)
+    below = live & (new_x < 0)
+    np.copyto(velocity, new_v, where=live)
+    np.copyto(position, new_x, where=live)
+    position[above] = wall
+    position[below] = 0.0
+    exit_step[above | below] = step + 1
+    exit_side[above] = 1
+    exit_side[below] = -1
+    live &= ~(above | below)
+    return live.any()
+
+
+def linear_chunk_python(velocity, position, noise_block, coefficients, wall, \
+                        out_velocity, out_position):
+    """
+    Advance one particle over a block of steps with a linear gaussian scheme.
+
+    BAOAB and the exact Ornstein-Uhlenbeck update of a free particle both
+    take the form::
+
+        v' = a * v + c * z1
+        x' = x + (d * v + e * v' + g * z1 + h * z2)
+
+    with z1, z2 standard normal numbers, see ``lds.schemes``.
+
+    Args:
+        velocity: the velocity before the first step of the block.
+        position: the position before the first step of the block.
+        noise_block: an array of shape (steps, 1) or (steps, 2) of standard
+        normal numbers, z2 being 0 with a single column.
+        coefficients: the tuple (a, c, d, e, g, h).
+        wall: the wall boundary for the system.
+        out_velocity: an array receiving the velocity after each step.
+        out_position: an array receiving the position after each step.
+
+    Returns:
+        steps: the number of steps done, less than the block when a wall is hit.
+        side: the wall that was hit, see ``euler_chunk_python``.
+    """
+    a, c, d, e, g, h = coefficients
+    width = noise_block.shape[1]
+    for i in range(noise_block.shape[0]):
+        z1 = noise_block[i, 0]
+        z2 = noise_block[i, 1] if width > 1 else 0.0
+        new_velocity = a * velocity + c * z1
+        new_position = position + (d * velocity + e * new_velocity + g * z1 + h * z2)
+        out_velocity[i] = new_velocity
+        if new_position > wall: # if hit wall at wall_size
+            out_position[i] = wall
+            return i + 1, 1
+        elif new_position < 0: # if hit wall at 0
+            out_position[i] = 0.0
+            return i + 1, -1
+        out_position[i] = new_position # if not hitting the wall
+        velocity = new_velocity
+        position = new_position
+    return noise_block.shape[0], 0
+
+
+def linear_chunk_numpy(velocity, position, noise_block, coefficients, wall, \
+                       out_velocity, out_position):
+    """
+    Vectorized version of ``linear_chunk_python``.
+
+    The velocity recursion is a first order linear filter, run with
+    ``scipy.signal.lfilter``, and positions are a running sum of increments.
+    """
+    from scipy.signal import lfilter
+    a, c, d, e, g, h = coefficients
+    size = noise_block.shape[0]
+    z1 = noise_block[:, 0]
+    velocities = np.empty(size + 1)
+    velocities[0] = velocity
+    velocities[1:] = lfilter([1.0], [1.0, -a], c * z1, zi=[a * velocity])[0]
+    positions = np.empty(size + 1)
+    positions[0] = position
+    increments = d * velocities[:-1] + e * velocities[1:] + g * z1
+    if noise_block.shape[1] > 1:
+        increments += h * noise_block[:, 1]
+    positions[1:] = increments
+    np.cumsum(positions, out=positions)
+    return _first_exit(velocities, positions, wall, out_velocity, out_position)
+
+
+def linear_ensemble_python(velocity, position, noise_block, coefficients, wall, \
+                           exit_step, exit_side):
+    """
+    Advance independent particles over a block of steps with a linear
+    gaussian scheme, see ``linear_chunk_python`` and ``ensemble_chunk_python``.
+
+    Args:
+        noise_block: an array of shape (steps, particles, 1 or 2) of
+        standard normal numbers.
+    """
+    a, c, d, e, g, h = coefficients
+    width = noise_block.shape[2]
+    for j in range(noise_block.shape[1]):
+        v = velocity[j]
+        x = position[j]
+        exit_step[j] = 0
+        exit_side[j] = 0
+        for i in range(noise_block.shape[0]):
+            z1 = noise_block[i, j, 0]
+            z2 = noise_block[i, j, 1] if width > 1 else 0.0
+            new_v = a * v + c * z1
+            new_x = x + (d * v + e * new_v + g * z1 + h * z2)
+            v = new_v
+            if new_x > wall:
+                x = wall
+                exit_step[j] = i + 1
+                exit_side[j] = 1
+                break
+            elif new_x < 0:
+                x = 0.0
+                exit_step[j] = i + 1
+                exit_side[j] = -1
+                break
+            x = new_x
+        velocity[j] = v
+        position[j] = x
+
+
+def linear_ensemble_numpy(velocity, position, noise_block, coefficients, wall, \
+                          exit_step, exit_side):
+    """
+    Vectorized version of ``linear_ensemble_python``, one array operation per step.
+    """
+    a, c, d, e, g, h = coefficients
+    live = np.ones(velocity.shape[0], dtype=bool)
+    exit_step[:] = 0
+    exit_side[:] = 0
+    for i in range(noise_block.shape[0]):
+        z1 = noise_block[i, :, 0]
+        z2 = noise_block[i, :, 1] if noise_block.shape[2] > 1 else 0.0
+        new_v = a * velocity + c * z1
+        new_x = position + (d * velocity + e * new_v + g * z1 + h * z2)
+        if not _ensemble_update(velocity, position, new_v, new_x, live, wall, \
+                                i, exit_step, exit_side):
+            break
+
+
+def _force_step(scheme, force, force_gain):
+    """
+    Build one vectorized step of a scheme with a position dependent force.
+
+    The force at the new positions is returned with them, so it is
+    evaluated once per step.
+
+    Args:
+        scheme: 'euler', 'baoab' or 'ou'.
+        force: a callable mapping an array of positions to forces.
+        force_gain: the tuple (fv, fx) of ``lds.schemes.force_coefficients``,
+        only used by 'ou'.
+
+    Returns:
+        step: a function (velocity, position, force, noise, coefficients)
+        returning the new velocity, position and force arrays.
+    """
+    if scheme == 'euler':
+        def step(velocity, position, f, z, coefficients):
+            drag_force, time_step = coefficients
+            new_v = velocity + (drag_force + f + z) * time_step
+            new_x = position + velocity * time_step
+            return new_v, new_x, force(new_x)
+    elif scheme == 'baoab':
+        def step(velocity, position, f, z, coefficients):
+            a, c, d, e, g, h = coefficients
+            v = velocity + d * f # half kick
+            x = position + d * v # half drift
+            v = a * v + c * z[:, 0] # friction and noise
+            new_x = x + e * v # half drift
+            new_f = force(new_x)
+            return v + e * new_f, new_x, new_f # half kick
+    else:
+        fv, fx = force_gain
+        def step(velocity, position, f, z, coefficients):
+            # the force is held constant over the step
+            a, c, d, e, g, h = coefficients
+            z1 = z[:, 0]
+            z2 = z[:, 1] if z.shape[1] > 1 else 0.0
+            new_v = a * velocity + fv * f + c * z1
+            new_x = position + (d * velocity + e * new_v + fx * f + g * z1 + h * z2)
+            return new_v, new_x, force(new_x)
+    return step
+
+
+def force_kernels(scheme, force, force_gain=(0.0, 0.0)):
+    """
+    Build the kernels of a scheme in an external potential.
+
+    The kernels take the same arguments as the free particle kernels of the
+    scheme. Steps are done one after the other, each one a few array
+    operations over all particles, so they don't depend on the backend.
+
+    Args:
+        scheme: 'euler', 'baoab' or 'ou'.
+        force: a callable mapping an array of positions to forces, such as
+        a ``lds.potentials.Potential``.
+        force_gain: the tuple (fv, fx) of ``lds.schemes.force_coefficients``.
+
+    Returns:
+        chunk: the single-trajectory kernel.
+        ensemble_chunk: the ensemble kernel.
+    """
+    step = _force_step(scheme, force, force_gain)
+
+    def chunk(velocity, position, noise_block, coefficients, wall, \
+              out_velocity, out_position):
+        v = np.array([velocity], dtype=float)
+        x = np.array([position], dtype=float)
+        f = force(x)
+        for i in range(noise_block.shape[0]):
+            v, x, f = step(v, x, f, noise_block[i:i + 1], coefficients)
+            out_velocity[i] = v[0]
+            if x[0] > wall: # if hit wall at wall_size
+                out_position[i] = wall
+                return i + 1, 1
+            elif x[0] < 0: # if hit wall at 0
+                out_position[i] = 0.0
+                return i + 1, -1
+            out_position[i] = x[0] # if not hitting the wall
+        return noise_block.shape[0], 0
+
+    def ensemble_chunk(velocity, position, noise_block, coefficients, wall, \
+                       exit_step, exit_side):
+        live = np.ones(velocity.shape[0], dtype=bool)
+        exit_step[:] = 0
+        exit_side[:] = 0
+        f = force(position)
+        for i in range(noise_block.shape[0]):
+            new_v, new_x, f = step(velocity, position, f, noise_block[i], coefficients)
+            if not _ensemble_update(velocity, position, new_v, new_x, live, wall, \
+                                    i, exit_step, exit_side):
+                break
+
+    return chunk, ensemble_chunk
+
+
+# kernels of each scheme, the numba ones are compiled on first use
+_KERNELS = {
+    'python': {'euler': (euler_chunk_python, ensemble_chunk_python),
+               'linear': (linear_chunk_python, linear_ensemble_python)},
+    'numpy': {'euler': (euler_chunk_numpy, ensemble_chunk_numpy),
+              'linear': (linear_chunk_numpy, linear_ensemble_numpy)},
+    'numba': dict(),
+}
+
+
+def _compile_numba(family):
+    """
+    Compile the python kernels of a scheme family with Numba, once per process.
+
+    Args:
+        family: 'euler' or 'linear'.
+
+    Returns:
+        chunk: the compiled single-trajectory kernel.
+        ensemble_chunk: the compiled ensemble kernel.
+    """
+    if family not in _KERNELS['numba']:
+        import numba
+        _KERNELS['numba'][family] = tuple(numba.njit(cache=True)(kernel) \
+                                          for kernel in _KERNELS['python'][family])
+    return _KERNELS['numba'][family]
+
+
+def resolve_backend(backend=None):
+    """
+    Pick the backend to integrate with.
+
+    Args:
+        backend: 'numba', 'numpy', 'python' or None. None picks Numba when it
+        is installed and NumPy otherwise. Asking for Numba without it being
+        installed falls back to NumPy with a warning.
+
+    Returns:
+        backend: the name of the backend that will be used.
+    """
+    if backend is None:
+        return 'numba' if HAVE_NUMBA else 'numpy'
+    if backend not in BACKENDS:
+        raise ValueError('Unknown backend {0}, choose from {1}'.format(backend, BACKENDS))
+    if backend == 'numba' and not HAVE_NUMBA:
+        warnings.warn('Numba is not installed, using the numpy backend instead')
+        return 'numpy'
+    return backend
+
+
+def get_kernels(backend=None, scheme='euler'):
+    """
+    Get the integration kernels of a backend.
+
+    Args:
+        backend: the requested backend, see ``resolve_backend``.
+        scheme: the integration scheme, 'euler' or one of the linear
+        schemes of ``lds.schemes``. Default to 'euler'.
+
+    Returns:
+        chunk: the single-trajectory kernel.
+        ensemble_chunk: the ensemble kernel.
+    """
+    backend = resolve_backend(backend)
+    family = 'euler' if scheme == 'euler' else 'linear'
+    if backend == 'numba':
+        return _compile_numba(family)
+    return _KERNELS[backend][family]
@@ -3,12 +3,22 @@
 
 import sys
 import os
+import time
 
 import argparse
 import numpy as np 
-import matplotlib
-matplotlib.use('Agg') # For python 3.4, choose backend before use
-import matplotlib.pyplot as plt
+
+from lds import profiling
+from lds.cache import DEFAULT_MAX_BYTES, ResultCache
+from lds.checkpoint import CHECKPOINT_FILE, Checkpoint, open_output, run_parameters
+from lds.first_passage import first_passage
+from lds.kernels import BACKENDS
+from lds.noise import NoiseSource
+from lds.potentials import from_spec
+from lds.schemes import SCHEMES, draw_noise, scheme_coefficients, scheme_kernels
+from lds.storage import BinaryWriter
+from lds.textio import COMPRESSIONS, open_text, write_lines
+from lds.trajectory import Trajectory
 
 
 def parse_args(args):
@@ -40,7 +50,57 @@ def parse_args(args):
     help='The wall size of the simulation process')
     parser.add_argument('-p', '--path', type=str, default='.', \
     help='Path to save the output file and graph, default to current directory')
-    return vars(parser.parse_args(args))
+    parser.add_argument('-s', '--seed', type=int, default=None, \
+    help='Seed of the random number generator, default to a random seed')
+    parser.add_argument('-n', '--runs', type=int, default=100, \
+    help='Number of runs of the first-passage histogram, default to 100')
+    parser.add_argument('-se', '--target_std_error', '--target-std-error', type=float, \
+    default=None, help='Stop the histogram runs once the standard error of the '\
+    'mean first-passage time is below this')
+    parser.add_argument('-re', '--record_every', '--record-every', type=int, default=1, \
+    help='Record one step out of every K steps, default to every step')
+    parser.add_argument('-b', '--backend', type=str, default=None, choices=BACKENDS, \
+    help='Integration backend, default to numba when installed, numpy otherwise')
+    parser.add_argument('-i', '--integrator', type=str, default='euler', choices=SCHEMES, \
+    help='Integration scheme, default to euler')
+    parser.add_argument('-mts', '--max_time_step', '--max-time-step', type=float, \
+    default=None, help='Largest adaptive time step of the histogram runs, which take '\
+    'steps of time_step only near the walls, needs --integrator ou, default to fixed '\
+    'steps')
+    parser.add_argument('--no_plot', '--no-plot', action='store_true', \
+    help='Skip drawing histogram.png and trajectory.png')
+    parser.add_argument('-f', '--format', type=str, default='text', choices=('text', 'binary'), \
+    help='Format of the output file, binary writes output.npy, default to text')
+    parser.add_argument('-z', '--compress', type=str, default=None, \
+    choices=sorted(COMPRESSIONS), help='Compress the text output file to output.gz '\
+    'or output.zst, zstd needs the zstandard package')
+    parser.add_argument('-pot', '--potential', type=str, default=None, \
+    help='External potential, e.g. harmonic:k=1,center=2.5, double_well:barrier=2,'\
+    'center=2.5,width=1, periodic:amplitude=1,period=1 or tabulated:file=table.txt, '\
+    'default to a free particle')
+    parser.add_argument('-ce', '--checkpoint_every', '--checkpoint-every', type=float, \
+    default=60, help='Seconds between two checkpoints of the run, default to 60')
+    parser.add_argument('--resume', action='store_true', \
+    help='Resume an interrupted run from the checkpoint in the output path')
+    parser.add_argument('--profile', type=str, nargs='?', const='profile.json', default=None, \
+    help='Save the time of each stage, steps per second, random draws, bytes written '\
+    'and peak memory as JSON in the output path, default to profile.json')
+    parser.add_argument('--cache_dir', '--cache-dir', type=str, default=None, \
+    help='Directory caching the histogram runs of seeded simulations, default to '\
+    '$LDS_CACHE_DIR or ~/.cache/lds')
+    parser.add_argument('--cache_size', '--cache-size', type=float, \
+    default=DEFAULT_MAX_BYTES / 2 ** 20, \
+    help='Size limit of the cache in MiB, least recently used results are removed, '\
+    'default to 1024')
+    parser.add_argument('--no_cache', '--no-cache', action='store_true', \
+    help='Always run the histogram runs, without reading or writing the cache')
+    parsed = parser.parse_args(args)
+    if parsed.max_time_step is not None and \
+       (parsed.integrator != 'ou' or parsed.potential is not None):
+        parser.error('--max-time-step needs --integrator ou and no --potential')
+    if parsed.compress is not None and parsed.format == 'binary':
+        parser.error('--compress only applies to the text output, not to --format binary')
+    return vars(parsed)
 
 
 def random_force(temperature, damping_coefficient, kB=1, dirac_delta=1):
@@ -64,8 +124,176 @@ def random_force(temperature, damping_coefficient, kB=1, dirac_delta=1):
     return float(np.random.normal(0.0, std_dev))
 
 
+def integrate_trajectory(damping_coefficient, initial_velocity, total_time, time_step, \
+                         temperature, initial_position, wall, kB=1, dirac_delta=1, \
+                         noise=None, chunk_size=65536, backend=None, scheme='euler', \
+                         potential=None, observers=()):
+    """
+    Integrate one run with any scheme, storing it in a Trajectory.
+
+    Takes the same arguments as ``euler_integrator``, but writes each step
+    into preallocated numpy arrays instead of growing python lists. Random
+    forces are drawn ``chunk_size`` steps at a time.
+
+    Args:
+        scheme: 'euler', 'baoab' or 'ou', see ``lds.schemes``. Default to
+        'euler'.
+        potential: a ``lds.potentials.Potential`` or a callable returning
+        the force at an array of positions. Default to None, a free particle.
+        observers: ``lds.observers`` objects updated with every step, chunk
+        by chunk. Default to none.
+
+    Returns:
+        trajectory: a Trajectory holding the velocity and position at each
+        time step, trimmed at the step where the particle hit a wall.
+    """
+
+    num_steps = int(total_time // time_step) # calculate the number of steps
+    if noise is None:
+        noise = NoiseSource(temperature, damping_coefficient, kB, dirac_delta)
+    coefficients = scheme_coefficients(scheme, damping_coefficient, initial_velocity, \
+                                       time_step, temperature, kB, dirac_delta)
+    chunk, _ = scheme_kernels(scheme, damping_coefficient, time_step, backend, potential)
+    trajectory = Trajectory(num_steps, time_step, initial_velocity, initial_position)
+    velocity_array = trajectory.velocity
+    position_array = trajectory.position
+    _observe(observers, velocity_array[:1], position_array[:1], time_step)
+
+    done = 0
+    while done < num_steps:
+        size = min(chunk_size, num_steps - done)
+        with profiling.stage('integrate'):
+            steps, side = chunk(velocity_array[done], position_array[done], \
+                                draw_noise(noise, scheme, size), coefficients, wall, \
+                                velocity_array[done + 1:], position_array[done + 1:])
+        profiling.count('steps', steps)
+        _observe(observers, velocity_array[done + 1:done + steps + 1], \
+                 position_array[done + 1:done + steps + 1], time_step, done + 1)
+        done += steps
+        if side != 0: # stopped on a wall
+            trajectory.trim(done + 1)
+            break
+
+    return trajectory
+
+
+def euler_trajectory(damping_coefficient, initial_velocity, total_time, time_step, \
+                     temperature, initial_position, wall, kB=1, dirac_delta=1, \
+                     noise=None, chunk_size=65536, backend=None):
+    """
+    A Euler Integration method storing the run in a Trajectory.
+
+    See ``integrate_trajectory``.
+    """
+
+    return integrate_trajectory(damping_coefficient, initial_velocity, total_time, \
+                                time_step, temperature, initial_position, wall, kB, \
+                                dirac_delta, noise, chunk_size, backend, scheme='euler')
+
+
+def stream_integrator(damping_coefficient, initial_velocity, total_time, time_step, \
+                      temperature, initial_position, wall, kB=1, dirac_delta=1, \
+                      noise=None, chunk_size=65536, record_every=1, backend=None, \
+                      scheme='euler', potential=None, checkpoint=None, observers=()):
+    """
+    An Integration method yielding the run in chunks.
+
+    Only ``chunk_size`` steps are kept in memory at once, and of those only
+    every ``record_every``-th step is yielded, so memory depends on the
+    number of recorded samples and not on ``total_time / time_step``. The
+    initial step and the last step (wall hit or end of the run) are always
+    recorded.
+
+    Takes the same arguments as ``euler_integrator``, plus:
+
+    Args:
+        chunk_size: how many steps are integrated between two yields.
+        record_every: keep one step out of ``record_every``. Default to 1.
+        scheme: 'euler', 'baoab' or 'ou', see ``lds.schemes``. Default to
+        'euler'.
+        potential: the external potential, see ``integrate_trajectory``.
+        checkpoint: a ``lds.checkpoint.Checkpoint`` updated with the state of
+        the run before each yield. When it already holds a state, the run
+        continues from it exactly as if it had not been interrupted. Default
+        to None.
+        observers: ``lds.observers`` objects updated with every step, not
+        only the recorded ones, before each yield. After a resume they only
+        see the steps after the checkpoint. Default to none.
+
+    Yields:
+        trajectory: a Trajectory with the recorded steps of the chunk, whose
+        ``index`` gives the step number of each sample.
+    """
+
+    num_steps = int(total_time // time_step) # calculate the number of steps
+    record_every = int(record_every)
+    chunk, _ = scheme_kernels(scheme, damping_coefficient, time_step, backend, potential)
+    if noise is None:
+        noise = NoiseSource(temperature, damping_coefficient, kB, dirac_delta)
+    coefficients = scheme_coefficients(scheme, damping_coefficient, initial_velocity, \
+                                       time_step, temperature, kB, dirac_delta)
+    chunk_size = min(int(chunk_size), max(num_steps, 1))
+    out_velocity = np.empty(chunk_size)
+    out_position = np.empty(chunk_size)
+
+    if checkpoint is not None and checkpoint.noise_state is not None: # resume
+        noise.set_state(checkpoint.noise_state)
+        velocity = checkpoint.velocity
+        position = checkpoint.position
+        done = num_steps if checkpoint.finished else checkpoint.step
+    else:
+        velocity = float(initial_velocity)
+        position = float(initial_position)
+        done = 0
+        if checkpoint is not None:
+            _update_checkpoint(checkpoint, done, velocity, position, noise, False)
+        _observe(observers, [velocity], [position], time_step)
+        yield Trajectory.from_arrays([velocity], [position], time_step, [0])
+    while done < num_steps:
+        size = min(chunk_size, num_steps - done)
+        with profiling.stage('integrate'):
+            steps, side = chunk(velocity, position, draw_noise(noise, scheme, size), \
+                                coefficients, wall, out_velocity, out_position)
+        profiling.count('steps', steps)
+        index = np.arange(done + 1, done + steps + 1)
+        _observe(observers, out_velocity[:steps], out_position[:steps], time_step, done + 1)
+        keep = index % record_every == 0
+        done += steps
+        if side != 0 or done == num_steps:
+            keep[-1] = True # always record the final state
+        velocity = out_velocity[steps - 1]
+        position = out_position[steps - 1]
+        if checkpoint is not None:
+            _update_checkpoint(checkpoint, done, velocity, position, noise, \
+                               side != 0 or done == num_steps)
+        yield Trajectory.from_arrays(out_velocity[:steps][keep], out_position[:steps][keep], \
+                                     time_step, index[keep])
+        if side != 0: # stopped on a wall
+            break
+
+
+def _observe(observers, velocity, position, time_step, start=0):
+    """Hand consecutive steps, starting at step ``start``, to the observers."""
+    if not observers:
+        return
+    steps = Trajectory.from_arrays(velocity, position, time_step, \
+                                   np.arange(start, start + len(velocity)))
+    for observer in observers:
+        observer.update(steps)
+
+
+def _update_checkpoint(checkpoint, step, velocity, position, noise, finished):
+    """Store the state of a run in a Checkpoint."""
+    checkpoint.step = int(step)
+    checkpoint.velocity = float(velocity)
+    checkpoint.position = float(position)
+    checkpoint.noise_state = noise.get_state()
+    checkpoint.finished = finished
+
+
 def euler_integrator(damping_coefficient, initial_velocity, total_time, time_step, \
-                    temperature, initial_position, wall, kB=1, dirac_delta=1):
+                    temperature, initial_position, wall, kB=1, dirac_delta=1, \
+                    noise=None, backend=None, potential=None):
     """
     A Euler Integration method.
 
@@ -79,6 +307,12 @@ def euler_integrator(damping_coefficient, initial_velocity, total_time, time_ste
         wall: the wall boundary for the system.
         kB: the Boltzman constant. Default to 1 in reduce unit.
         dirac_delta: dirac delta distribution of t-t'. Default to 1.
+        noise: a NoiseSource providing the random forces. Default to None,
+        which creates an unseeded one from the given parameters.
+        backend: 'numba', 'numpy' or 'python'. Default to None, which uses
+        Numba when it is installed and NumPy otherwise.
+        potential: a ``lds.potentials.Potential`` or a callable returning
+        the force at an array of positions. Default to None, a free particle.
 
     Returns:
         velocity_list: a list of velocities of the particle at each time step.
@@ -86,36 +320,48 @@ def euler_integrator(damping_coefficient, initial_velocity, total_time, time_ste
         time_list: a list of time steps.
     """
 
-    num_steps = int(total_time // time_step) # calculate the number of steps
-    drag_force = -damping_coefficient * initial_velocity # drag force calculation
-    # Initialize three lists to keep track of all data
-    velocity_list = list()
-    position_list = list()
-    time_list = list()
-    # append initial conditions
-    velocity_list.append(initial_velocity)
-    position_list.append(initial_position)
-    time_list.append(0.0)
-
-    for s in range(num_steps): # for every step, do:
-        # calculate the random force in equation
-        Xi = random_force(temperature, damping_coefficient, kB, dirac_delta)
-        acceleration = drag_force + Xi
-        new_velocity = velocity_list[-1]+acceleration*time_step 
-        new_position = position_list[-1]+velocity_list[-1]*time_step
-        new_time = time_list[-1] + time_step
-        velocity_list.append(new_velocity)
-        time_list.append(new_time)
-        if new_position > wall: # if hit wall at wall_size
-            position_list.append(wall)
-            break
-        elif new_position < 0: # if hit wall at 0
-            position_list.append(0)
-            break
-        else: # if not hitting the wall
-            position_list.append(new_position)
-        
-    return velocity_list, position_list, time_list
+    return integrate_trajectory(damping_coefficient, initial_velocity, total_time, \
+                                time_step, temperature, initial_position, wall, \
+                                kB, dirac_delta, noise, backend=backend, \
+                                potential=potential).tolist()
+
+
+def baoab_integrator(damping_coefficient, initial_velocity, total_time, time_step, \
+                     temperature, initial_position, wall, kB=1, dirac_delta=1, \
+                     noise=None, backend=None, potential=None):
+    """
+    A BAOAB Integration method, stable and accurate at larger time steps.
+
+    Takes the same arguments and returns the same lists as ``euler_integrator``.
+    """
+
+    return integrate_trajectory(damping_coefficient, initial_velocity, total_time, \
+                                time_step, temperature, initial_position, wall, \
+                                kB, dirac_delta, noise, backend=backend, \
+                                scheme='baoab', potential=potential).tolist()
+
+
+def ou_integrator(damping_coefficient, initial_velocity, total_time, time_step, \
+                  temperature, initial_position, wall, kB=1, dirac_delta=1, \
+                  noise=None, backend=None, potential=None):
+    """
+    An Ornstein-Uhlenbeck Integration method, exact for the free particle.
+
+    Takes the same arguments and returns the same lists as ``euler_integrator``.
+    """
+
+    return integrate_trajectory(damping_coefficient, initial_velocity, total_time, \
+                                time_step, temperature, initial_position, wall, \
+                                kB, dirac_delta, noise, backend=backend, \
+                                scheme='ou', potential=potential).tolist()
+
+
+# integrators sharing the signature of euler_integrator, by scheme name
+INTEGRATORS = {
+    'euler': euler_integrator,
+    'baoab': baoab_integrator,
+    'ou': ou_integrator,
+}
 
 
 def hit_wall(position_list, wall):
@@ -136,89 +382,227 @@ def hit_wall(position_list, wall):
     return False
 
 
-def output_file(velocity_list, position_list, time_list, file):
+def output_file(velocity_list, position_list, time_list=None, file=None):
     """
     Output results from calculation to the given path. 
+    Can also be called as ``output_file(trajectory, file)``.
+
+    Lines are formatted and written in large blocks by ``lds.textio``.
 
     Args:
-        velocity_list: a list contains the velocity at each time step.
-        position_list: a list contains the position at each time step.
+        velocity_list: a list contains the velocity at each time step,
+        or a Trajectory.
+        position_list: a list contains the position at each time step,
+        or the file writer when a Trajectory is given.
         time_list: a list contains each time step.
         file: a file writer, either StringIO or opened file in 'w' mode.
     """
-    for i, t in enumerate(time_list):
+    index_list = np.arange(len(time_list)) if time_list is not None else None
+    if isinstance(velocity_list, Trajectory):
+        file = position_list
+        index_list = velocity_list.index
+        velocity_list, position_list, time_list = velocity_list
+    with profiling.stage('output'):
         # write output file with specific precisions.
-        file.write('{0} {1:.2f} {2:.6f} {3:.6f}\n'\
-        .format(i, t, position_list[i], velocity_list[i]))
+        written = write_lines(index_list, time_list, position_list, velocity_list, file)
+    profiling.count('bytes_written', written)
 
 
-def plot_figures(wall_hitted, path, time_list, position_list):
+def plot_figures(wall_hitted, path, time_list, position_list=None, wall=5):
     """
     Output the plot of the whole simulation.
 
     Args:
-        wall_hitted: a numpy array that keeps track of how many times the 
-        particle hits the wall in 100 runs at what time step.
+        wall_hitted: a numpy array with the first-passage time of each run.
         path: the path to save figures.
-        time_list: a list contains each time step.
+        time_list: a list contains each time step, or a Trajectory.
         position_list: a list contains the postion at each time step.
+        Not needed when a Trajectory is given.
+        wall: the wall boundary for the system, where the walls are drawn.
+        Default to 5.
     
     Returns:
         hist_path: the path saved for the histogram.
         traj_path: the path saved for the trajectory.
     """
-    # first figure, histogram
-    plt.figure()   
-    plt.hist(wall_hitted)
-    # label x and y axis
-    plt.xlabel('Time (s)')
-    plt.ylabel('# of time hit wall')
-    hist_path = os.path.join(path, 'histogram.png')
-    plt.savefig(hist_path)
-
-    # second figure, trajectory
-    plt.figure()
-    plt.plot(time_list, position_list, '.')
-    plt.xlabel('Time (s)')
-    plt.ylabel('position')
-    # set the y limits
-    plt.ylim([-1, 6])
-    # plot the walls in red
-    plt.axhline(5, color='r')
-    plt.axhline(-0, color='r')
-    traj_path = os.path.join(path, 'trajectory.png')
-    plt.savefig(traj_path)
-    return hist_path, traj_path
-
-
-def main(args):
-    # get velocity, position and time steps from integrator
-    velocity_list, position_list, time_list = \
-    euler_integrator(args['damping_coefficient'], \
+    if isinstance(time_list, Trajectory):
+        position_list = time_list.position
+        time_list = time_list.time
+    # matplotlib is only imported when figures are drawn
+    from lds import plotting
+    with profiling.stage('plot'):
+        return plotting.plot_figures(wall_hitted, path, time_list, position_list, wall)
+
+
+def main(args, output=None, checkpoint=None):
+    """
+    Run a simulation from parsed arguments.
+
+    With the ``profile`` argument, the run is profiled and the report saved
+    in the output path, see ``lds.profiling``. Every ``checkpoint_every``
+    seconds, the state of the run is saved in
+    ``checkpoint.npz`` in the output path, which is removed once the run is
+    complete. Runs with a ``compress``ed output are not checkpointed.
+
+    Args:
+        args: a dict of arguments as returned by ``parse_args``.
+        output: a file writer or a BinaryWriter receiving each recorded chunk
+        as soon as it is integrated. Default to None, which writes nothing.
+        checkpoint: a Checkpoint to resume from, with ``output`` already cut
+        to its ``output_size``. The returned lists then start at the
+        checkpoint. Default to None, which starts a new run.
+
+    Returns:
+        velocity_list: a list of the recorded velocities.
+        position_list: a list of the recorded positions.
+        time_list: a list of the recorded times.
+    """
+    if args.get('profile'):
+        with profiling.profile(os.path.join(args['path'], args['profile'])):
+            result = _run(args, output, checkpoint)
+        print('{0} saved'.format(args['profile']))
+        return result
+    return _run(args, output, checkpoint)
+
+
+def histogram_runs(args, potential=None, runs=None):
+    """
+    Run the first-passage runs of the histogram.
+
+    Seeded runs draw from stream 1 of the seed, the single trajectory
+    drawing from stream 0, and are cached unless ``no_cache`` is set.
+
+    Args:
+        args: a dict of arguments as returned by ``parse_args``.
+        potential: the external potential built from ``args['potential']``.
+        runs: the number of runs. Default to None, which is ``args['runs']``.
+
+    Returns:
+        result: a ``lds.first_passage.FirstPassageResult``.
+    """
+    seed = args.get('seed')
+    # only seeded runs can give the same result again
+    cache = None
+    if seed is not None and not args.get('no_cache'):
+        cache = ResultCache(args.get('cache_dir'), \
+                            args.get('cache_size', DEFAULT_MAX_BYTES / 2 ** 20) * 2 ** 20)
+    return first_passage(args['damping_coefficient'], \
     args['initial_velocity'], \
     args['total_time'], \
     args['time_step'], \
     args['temperature'], \
     args['initial_position'], \
-    args['wall_size'])
+    args['wall_size'], \
+    runs=args.get('runs', 100) if runs is None else runs, \
+    noise=NoiseSource(args['temperature'], args['damping_coefficient'], \
+    seed=seed, stream=1), \
+    backend=args.get('backend'), \
+    target_std_error=args.get('target_std_error'), \
+    scheme=args.get('integrator', 'euler'), \
+    potential=potential, \
+    cache=cache, \
+    max_time_step=args.get('max_time_step'))
+
+
+def _run(args, output, checkpoint):
+    """The simulation of ``main``."""
+    seed = args.get('seed')
+    potential = from_spec(args['potential']) if args.get('potential') else None
+    checkpoint_path = os.path.join(args['path'], CHECKPOINT_FILE)
+    checkpoint_every = args.get('checkpoint_every')
+    if args.get('compress'): # a compressed output cannot be cut to resume
+        checkpoint_every = None
+    if checkpoint is None:
+        checkpoint = Checkpoint(parameters=run_parameters(args))
+    else:
+        checkpoint.check(run_parameters(args))
+    last_checkpoint = time.monotonic()
+    # get velocity, position and time steps from integrator,
+    # only the recorded steps of each chunk are kept
+    chunks = list()
+    for chunk in stream_integrator(args['damping_coefficient'], \
+    args['initial_velocity'], \
+    args['total_time'], \
+    args['time_step'], \
+    args['temperature'], \
+    args['initial_position'], \
+    args['wall_size'], \
+    noise=NoiseSource(args['temperature'], args['damping_coefficient'], \
+    seed=seed, stream=0), \
+    record_every=args.get('record_every', 1), \
+    backend=args.get('backend'), \
+    scheme=args.get('integrator', 'euler'), \
+    potential=potential, \
+    checkpoint=checkpoint):
+        if isinstance(output, BinaryWriter):
+            output.write(chunk)
+        elif output is not None:
+            output_file(chunk, output)
+        chunks.append(chunk)
+        if checkpoint_every is not None and \
+           time.monotonic() - last_checkpoint >= checkpoint_every:
+            if output is not None:
+                output.flush()
+                checkpoint.output_size = output.tell()
+            checkpoint.save(checkpoint_path)
+            last_checkpoint = time.monotonic()
+    if os.path.exists(checkpoint_path): # the run is complete
+        os.remove(checkpoint_path)
+    if not chunks: # resumed after the run was already complete
+        chunks.append(Trajectory.from_arrays([checkpoint.velocity], [checkpoint.position], \
+                      args['time_step'], [checkpoint.step]))
+    trajectory = Trajectory.from_arrays( \
+    np.concatenate([c.velocity for c in chunks]), \
+    np.concatenate([c.position for c in chunks]), \
+    args['time_step'], \
+    np.concatenate([c.index for c in chunks]))
 
-    print('The final position: ', position_list[-1])
-    print('The final velocity: ', velocity_list[-1])
+    print('The final position: ', trajectory.position[-1])
+    print('The final velocity: ', trajectory.velocity[-1])
     
-    print("Making a histogram by running 100 times the same simulation...")
-
-    wall_hitted = np.zeros(100)
-    # run 100 times with the same input to generate the histogram
-    for i in range(100):
-        v_list, p_list, t_list = \
-        euler_integrator(0.1, 0, 1000, 0.1, 300, 0, 5)
-        wall_hitted[i] = t_list[-1]
-    plot_figures(wall_hitted, args['path'], time_list, position_list)
-    print('histogram.png and trajectory.png saved')
-    return velocity_list, position_list, time_list
+    runs = args.get('runs', 100)
+    print("Making a histogram by running {0} times the same simulation...".format(runs))
+
+    # run the same input many times to generate the histogram,
+    # all trajectories are advanced together by the ensemble integrator
+    with profiling.stage('first_passage'):
+        result = histogram_runs(args, potential)
+    low, high = result.confidence_interval()
+    print('Mean first-passage time: {0:.6f} (95% CI {1:.6f} - {2:.6f}) over {3} runs'\
+    .format(result.mean, low, high, result.runs))
+    print('Fraction hitting 0, wall, none: {0:.3f} {1:.3f} {2:.3f}'\
+    .format(*result.side_fractions()))
+    if not args.get('no_plot'):
+        plot_figures(result.exit_times, args['path'], trajectory, wall=args['wall_size'])
+        print('histogram.png and trajectory.png saved')
+    # plain lists are kept as the return value for existing callers
+    return trajectory.tolist()
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['sweep']: # parameter sweep subcommand
+        from lds import sweep
+        sweep.main(sweep.parse_args(sys.argv[2:]))
+        sys.exit()
+    if sys.argv[1:2] == ['serve']: # job server subcommand
+        from lds import server
+        server.main(server.parse_args(sys.argv[2:]))
+        sys.exit()
     args = parse_args(sys.argv[1:])
-    velocity_list, position_list, time_list = main(args)
-    with open(os.path.join(args['path'], 'output'), 'w') as file:
-        output_file(velocity_list, position_list, time_list, file)
+    checkpoint = None
+    if args['resume'] and args['compress']:
+        sys.exit('A compressed output cannot be resumed')
+    if args['resume']:
+        checkpoint_path = os.path.join(args['path'], CHECKPOINT_FILE)
+        if not os.path.exists(checkpoint_path):
+            sys.exit('No checkpoint to resume from at {0}'.format(checkpoint_path))
+        checkpoint = Checkpoint.load(checkpoint_path)
+    size = None if checkpoint is None else checkpoint.output_size
+    if args['format'] == 'binary':
+        with BinaryWriter(os.path.join(args['path'], 'output.npy'), size) as writer:
+            main(args, writer, checkpoint)
+    elif args['compress']:
+        with open_text(os.path.join(args['path'], 'output'), args['compress']) as file:
+            main(args, file)
+    else:
+        with open_output(os.path.join(args['path'], 'output'), size) as file:
+            main(args, file, checkpoint)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""Block-buffered random force generation."""
+
+import numpy as np
+
+from lds import profiling
+
+
+class NoiseSource(object):
+    """
+    A source of gaussian random forces for the integrators.
+
+    The standard deviation sqrt(2 * T * gamma * kB * delta) is computed once,
+    and normal samples are drawn from a ``numpy.random.Generator`` in large
+    blocks that are handed out as the integrators ask for them.
+
+    Args:
+        temperature: the current operating temperature of the system.
+        damping_coefficient: the damping coefficient of the system.
+        kB: The Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+        seed: the seed of the random stream. Default to None, which takes
+        fresh entropy from the operating system.
+        stream: the index of the stream spawned from ``seed``. Different
+        streams of the same seed are statistically independent.
+        block_size: how many samples are generated per refill.
+    """
+
+    def __init__(self, temperature, damping_coefficient, kB=1, dirac_delta=1, \
+                 seed=None, stream=0, block_size=65536):
+        self.temperature = temperature
+        self.damping_coefficient = damping_coefficient
+        self.kB = kB
+        self.dirac_delta = dirac_delta
+        variance = 2 * temperature * damping_coefficient * kB * dirac_delta
+        self.std_dev = float(np.sqrt(variance))
+        self.stream = int(stream)
+        self.block_size = int(block_size)
+        seed_sequence = np.random.SeedSequence(seed, spawn_key=(self.stream,))
+        # keep the drawn entropy so that a seedless source can be reproduced
+        self.seed = seed_sequence.entropy
+        self.generator = np.random.Generator(np.random.PCG64(seed_sequence))
+        self._buffer = np.empty(0)
+        self._position = 0
+        self._refill_state = None
+
+    def _refill(self):
+        """Generate a new block of standard normal samples."""
+        # the state the block was drawn from, enough to rebuild it
+        self._refill_state = self.generator.bit_generator.state
+        with profiling.stage('random_force'):
+            self._buffer = self.generator.standard_normal(self.block_size)
+        profiling.count('rng_draws', self.block_size)
+        self._position = 0
+
+    def get_state(self):
+        """
+        Snapshot the position in the random stream.
+
+        The block being handed out is not saved, only the bit generator
+        state it was drawn from and how much of it was used.
+
+        Returns:
+            state: a dict of plain python values, which can be saved as JSON.
+        """
+        buffered = self._buffer.size > 0
+        return {'bit_generator': self._refill_state if buffered else \
+                self.generator.bit_generator.state,
+                'buffered': buffered,
+                'position': self._position,
+                'block_size': self.block_size}
+
+    def set_state(self, state):
+        """
+        Continue the random stream from a snapshot of ``get_state``.
+
+        Args:
+            state: a dict returned by ``get_state``.
+        """
+        if state['block_size'] != self.block_size:
+            raise ValueError('The state was saved with a block size of {0}, not {1}'\
+                             .format(state['block_size'], self.block_size))
+        self.generator.bit_generator.state = state['bit_generator']
+        self._buffer = np.empty(0)
+        self._position = 0
+        if state['buffered']:
+            self._refill()
+            self._position = state['position']
+
+    def draw(self, size=None, standard=False):
+        """
+        Draw random forces from the buffered stream.
+
+        Args:
+            size: the number of samples. Default to None for a single float.
+            standard: return standard normal numbers instead of random
+            forces. Default to False.
+
+        Returns:
+            a float, or a numpy array of ``size`` random forces.
+        """
+        scale = 1.0 if standard else self.std_dev
+        if size is None:
+            if self._position >= self._buffer.size:
+                self._refill()
+            value = self._buffer[self._position]
+            self._position += 1
+            return float(scale * value)
+
+        out = np.empty(int(size))
+        filled = 0
+        while filled < out.size:
+            if self._position >= self._buffer.size:
+                self._refill()
+            take = min(out.size - filled, self._buffer.size - self._position)
+            out[filled:filled + take] = \
+                self._buffer[self._position:self._position + take]
+            self._position += take
+            filled += take
+        if not standard:
+            out *= scale
+        return out
+
+    def spawn(self, num_streams):
+        """
+        Create independent noise sources for parallel workers.
+
+        Args:
+            num_streams: how many sources to create.
+
+        Returns:
+            a list of NoiseSource objects sharing this seed, one per stream
+            index after this one.
+        """
+        return [self.with_stream(self.stream + 1 + i) for i in range(num_streams)]
+
+    def with_stream(self, stream):
+        """
+        Create a noise source with the same parameters on another stream.
+
+        Args:
+            stream: the index of the new stream.
+
+        Returns:
+            a NoiseSource drawing from the given stream of this seed.
+        """
+        return NoiseSource(self.temperature, self.damping_coefficient, self.kB, \
+                           self.dirac_delta, seed=self.seed, stream=stream, \
+                           block_size=self.block_size)
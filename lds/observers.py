@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming statistics of a run, updated while it is integrated.
+
+Observers are handed every step of a run, chunk by chunk, by
+``stream_integrator`` and ``integrate_trajectory``, and keep a bounded
+amount of state whatever the length of the run::
+
+    moments = MomentsObserver('velocity')
+    density = DensityObserver(wall, bins=50)
+    for chunk in stream_integrator(..., observers=[moments, density]):
+        pass
+    print(moments.kinetic_temperature(), density.density())
+
+Correlation observers cut the run in consecutive windows of fixed length
+and average their estimates over the windows. The last, incomplete window
+of a run is left out.
+"""
+
+import numpy as np
+
+from lds.first_passage import RunningStats
+
+
+class Observer(object):
+    """
+    Base class of streaming observers.
+
+    Subclasses implement ``update``, which receives the steps of a run in
+    order, each step exactly once.
+    """
+
+    def update(self, trajectory):
+        """
+        Add consecutive steps of a run.
+
+        Args:
+            trajectory: a Trajectory holding the new steps.
+        """
+        raise NotImplementedError
+
+
+class MomentsObserver(Observer):
+    """
+    Running mean and variance of the velocity or the position.
+
+    Args:
+        quantity: 'velocity' or 'position'. Default to 'velocity'.
+
+    Attributes:
+        stats: the RunningStats of the observed values.
+    """
+
+    def __init__(self, quantity='velocity'):
+        if quantity not in ('velocity', 'position'):
+            raise ValueError('Can only observe velocity or position, not {0}'\
+                             .format(quantity))
+        self.quantity = quantity
+        self.stats = RunningStats()
+
+    def update(self, trajectory):
+        self.stats.update(getattr(trajectory, self.quantity))
+
+    @property
+    def count(self):
+        """the number of observed steps."""
+        return self.stats.count
+
+    @property
+    def mean(self):
+        """the mean of the observed values."""
+        return self.stats.mean
+
+    @property
+    def variance(self):
+        """the unbiased variance of the observed values."""
+        return self.stats.variance
+
+    def kinetic_temperature(self, kB=1, mass=1):
+        """
+        Temperature from the mean kinetic energy, m <v^2> / kB.
+
+        Args:
+            kB: the Boltzman constant. Default to 1 in reduce unit.
+            mass: the mass of the particle. Default to 1.
+
+        Returns:
+            the kinetic temperature, nan with less than two steps.
+        """
+        count = self.stats.count
+        mean_square = self.stats.variance * (count - 1) / count + self.stats.mean ** 2 \
+            if count > 1 else float('nan')
+        return mass * mean_square / kB
+
+
+class DensityObserver(Observer):
+    """
+    Histogram of the positions visited between the walls.
+
+    Args:
+        wall: the wall boundary for the system.
+        bins: the number of bins between 0 and ``wall``. Default to 50.
+
+    Attributes:
+        counts: an integer array with the number of steps in each bin.
+        edges: an array with the ``bins + 1`` bin edges.
+    """
+
+    def __init__(self, wall, bins=50):
+        self.wall = float(wall)
+        self.bins = int(bins)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.edges = np.linspace(0, self.wall, self.bins + 1)
+
+    def update(self, trajectory):
+        index = (trajectory.position * (self.bins / self.wall)).astype(np.int64)
+        self.counts += np.bincount(np.clip(index, 0, self.bins - 1), minlength=self.bins)
+
+    def density(self):
+        """
+        Normalized probability density of the position.
+
+        Returns:
+            an array with the density in each bin, integrating to 1.
+        """
+        total = self.counts.sum()
+        if total == 0:
+            return np.zeros(self.bins)
+        return self.counts / (total * (self.wall / self.bins))
+
+
+class _WindowObserver(Observer):
+    """
+    Average of a per-window estimate over consecutive windows of a run.
+
+    Samples are buffered until a window is complete, so chunks don't have
+    to line up with windows. Subclasses implement ``_estimate``.
+
+    Args:
+        window: the number of steps of a window.
+        quantity: 'velocity' or 'position'.
+    """
+
+    def __init__(self, window, quantity):
+        self.window = int(window)
+        self.quantity = quantity
+        self.time_step = None
+        self.windows = 0
+        self._sum = np.zeros(self.window)
+        self._sum_squares = np.zeros(self.window)
+        self._pending = np.empty(0)
+
+    def _estimate(self, blocks):
+        """
+        Estimate the statistic on each window.
+
+        Args:
+            blocks: an array of shape (windows, window) of samples.
+
+        Returns:
+            an array of shape (windows, window), one estimate per lag.
+        """
+        raise NotImplementedError
+
+    def update(self, trajectory):
+        self.time_step = trajectory.time_step
+        values = np.concatenate([self._pending, getattr(trajectory, self.quantity)])
+        full = values.size // self.window
+        if full:
+            estimates = self._estimate(values[:full * self.window].reshape(full, -1))
+            self._sum += estimates.sum(axis=0)
+            self._sum_squares += (estimates ** 2).sum(axis=0)
+            self.windows += full
+        self._pending = values[full * self.window:].copy()
+
+    @property
+    def lags(self):
+        """an array with the time of each lag."""
+        return np.arange(self.window) * (self.time_step or 0.0)
+
+    def mean(self):
+        """
+        The estimate averaged over the windows.
+
+        Returns:
+            an array with one value per lag, nan before the first window.
+        """
+        if self.windows == 0:
+            return np.full(self.window, np.nan)
+        return self._sum / self.windows
+
+    def std_error(self):
+        """
+        Standard error of the averaged estimate, from the spread of the windows.
+
+        Returns:
+            an array with one value per lag, nan with less than two windows.
+        """
+        if self.windows < 2:
+            return np.full(self.window, np.nan)
+        mean = self._sum / self.windows
+        variance = (self._sum_squares - self.windows * mean ** 2) / (self.windows - 1)
+        return np.sqrt(np.maximum(variance, 0) / self.windows)
+
+
+def _lagged_products(blocks):
+    """
+    Mean of x(t) x(t + k) over the time origins of each window, with FFTs.
+
+    Args:
+        blocks: an array of shape (windows, window).
+
+    Returns:
+        an array of shape (windows, window), the lag k in the last axis.
+    """
+    size = blocks.shape[1]
+    # zero padding to twice the length turns the circular correlation linear
+    spectrum = np.fft.rfft(blocks, n=2 * size, axis=1)
+    sums = np.fft.irfft(spectrum * spectrum.conj(), n=2 * size, axis=1)[:, :size]
+    return sums / (size - np.arange(size))
+
+
+class AutocorrelationObserver(_WindowObserver):
+    """
+    Velocity autocorrelation <v(t) v(t + k dt)>, by FFT over fixed windows.
+
+    Args:
+        window: the number of steps of a window, the longest lag being
+        ``window - 1`` steps. Default to 256.
+    """
+
+    def __init__(self, window=256):
+        super(AutocorrelationObserver, self).__init__(window, 'velocity')
+
+    def _estimate(self, blocks):
+        return _lagged_products(blocks)
+
+
+class MSDObserver(_WindowObserver):
+    """
+    Mean squared displacement <(x(t + k dt) - x(t))^2>, averaged over blocks.
+
+    Each window gives an estimate from all its time origins, computed with
+    FFTs, and the spread of the blocks gives the standard error.
+
+    Args:
+        window: the number of steps of a window, the longest lag being
+        ``window - 1`` steps. Default to 256.
+    """
+
+    def __init__(self, window=256):
+        super(MSDObserver, self).__init__(window, 'position')
+
+    def _estimate(self, blocks):
+        size = blocks.shape[1]
+        blocks = blocks - blocks.mean(axis=1, keepdims=True)
+        squares = blocks ** 2
+        zero = np.zeros((blocks.shape[0], 1))
+        # sum of x(t)^2 + x(t + k)^2 over the time origins of each lag
+        head = np.cumsum(np.concatenate([zero, squares], axis=1), axis=1)[:, :size]
+        tail = np.cumsum(np.concatenate([zero, squares[:, ::-1]], axis=1), axis=1)[:, :size]
+        total = 2 * squares.sum(axis=1, keepdims=True)
+        return (total - head - tail) / (size - np.arange(size)) \
+            - 2 * _lagged_products(blocks)
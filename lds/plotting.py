@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Figures of a simulation.
+
+This module imports matplotlib, so it is only imported when figures are
+actually drawn. The trajectory is decimated and the histogram binned
+before they reach matplotlib, see ``lds.decimate``, so drawing takes about
+the same time for any number of steps or runs.
+"""
+
+import os
+
+import matplotlib
+matplotlib.use('Agg') # For python 3.4, choose backend before use
+import matplotlib.pyplot as plt
+import numpy as np
+
+from lds.decimate import PLOT_POINTS, BinnedHistogram, minmax_decimate
+
+
+def plot_figures(wall_hitted, path, time_list, position_list, wall=5, \
+                 max_points=PLOT_POINTS, bins=10):
+    """
+    Output the plot of the whole simulation.
+
+    Args:
+        wall_hitted: a numpy array with the first-passage time of each run.
+        path: the path to save figures.
+        time_list: a list contains each time step.
+        position_list: a list contains the postion at each time step.
+        wall: the wall boundary for the system. Default to 5.
+        max_points: the largest number of points of the trajectory drawn,
+        see ``lds.decimate.minmax_decimate``. Default to 4000.
+        bins: the number of bins of the histogram. Default to 10.
+    
+    Returns:
+        hist_path: the path saved for the histogram.
+        traj_path: the path saved for the trajectory.
+    """
+    # first figure, histogram
+    wall_hitted = np.asarray(wall_hitted, dtype=float)
+    if wall_hitted.size > 0:
+        histogram = BinnedHistogram(bins, wall_hitted.min(), wall_hitted.max())\
+            .update(wall_hitted)
+    else:
+        histogram = BinnedHistogram(bins, 0.0, 1.0)
+    edges = histogram.edges
+    plt.figure()   
+    plt.hist(edges[:-1], edges, weights=histogram.counts)
+    # label x and y axis
+    plt.xlabel('Time (s)')
+    plt.ylabel('# of time hit wall')
+    hist_path = os.path.join(path, 'histogram.png')
+    plt.savefig(hist_path)
+    plt.close()
+
+    # second figure, trajectory
+    time_list, position_list = minmax_decimate(time_list, position_list, max_points)
+    plt.figure()
+    # a line through the extremes of each bucket fills the same band as every point
+    plt.plot(time_list, position_list, linewidth=0.5)
+    plt.xlabel('Time (s)')
+    plt.ylabel('position')
+    # set the y limits around the walls
+    plt.ylim([-0.2 * wall, 1.2 * wall])
+    # plot the walls in red
+    plt.axhline(wall, color='r')
+    plt.axhline(0, color='r')
+    traj_path = os.path.join(path, 'trajectory.png')
+    plt.savefig(traj_path)
+    plt.close()
+    return hist_path, traj_path
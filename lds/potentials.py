@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+External potentials acting on the particle between the walls.
+
+Every potential maps an array of positions to an array of forces with numpy
+operations, so a whole ensemble is evaluated at once. A plain callable
+taking and returning numpy arrays can be used as a force as well.
+"""
+
+import numpy as np
+
+
+class Potential(object):
+    """
+    Base class of external potentials.
+
+    Subclasses implement ``force`` and ``energy`` for arrays of positions.
+    Calling a potential returns its force.
+    """
+
+    def force(self, x):
+        """
+        Force at the given positions, minus the gradient of the energy.
+
+        Args:
+            x: an array of positions.
+
+        Returns:
+            an array of forces.
+        """
+        raise NotImplementedError
+
+    def energy(self, x):
+        """
+        Potential energy at the given positions.
+
+        Args:
+            x: an array of positions.
+
+        Returns:
+            an array of energies.
+        """
+        raise NotImplementedError
+
+    def __call__(self, x):
+        return self.force(x)
+
+
+class HarmonicPotential(Potential):
+    """
+    U(x) = k / 2 * (x - center)^2
+
+    Args:
+        k: the spring constant.
+        center: the position of the minimum.
+    """
+
+    def __init__(self, k=1.0, center=0.0):
+        self.k = float(k)
+        self.center = float(center)
+
+    def force(self, x):
+        return -self.k * (x - self.center)
+
+    def energy(self, x):
+        return 0.5 * self.k * (x - self.center) ** 2
+
+
+class DoubleWellPotential(Potential):
+    """
+    U(x) = barrier * ((x - center)^2 / width^2 - 1)^2
+
+    Args:
+        barrier: the height of the barrier between the two wells.
+        center: the position of the barrier.
+        width: the distance from the barrier to each minimum.
+    """
+
+    def __init__(self, barrier=1.0, center=0.0, width=1.0):
+        self.barrier = float(barrier)
+        self.center = float(center)
+        self.width = float(width)
+
+    def force(self, x):
+        s = (x - self.center) / self.width
+        return -4 * self.barrier * s * (s * s - 1) / self.width
+
+    def energy(self, x):
+        s = (x - self.center) / self.width
+        return self.barrier * (s * s - 1) ** 2
+
+
+class PeriodicPotential(Potential):
+    """
+    U(x) = amplitude * cos(2 pi (x - phase) / period)
+
+    Args:
+        amplitude: the half height of the potential.
+        period: the spatial period.
+        phase: the position of a maximum.
+    """
+
+    def __init__(self, amplitude=1.0, period=1.0, phase=0.0):
+        self.amplitude = float(amplitude)
+        self.period = float(period)
+        self.phase = float(phase)
+
+    def force(self, x):
+        wave = 2 * np.pi / self.period
+        return self.amplitude * wave * np.sin(wave * (x - self.phase))
+
+    def energy(self, x):
+        return self.amplitude * np.cos(2 * np.pi / self.period * (x - self.phase))
+
+
+class TabulatedPotential(Potential):
+    """
+    A potential given by its values on a uniform grid.
+
+    The force is precomputed on the grid, and looked up by linear
+    interpolation from the index ``(x - x_min) / dx``, which costs the same
+    few array operations whatever the size of the table. Positions outside
+    of the grid get the force of the closest end.
+
+    Args:
+        x_min: the position of the first grid point.
+        x_max: the position of the last grid point.
+        energies: an array with the energy at each grid point.
+    """
+
+    def __init__(self, x_min, x_max, energies):
+        self.energies = np.asarray(energies, dtype=float)
+        if self.energies.size < 2:
+            raise ValueError('A tabulated potential needs at least two grid points')
+        self.x_min = float(x_min)
+        self.x_max = float(x_max)
+        self.dx = (self.x_max - self.x_min) / (self.energies.size - 1)
+        self.forces = -np.gradient(self.energies, self.dx)
+
+    @classmethod
+    def from_function(cls, energy, x_min, x_max, points=4096):
+        """
+        Tabulate a potential energy function.
+
+        Args:
+            energy: a callable mapping an array of positions to energies.
+            x_min: the start of the grid.
+            x_max: the end of the grid.
+            points: the number of grid points. Default to 4096.
+
+        Returns:
+            potential: a TabulatedPotential.
+        """
+        return cls(x_min, x_max, energy(np.linspace(x_min, x_max, int(points))))
+
+    def _interpolate(self, table, x):
+        """Linear interpolation of a grid table at the given positions."""
+        s = np.clip((np.asarray(x, dtype=float) - self.x_min) / self.dx, \
+                    0, table.size - 1)
+        i = np.minimum(s.astype(np.intp), table.size - 2)
+        t = s - i
+        return table[i] + t * (table[i + 1] - table[i])
+
+    def force(self, x):
+        return self._interpolate(self.forces, x)
+
+    def energy(self, x):
+        return self._interpolate(self.energies, x)
+
+
+class CallablePotential(Potential):
+    """
+    A potential from user functions.
+
+    Args:
+        force: a callable mapping an array of positions to forces.
+        energy: a callable mapping an array of positions to energies.
+        Default to None when the energy is not known.
+    """
+
+    def __init__(self, force, energy=None):
+        self._force = force
+        self._energy = energy
+
+    def force(self, x):
+        return np.asarray(self._force(x), dtype=float)
+
+    def energy(self, x):
+        if self._energy is None:
+            raise NotImplementedError('No energy function was given')
+        return np.asarray(self._energy(x), dtype=float)
+
+
+def as_potential(potential):
+    """
+    Turn a force callable into a Potential.
+
+    Args:
+        potential: a Potential, a callable returning forces, or None.
+
+    Returns:
+        a Potential, or None.
+    """
+    if potential is None or isinstance(potential, Potential):
+        return potential
+    if callable(potential):
+        return CallablePotential(potential)
+    raise TypeError('A potential must be a Potential or a callable, not {0}'\
+                    .format(type(potential).__name__))
+
+
+POTENTIALS = {
+    'harmonic': HarmonicPotential,
+    'double_well': DoubleWellPotential,
+    'periodic': PeriodicPotential,
+}
+
+
+def from_spec(spec):
+    """
+    Build a potential from a command line description.
+
+    The description is the name of the potential, then its parameters::
+
+        harmonic:k=2,center=2.5
+        double_well:barrier=3,center=2.5,width=1
+        periodic:amplitude=1,period=0.5
+        tabulated:file=potential.txt
+
+    A tabulated potential is read from a text file with a uniform column of
+    positions and a column of energies.
+
+    Args:
+        spec: the description string.
+
+    Returns:
+        potential: a Potential.
+    """
+    name, _, parameters = spec.partition(':')
+    options = dict(item.split('=', 1) for item in parameters.split(',') if item)
+    if name == 'tabulated':
+        table = np.loadtxt(options['file'])
+        return TabulatedPotential(table[0, 0], table[-1, 0], table[:, 1])
+    if name not in POTENTIALS:
+        raise ValueError('Unknown potential {0}, choose from {1}'\
+                         .format(name, sorted(POTENTIALS) + ['tabulated']))
+    return POTENTIALS[name](**dict((key, float(value)) for key, value in options.items()))
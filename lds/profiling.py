@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation of the simulator hot paths.
+
+The integrators, the noise source and the writers report to the active
+Profiler, if any, at the granularity of chunks, never of single steps, so
+the hooks cost a global lookup when no profiler is active::
+
+    with profile('profile.json') as profiler:
+        main(args)
+    print(profiler.report()['steps_per_second'])
+
+Stages are named sections of the run, and may be nested: the time spent
+drawing random forces is part of the time spent integrating as well.
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+# the profiler the hooks report to, None when profiling is off
+_ACTIVE = None
+
+
+class _NullStage(object):
+    """A reusable context manager doing nothing, for stages when profiling is off."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler(object):
+    """
+    Wall time per stage and counters of a run.
+
+    Counters used by the simulator are ``steps`` (single-trajectory steps),
+    ``ensemble_steps`` (particle steps of the ensemble integrator),
+    ``rng_draws`` (random numbers generated) and ``bytes_written``.
+
+    Args:
+        trace_memory: trace the peak memory allocated during the run with
+        ``tracemalloc``, which slows down python code. Default to True.
+        Inside a tracing session already running, the peak before python
+        3.9 is that of the whole session.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = dict()
+        self.counters = dict()
+        self.peak_memory = None
+        self._start = None
+        self._elapsed = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a section of the run, adding up over repeated sections.
+
+        Args:
+            name: the name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds, calls = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (seconds + time.perf_counter() - start, calls + 1)
+
+    def count(self, name, value=1):
+        """
+        Add to a counter.
+
+        Args:
+            name: the name of the counter.
+            value: the amount to add. Default to 1.
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def start(self):
+        """Start the clock and the memory tracing."""
+        self._start = time.perf_counter()
+        if self.trace_memory:
+            # leave an outer tracing session running
+            self._owns_tracing = not tracemalloc.is_tracing()
+            if self._owns_tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, 'reset_peak'): # python 3.9+
+                tracemalloc.reset_peak()
+
+    def stop(self):
+        """Stop the clock and the memory tracing."""
+        self._elapsed += time.perf_counter() - self._start
+        if self.trace_memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self._owns_tracing:
+                tracemalloc.stop()
+
+    def report(self):
+        """
+        Summary of the run.
+
+        Returns:
+            report: a dict with the total time, the time and number of calls
+            of each stage, the counters, the single-trajectory and ensemble
+            steps per second of their stages, the peak traced memory and the
+            peak resident memory of the process, in bytes.
+        """
+        def rate(counter, stage):
+            seconds = self.stages.get(stage, (0.0, 0))[0]
+            return self.counters[counter] / seconds \
+                if seconds > 0 and counter in self.counters else None
+        max_rss = None
+        if resource is not None: # kilobytes on linux
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return {
+            'total_seconds': self._elapsed,
+            'stages': dict((name, {'seconds': seconds, 'calls': calls}) \
+                           for name, (seconds, calls) in self.stages.items()),
+            'counters': dict(self.counters),
+            'steps_per_second': rate('steps', 'integrate'),
+            'ensemble_steps_per_second': rate('ensemble_steps', 'ensemble'),
+            'peak_memory_bytes': self.peak_memory,
+            'max_rss_bytes': max_rss,
+        }
+
+    def write(self, path):
+        """
+        Save the report as JSON.
+
+        Args:
+            path: the path of the JSON file.
+        """
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2, sort_keys=True)
+
+
+@contextmanager
+def profile(path=None, trace_memory=True):
+    """
+    Profile the simulator within a block.
+
+    Args:
+        path: a JSON file receiving the report at the end of the block.
+        Default to None, which writes nothing.
+        trace_memory: see Profiler. Default to True.
+
+    Yields:
+        profiler: the active Profiler.
+    """
+    global _ACTIVE
+    profiler = Profiler(trace_memory)
+    previous = _ACTIVE
+    _ACTIVE = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _ACTIVE = previous
+        if path is not None:
+            profiler.write(path)
+
+
+def stage(name):
+    """
+    Time a section of the run with the active profiler.
+
+    Args:
+        name: the name of the stage.
+
+    Returns:
+        a context manager, which does nothing when profiling is off.
+    """
+    if _ACTIVE is None:
+        return _NULL_STAGE
+    return _ACTIVE.stage(name)
+
+
+def count(name, value=1):
+    """
+    Add to a counter of the active profiler, if any.
+
+    Args:
+        name: the name of the counter.
+        value: the amount to add. Default to 1.
+    """
+    if _ACTIVE is not None:
+        _ACTIVE.count(name, value)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Integration schemes of the Langevin equation.
+
+* ``'euler'``: the original first order scheme of ``euler_integrator``,
+  with the drag force computed once from the initial velocity.
+* ``'baoab'``: the BAOAB splitting, half drift, exact Ornstein-Uhlenbeck
+  velocity update, half drift. Samples the equilibrium velocity variance
+  ``kB * T`` exactly whatever the time step.
+* ``'ou'``: the exact update of a free particle, where velocity and
+  position are drawn from their joint gaussian distribution after ``dt``
+  (Gillespie 1996). Exact at any time step between the walls.
+
+The random forces of BAOAB and OU follow the fluctuation-dissipation
+relation of the continuous equation, <xi(t) xi(t')> = 2 gamma kB T
+delta(t - t'), with ``dirac_delta`` scaling the temperature as it scales the
+variance of ``random_force``.
+
+In an external potential, the force is added to the drag of Euler, split in
+two half kicks around the velocity update of BAOAB, and held constant over
+the step of OU, which is then no longer exact.
+"""
+
+import numpy as np
+
+from lds.kernels import force_kernels, get_kernels
+from lds.potentials import as_potential
+
+SCHEMES = ('euler', 'baoab', 'ou')
+
+
+def _position_variance_factor(u):
+    """
+    2u - 3 + 4exp(-u) - exp(-2u), without cancellation at small u.
+
+    Args:
+        u: damping_coefficient * time_step.
+
+    Returns:
+        the factor of kB T / gamma^2 in the variance of the position.
+    """
+    if u > 0.5:
+        return 2 * u - 3 + 4 * np.exp(-u) - np.exp(-2 * u)
+    # taylor series, the terms up to u^2 cancel out
+    total = 0.0
+    factorial = 2.0
+    for n in range(3, 20):
+        factorial *= n
+        total += (4 * (-1) ** n - (-2) ** n) * u ** n / factorial
+    return total
+
+
+def scheme_coefficients(scheme, damping_coefficient, initial_velocity, time_step, \
+                        temperature, kB=1, dirac_delta=1):
+    """
+    Compute the constant coefficients of one step of a scheme.
+
+    Args:
+        scheme: one of ``SCHEMES``.
+        damping_coefficient: the damping coefficient of the system.
+        initial_velocity: the initial velocity of the particle.
+        time_step: the time step (dt) to be integrated on.
+        temperature: the temperature of the system.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+
+    Returns:
+        coefficients: a tuple of floats. (drag_force, time_step) for Euler,
+        (a, c, d, e, g, h) for the linear schemes, see
+        ``lds.kernels.linear_chunk_python``.
+    """
+    if scheme == 'euler':
+        return float(-damping_coefficient * initial_velocity), float(time_step)
+    if scheme not in SCHEMES:
+        raise ValueError('Unknown scheme {0}, choose from {1}'.format(scheme, SCHEMES))
+
+    gamma = float(damping_coefficient)
+    kT = float(kB * temperature * dirac_delta)
+    u = gamma * time_step
+    a = float(np.exp(-u))
+    # 1 - a and 1 - a^2 without cancellation at small gamma * dt
+    one_minus_a = -float(np.expm1(-u))
+    velocity_std = float(np.sqrt(kT * -np.expm1(-2 * u)))
+    if scheme == 'baoab':
+        half = 0.5 * time_step
+        return a, velocity_std, half, half, 0.0, 0.0
+
+    if gamma == 0: # free flight, no friction and no noise
+        return 1.0, 0.0, float(time_step), 0.0, 0.0, 0.0
+    position_variance = kT / gamma ** 2 * _position_variance_factor(u)
+    covariance = kT / gamma * one_minus_a ** 2
+    # split the position noise in a part correlated with the velocity noise
+    g = covariance / velocity_std if velocity_std > 0 else 0.0
+    h = float(np.sqrt(max(position_variance - g ** 2, 0.0)))
+    return a, velocity_std, one_minus_a / gamma, 0.0, g, h
+
+
+def force_coefficients(scheme, damping_coefficient, time_step):
+    """
+    Velocity and position gained over one step of OU from a unit force.
+
+    The force is held constant over the step, and integrated exactly with the
+    friction.
+
+    Args:
+        scheme: one of ``SCHEMES``.
+        damping_coefficient: the damping coefficient of the system.
+        time_step: the time step (dt) to be integrated on.
+
+    Returns:
+        fv: the gain of the velocity, (1 - exp(-gamma dt)) / gamma.
+        fx: the gain of the position, (dt - fv) / gamma.
+        Both are 0 for the other schemes, which handle the force themselves.
+    """
+    if scheme != 'ou':
+        return 0.0, 0.0
+    gamma = float(damping_coefficient)
+    if gamma == 0: # free flight under a constant force
+        return float(time_step), 0.5 * time_step ** 2
+    u = gamma * time_step
+    one_minus_a = -float(np.expm1(-u))
+    return one_minus_a / gamma, float(u + np.expm1(-u)) / gamma ** 2
+
+
+def scheme_kernels(scheme, damping_coefficient, time_step, backend=None, potential=None):
+    """
+    Get the integration kernels of a scheme, with or without a potential.
+
+    Args:
+        scheme: one of ``SCHEMES``.
+        damping_coefficient: the damping coefficient of the system.
+        time_step: the time step (dt) to be integrated on.
+        backend: the integration backend, see ``lds.kernels``. Ignored with
+        a potential, whose kernels are vectorized over particles instead.
+        potential: a ``lds.potentials.Potential`` or a callable returning the
+        force at an array of positions. Default to None, a free particle.
+
+    Returns:
+        chunk: the single-trajectory kernel.
+        ensemble_chunk: the ensemble kernel.
+    """
+    potential = as_potential(potential)
+    if potential is None:
+        return get_kernels(backend, scheme)
+    return force_kernels(scheme, potential.force, \
+                         force_coefficients(scheme, damping_coefficient, time_step))
+
+
+def noise_width(scheme):
+    """
+    Number of standard normal numbers drawn per particle and step.
+
+    Args:
+        scheme: one of ``SCHEMES``.
+
+    Returns:
+        width: 0 for Euler, which draws scaled random forces, 1 for BAOAB and
+        2 for OU.
+    """
+    return {'euler': 0, 'baoab': 1, 'ou': 2}[scheme]
+
+
+def draw_noise(noise, scheme, steps, particles=None):
+    """
+    Draw the noise block of a kernel.
+
+    Args:
+        noise: a NoiseSource.
+        scheme: one of ``SCHEMES``.
+        steps: the number of steps of the block.
+        particles: the number of particles for an ensemble kernel. Default to
+        None for a single-trajectory kernel.
+
+    Returns:
+        noise_block: an array of shape (steps[, particles]) of random forces
+        for Euler, or (steps[, particles], width) of standard normal numbers.
+    """
+    width = noise_width(scheme)
+    shape = (steps,) if particles is None else (steps, particles)
+    if width == 0:
+        return noise.draw(int(np.prod(shape))).reshape(shape)
+    return noise.draw(int(np.prod(shape)) * width, standard=True).reshape(shape + (width,))
@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+"""
+Long-lived job server running simulations submitted over a local API.
+
+Starting a process per simulation pays for the interpreter, the imports and
+the compilation of the kernels every time. The server keeps a pool of warm
+worker processes instead, and takes jobs over HTTP on a local port or a
+Unix socket::
+
+    python -m lds.langevin_dynamics_simulator serve --port 8765
+
+A job is a JSON object with the simulation fields of ``parse_args``
+(``seed``, ``runs``, ``integrator``..., see ``SIMULATION_FIELDS``), plus an
+optional ``kind``:
+
+* ``'first_passage'`` (default): the histogram runs of the command line,
+  summarized like a row of ``lds.sweep``. ``"exit_times": true`` adds the
+  exit time and side of every run.
+* ``'trajectory'``: the single trajectory of the command line, with its
+  recorded steps.
+
+``POST /jobs`` takes a job or a list of jobs and streams one JSON line per
+job as soon as it is done, in completion order::
+
+    {"job": 0, "status": "done", "result": {...}}
+    {"job": 1, "status": "error", "error": "..."}
+
+``GET /health`` reports the number of workers and of queued jobs.
+
+Jobs arriving within ``batch_delay`` seconds of each other are batched:
+unseeded first-passage jobs with the same physical parameters are run as
+one ensemble and split afterwards. Seeded jobs always run alone, and give
+the same results as the command line with the same arguments.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stderr
+
+import numpy as np
+
+from lds import langevin_dynamics_simulator as simulator
+from lds.first_passage import FirstPassageResult, RunningStats
+from lds.kernels import resolve_backend
+from lds.noise import NoiseSource
+from lds.potentials import from_spec
+from lds.schemes import SCHEMES
+
+KINDS = ('first_passage', 'trajectory')
+
+# fields of a job which are not arguments of ``parse_args``
+JOB_FIELDS = ('kind', 'exit_times')
+
+# arguments of ``parse_args`` a job may set, the others (output path, cache
+# directory...) would let clients choose where the server reads and writes
+SIMULATION_FIELDS = ('initial_position', 'initial_velocity', 'temperature', \
+                     'damping_coefficient', 'time_step', 'total_time', 'wall_size', \
+                     'seed', 'runs', 'target_std_error', 'record_every', 'backend', \
+                     'integrator', 'max_time_step', 'potential', 'no_cache')
+
+# arguments which must match for first-passage jobs to share an ensemble
+BATCH_KEYS = ('damping_coefficient', 'initial_velocity', 'total_time', 'time_step', \
+              'temperature', 'initial_position', 'wall_size', 'backend', \
+              'integrator', 'potential', 'max_time_step')
+
+
+def parse_args(args):
+    """
+    An parsing argument function for the ``serve`` subcommand.
+
+    Args:
+        args: Unparsed argument variable.
+
+    Returns:
+        vars: a dict containing parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(prog='serve')
+    parser.add_argument('--host', type=str, default='127.0.0.1', \
+    help='Address to listen on, default to 127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, \
+    help='Port to listen on, default to 8765')
+    parser.add_argument('--socket', type=str, default=None, \
+    help='Listen on this Unix socket instead of a port')
+    parser.add_argument('-w', '--workers', type=int, default=None, \
+    help='Number of worker processes, default to the number of CPUs')
+    parser.add_argument('--batch_delay', '--batch-delay', type=float, default=0.005, \
+    help='Seconds to wait for more jobs to batch with a new one, default to 0.005')
+    parser.add_argument('--batch_runs', '--batch-runs', type=int, default=10000, \
+    help='Largest number of runs of a batched ensemble, default to 10000')
+    return vars(parser.parse_args(args))
+
+
+def job_args(spec):
+    """
+    Check a job and turn it into arguments of the simulator.
+
+    Args:
+        spec: a dict with ``SIMULATION_FIELDS`` of ``parse_args``, and
+        optionally ``kind`` and ``exit_times``.
+
+    Returns:
+        kind: the kind of job, one of ``KINDS``.
+        args: a dict of arguments as returned by ``parse_args``, with
+        ``exit_times`` added.
+
+    Raises:
+        ValueError: for an unknown kind or field, a tabulated potential, which
+        would be read from a file of the server, or arguments ``parse_args``
+        rejects.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError('A job must be a JSON object, not {0}'.format(type(spec).__name__))
+    kind = spec.get('kind', 'first_passage')
+    if kind not in KINDS:
+        raise ValueError('Unknown kind {0}, choose from {1}'.format(kind, KINDS))
+    unknown = sorted(set(spec) - set(JOB_FIELDS + SIMULATION_FIELDS))
+    if unknown:
+        raise ValueError('Unknown job fields {0}, choose from {1}'\
+                         .format(unknown, JOB_FIELDS + SIMULATION_FIELDS))
+    if str(spec.get('potential') or '').partition(':')[0].strip() == 'tabulated':
+        raise ValueError('Tabulated potentials cannot be used in jobs')
+    argv = list()
+    for key, value in sorted(spec.items()):
+        if key in JOB_FIELDS or value is None or value is False:
+            continue
+        argv.append('--' + key if value is True else '--{0}={1}'.format(key, value))
+    errors = io.StringIO()
+    try:
+        with redirect_stderr(errors):
+            args = simulator.parse_args(argv)
+    except SystemExit:
+        # keep the message of the last line, 'prog: error: message'
+        raise ValueError(errors.getvalue().strip().splitlines()[-1].partition('error: ')[2])
+    args['exit_times'] = bool(spec.get('exit_times', False))
+    return kind, args
+
+
+def batch_key(kind, args, batch_runs):
+    """
+    The identity of the ensemble a job can share, if any.
+
+    Args:
+        kind: the kind of job.
+        args: the arguments of the job.
+        batch_runs: the largest number of runs of a batched ensemble.
+
+    Returns:
+        key: a tuple, equal for jobs which can run as one ensemble, or None
+        for jobs which run alone.
+    """
+    if kind != 'first_passage' or args['seed'] is not None or \
+       args['target_std_error'] is not None or args['runs'] > batch_runs:
+        return None
+    return tuple(args[key] for key in BATCH_KEYS)
+
+
+def _plain(value):
+    """A float for JSON, None for nan and infinities."""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def summarize(result, exit_times=False):
+    """
+    Summarize first passages as the result of a job.
+
+    Args:
+        result: a FirstPassageResult.
+        exit_times: add the exit time and side of every run. Default to False.
+
+    Returns:
+        summary: a dict of plain values.
+    """
+    low, high = result.confidence_interval() if result.stats.count else (np.nan, np.nan)
+    summary = {
+        'runs': result.runs,
+        'exited': int(np.sum(~result.censored)),
+        'exit_low': int(np.sum(result.exit_side == -1)),
+        'exit_high': int(np.sum(result.exit_side == 1)),
+        'mean_exit_time': _plain(result.mean),
+        'std_error': _plain(result.std_error),
+        'ci_low': _plain(low),
+        'ci_high': _plain(high),
+        'median_exit_time': _plain(result.quantiles(0.5)),
+    }
+    if exit_times:
+        summary['exit_times'] = result.exit_times.tolist()
+        summary['exit_side'] = result.exit_side.tolist()
+    return summary
+
+
+def split_result(result, runs):
+    """
+    Split the first passages of a batched ensemble between its jobs.
+
+    Args:
+        result: the FirstPassageResult of the whole ensemble.
+        runs: a list with the number of runs of each job, in order.
+
+    Returns:
+        results: a list of FirstPassageResult, one per job.
+    """
+    results = list()
+    start = 0
+    for count in runs:
+        exit_times = result.exit_times[start:start + count]
+        exit_side = result.exit_side[start:start + count]
+        stats = RunningStats()
+        stats.update(exit_times[exit_side != 0])
+        results.append(FirstPassageResult(exit_times, exit_side, stats))
+        start += count
+    return results
+
+
+def run_jobs(kind, jobs):
+    """
+    Run jobs in a worker, sharing one ensemble between batched jobs.
+
+    Args:
+        kind: the kind of the jobs.
+        jobs: a list of job arguments from ``job_args``. Several jobs must
+        share a ``batch_key``.
+
+    Returns:
+        results: a list with the result of each job.
+    """
+    args = jobs[0]
+    potential = from_spec(args['potential']) if args['potential'] else None
+    if kind == 'trajectory':
+        chunks = list(simulator.stream_integrator(args['damping_coefficient'], \
+                      args['initial_velocity'], args['total_time'], args['time_step'], \
+                      args['temperature'], args['initial_position'], args['wall_size'], \
+                      noise=NoiseSource(args['temperature'], args['damping_coefficient'], \
+                                        seed=args['seed'], stream=0), \
+                      record_every=args['record_every'], backend=args['backend'], \
+                      scheme=args['integrator'], potential=potential))
+        index = np.concatenate([c.index for c in chunks])
+        position = np.concatenate([c.position for c in chunks])
+        velocity = np.concatenate([c.velocity for c in chunks])
+        return [{'final_position': float(position[-1]), 'final_velocity': float(velocity[-1]), \
+                 'index': index.tolist(), 'time': (index * args['time_step']).tolist(), \
+                 'position': position.tolist(), 'velocity': velocity.tolist()}]
+    runs = [job['runs'] for job in jobs]
+    result = simulator.histogram_runs(args, potential, runs=sum(runs))
+    return [summarize(part, job['exit_times']) \
+            for part, job in zip(split_result(result, runs), jobs)]
+
+
+def _warm_worker():
+    """Import the simulator and compile the kernels of every scheme once per worker."""
+    from lds.first_passage import first_passage
+    backend = resolve_backend()
+    for scheme in SCHEMES:
+        first_passage(1, 0, 0.1, 0.01, 1, 2.5, 5, runs=2, backend=backend, scheme=scheme)
+    # and the adaptive time steps, which only the 'ou' scheme takes
+    first_passage(1, 0, 0.1, 0.01, 1, 2.5, 5, runs=2, backend=backend, scheme='ou', \
+                  max_time_step=0.04)
+
+
+class JobServer(object):
+    """
+    Queue of simulation jobs over a pool of warm workers.
+
+    Args:
+        workers: the number of worker processes. 1 runs the jobs in a thread
+        of this process. Default to None, the number of CPUs.
+        batch_delay: the seconds to wait for more jobs to batch with a new
+        one. Default to 0.005.
+        batch_runs: the largest number of runs of a batched ensemble.
+        Default to 10000.
+        warm: import and compile everything in the workers when they start.
+        Default to True.
+    """
+
+    def __init__(self, workers=None, batch_delay=0.005, batch_runs=10000, warm=True):
+        self.workers = workers
+        self.batch_delay = float(batch_delay)
+        self.batch_runs = int(batch_runs)
+        initializer = _warm_worker if warm else None
+        if workers == 1:
+            self.executor = ThreadPoolExecutor(1, initializer=initializer)
+        else:
+            # forking a process running threads can deadlock the children
+            self.executor = ProcessPoolExecutor(workers, multiprocessing.get_context('spawn'), \
+                                                initializer=initializer)
+        self.queue = None
+        self._dispatcher = None
+        self._tasks = set()
+        self._pending = set() # executor futures not done yet
+
+    def _start_dispatcher(self):
+        if self._dispatcher is None:
+            self.queue = asyncio.Queue()
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def submit(self, spec):
+        """
+        Queue a job and wait for its result.
+
+        Args:
+            spec: a job, see the module documentation.
+
+        Returns:
+            result: a dict of plain values.
+        """
+        kind, args = job_args(spec)
+        self._start_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((kind, args, future))
+        return await future
+
+    async def _dispatch(self):
+        """Take the queued jobs, batch them and hand them to the workers."""
+        while True:
+            jobs = [await self.queue.get()]
+            await asyncio.sleep(self.batch_delay)
+            while not self.queue.empty():
+                jobs.append(self.queue.get_nowait())
+            groups = list()
+            batching = dict() # the group still open for each batch key
+            for kind, args, future in jobs:
+                key = batch_key(kind, args, self.batch_runs)
+                group = batching.get(key)
+                if key is None or group is None or \
+                   sum(job['runs'] for job in group[1]) + args['runs'] > self.batch_runs:
+                    group = (kind, list(), list())
+                    groups.append(group)
+                    if key is not None:
+                        batching[key] = group
+                group[1].append(args)
+                group[2].append(future)
+            for kind, batch, futures in groups:
+                task = asyncio.ensure_future(self._run(kind, batch, futures))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, kind, batch, futures):
+        """Run a batch of jobs in a worker and resolve their futures."""
+        pending = self.executor.submit(run_jobs, kind, batch)
+        self._pending.add(pending)
+        pending.add_done_callback(self._pending.discard)
+        try:
+            results = await asyncio.wrap_future(pending)
+        except Exception as error:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def start(self, host='127.0.0.1', port=8765, path=None):
+        """
+        Listen for HTTP requests.
+
+        Args:
+            host: the address to listen on. Default to 127.0.0.1.
+            port: the port to listen on, 0 for any free port. Default to 8765.
+            path: listen on this Unix socket instead. Default to None.
+
+        Returns:
+            server: the ``asyncio`` server.
+        """
+        self._start_dispatcher()
+        if path is not None:
+            return await asyncio.start_unix_server(self._handle, path)
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def close(self):
+        """Stop the dispatcher and the workers."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for task in list(self._tasks):
+            task.cancel()
+        # jobs not started yet would otherwise still run after shutdown
+        for pending in list(self._pending):
+            pending.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def _handle(self, reader, writer):
+        """Answer one HTTP request, closing the connection afterwards."""
+        try:
+            request = (await reader.readline()).decode('latin-1').split()
+            headers = dict()
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            if len(request) < 2:
+                await self._respond(writer, 400, {'error': 'Bad request'})
+            elif request[:2] == ['GET', '/health']:
+                await self._respond(writer, 200, {'status': 'ok', 'workers': self.workers, \
+                    'queued': self.queue.qsize() if self.queue is not None else 0})
+            elif request[:2] == ['POST', '/jobs']:
+                await self._jobs(writer, body)
+            else:
+                await self._respond(writer, 404, {'error': 'Unknown route {0} {1}'\
+                                                  .format(*request[:2])})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _respond(self, writer, status, payload, content_type='application/json'):
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found'}[status]
+        writer.write('HTTP/1.1 {0} {1}\r\nContent-Type: {2}\r\nConnection: close\r\n\r\n'\
+                     .format(status, reason, content_type).encode('latin-1'))
+        if payload is not None:
+            writer.write((json.dumps(payload) + '\n').encode('utf-8'))
+        await writer.drain()
+
+    async def _jobs(self, writer, body):
+        """Stream the results of the submitted jobs as JSON lines."""
+        try:
+            specs = json.loads(body.decode('utf-8'))
+        except ValueError as error:
+            await self._respond(writer, 400, {'error': 'Invalid JSON: {0}'.format(error)})
+            return
+        if not isinstance(specs, list):
+            specs = [specs]
+        await self._respond(writer, 200, None, 'application/x-ndjson')
+
+        async def run(number, spec):
+            try:
+                return {'job': number, 'status': 'done', 'result': await self.submit(spec)}
+            except Exception as error:
+                return {'job': number, 'status': 'error', 'error': str(error)}
+        for line in asyncio.as_completed([run(number, spec) \
+                                          for number, spec in enumerate(specs)]):
+            writer.write((json.dumps(await line) + '\n').encode('utf-8'))
+            await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=8765, path=None, workers=None, \
+                batch_delay=0.005, batch_runs=10000):
+    """Run a JobServer until cancelled, see ``JobServer.start``."""
+    server = JobServer(workers, batch_delay, batch_runs)
+    listener = await server.start(host, port, path)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(args):
+    where = args['socket'] or '{0}:{1}'.format(args['host'], args['port'])
+    print('Serving simulations on {0}'.format(where))
+    try:
+        asyncio.run(serve(args['host'], args['port'], args['socket'], args['workers'], \
+                          args['batch_delay'], args['batch_runs']))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main(parse_args(sys.argv[1:]))
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Binary trajectory files."""
+
+import ast
+
+import numpy as np
+
+from lds import profiling
+
+# columns of a binary trajectory file, in the order of the text output
+BINARY_COLUMNS = ('index', 'time', 'position', 'velocity')
+# size of the .npy header, reserved up front so the shape can be patched in
+HEADER_SIZE = 128
+_MAGIC = b'\x93NUMPY\x01\x00'
+
+
+def _npy_header(rows):
+    """
+    Build a version 1.0 .npy header of exactly ``HEADER_SIZE`` bytes.
+
+    Args:
+        rows: the number of rows of the float64 (rows, 4) array that follows.
+
+    Returns:
+        header: the header bytes.
+    """
+    description = "{{'descr': '<f8', 'fortran_order': False, 'shape': ({0}, {1}), }}"\
+        .format(rows, len(BINARY_COLUMNS))
+    length = HEADER_SIZE - len(_MAGIC) - 2
+    description = description.ljust(length - 1) + '\n'
+    return _MAGIC + np.uint16(length).astype('<u2').tobytes() + description.encode('latin1')
+
+
+class BinaryWriter(object):
+    """
+    Append trajectory chunks to a binary .npy file.
+
+    The file holds one float64 row per recorded step with the columns of
+    ``BINARY_COLUMNS``. Chunks are written as raw blocks, and the number of
+    rows in the header is updated on ``close``, so the file can be written
+    while the simulation runs and read back with ``read_binary``.
+
+    Args:
+        path: the path of the file, usually ending in '.npy'.
+        size: resume an existing file, cut to its first ``size`` bytes, see
+        ``tell``. Default to None, which starts a new file.
+    """
+
+    def __init__(self, path, size=None):
+        self.path = path
+        if size is None:
+            self.rows = 0
+            self._file = open(path, 'wb')
+            self._file.write(_npy_header(0))
+        else:
+            self.rows = (int(size) - HEADER_SIZE) // (8 * len(BINARY_COLUMNS))
+            self._file = open(path, 'r+b')
+            self._file.truncate(size)
+            self._file.seek(size)
+
+    def write(self, trajectory):
+        """
+        Append the steps of a Trajectory.
+
+        Args:
+            trajectory: a Trajectory, e.g. a chunk of ``stream_integrator``.
+        """
+        with profiling.stage('output'):
+            block = np.empty((len(trajectory), len(BINARY_COLUMNS)))
+            block[:, 0] = trajectory.index
+            block[:, 1] = trajectory.time
+            block[:, 2] = trajectory.position
+            block[:, 3] = trajectory.velocity
+            self._file.write(block.astype('<f8', copy=False).tobytes())
+        profiling.count('bytes_written', block.nbytes)
+        self.rows += block.shape[0]
+
+    def tell(self):
+        """
+        Current size of the file in bytes.
+
+        Returns:
+            size: the number of bytes written, header included.
+        """
+        return self._file.tell()
+
+    def flush(self):
+        """Write the current number of rows in the header and flush the file."""
+        end = self._file.tell()
+        self._file.seek(0)
+        self._file.write(_npy_header(self.rows))
+        self._file.seek(end)
+        self._file.flush()
+
+    def close(self):
+        """Write the final number of rows in the header and close the file."""
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(_npy_header(self.rows))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_binary(trajectory, path):
+    """
+    Save a whole trajectory to a binary .npy file in one block.
+
+    Args:
+        trajectory: a Trajectory.
+        path: the path of the file.
+    """
+    with BinaryWriter(path) as writer:
+        writer.write(trajectory)
+
+
+def read_binary(path):
+    """
+    Open a binary trajectory file without loading it.
+
+    Args:
+        path: the path of a file written by ``BinaryWriter``.
+
+    Returns:
+        columns: a dict mapping each of ``BINARY_COLUMNS`` to a ``np.memmap``
+        view, so slices are only read from disk when they are used.
+    """
+    with open(path, 'rb') as file:
+        header = file.read(HEADER_SIZE)
+    if not header.startswith(_MAGIC):
+        raise ValueError('{0} is not a binary trajectory file'.format(path))
+    shape = ast.literal_eval(header[len(_MAGIC) + 2:].decode('latin1'))['shape']
+    if shape[0] == 0:
+        return dict((name, np.empty(0)) for name in BINARY_COLUMNS)
+    data = np.memmap(path, dtype='<f8', mode='r', offset=HEADER_SIZE, shape=shape)
+    return dict((name, data[:, i]) for i, name in enumerate(BINARY_COLUMNS))
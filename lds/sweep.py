@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""Parameter sweeps of ensemble runs over a process pool."""
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from lds.first_passage import first_passage
+from lds.kernels import BACKENDS, resolve_backend
+from lds.noise import NoiseSource
+from lds.schemes import SCHEMES
+
+GRID_KEYS = ('temperature', 'damping_coefficient', 'wall_size', 'time_step')
+# parameters shared by every point of a sweep, which a row must match to be resumed
+RUN_KEYS = ('initial_position', 'initial_velocity', 'total_time', 'integrator', \
+            'backend', 'seed', 'runs')
+RESULT_KEYS = GRID_KEYS + RUN_KEYS + ('exited', 'exit_low', 'exit_high', \
+                                      'mean_exit_time', 'std_exit_time', 'median_exit_time')
+
+
+def parse_args(args):
+    """
+    An parsing argument function for the ``sweep`` subcommand.
+
+    Args:
+        args: Unparsed argument variable.
+
+    Returns:
+        vars: a dict containing parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(prog='sweep')
+    parser.add_argument('-x0', '--initial_position', type=float, required=True,\
+    help='The initial position of the particles')
+    parser.add_argument('-v0', '--initial_velocity', type=float, required=True,\
+    help='The intial velocity of the particles')
+    parser.add_argument('-tt', '--total_time', type=float, required=True,\
+    help='The total time of each simulation')
+    parser.add_argument('-temp', '--temperature', type=float, nargs='+', required=True,\
+    help='The temperatures of the grid')
+    parser.add_argument('-dc', '--damping_coefficient', type=float, nargs='+', required=True,\
+    help='The damping coefficients of the grid')
+    parser.add_argument('-ws', '--wall_size', type=float, nargs='+', required=True,\
+    help='The wall sizes of the grid')
+    parser.add_argument('-ts', '--time_step', type=float, nargs='+', required=True,\
+    help='The time steps of the grid')
+    parser.add_argument('-n', '--runs', type=int, default=1000, \
+    help='Number of trajectories per grid point, default to 1000')
+    parser.add_argument('-w', '--workers', type=int, default=None, \
+    help='Number of worker processes, default to the number of CPUs')
+    parser.add_argument('-s', '--seed', type=int, default=None, \
+    help='Seed of the random number generator, default to a random seed')
+    parser.add_argument('-b', '--backend', type=str, default=None, choices=BACKENDS, \
+    help='Integration backend of the workers')
+    parser.add_argument('-i', '--integrator', type=str, default='euler', choices=SCHEMES, \
+    help='Integration scheme of the workers, default to euler')
+    parser.add_argument('-o', '--output', type=str, default='sweep.csv', \
+    help='CSV table of results, existing grid points are skipped')
+    return vars(parser.parse_args(args))
+
+
+def parameter_grid(grid):
+    """
+    Expand a grid of parameter values into single parameter sets.
+
+    Args:
+        grid: a dict mapping each of ``GRID_KEYS`` to a list of values.
+
+    Returns:
+        points: a list of dicts, one per combination of values.
+    """
+    values = [grid[key] for key in GRID_KEYS]
+    return [dict(zip(GRID_KEYS, combination)) for combination in itertools.product(*values)]
+
+
+def run_point(point, initial_velocity, initial_position, total_time, runs, \
+              seed, stream, backend=None, scheme='euler'):
+    """
+    Run the ensemble of one grid point and summarize its first passages.
+
+    Args:
+        point: a dict with a value for each of ``GRID_KEYS``.
+        initial_velocity: the initial velocity of every particle.
+        initial_position: the initial position of every particle.
+        total_time: the total simulation time.
+        runs: the number of trajectories.
+        seed: the seed shared by the whole sweep.
+        stream: the random stream of this grid point.
+        backend: the integration backend.
+        scheme: the integration scheme.
+
+    Returns:
+        row: a dict with the grid point and its first-passage statistics.
+    """
+    noise = NoiseSource(point['temperature'], point['damping_coefficient'], \
+                        seed=seed, stream=stream)
+    result = first_passage(point['damping_coefficient'], initial_velocity, total_time, \
+                           point['time_step'], point['temperature'], initial_position, \
+                           point['wall_size'], runs, noise=noise, backend=backend, \
+                           scheme=scheme)
+    row = dict(point)
+    row['initial_position'] = initial_position
+    row['initial_velocity'] = initial_velocity
+    row['total_time'] = total_time
+    row['integrator'] = scheme
+    row['backend'] = resolve_backend(backend)
+    row['seed'] = seed
+    row['runs'] = runs
+    row['exit_low'] = int(np.sum(result.exit_side == -1))
+    row['exit_high'] = int(np.sum(result.exit_side == 1))
+    row['exited'] = row['exit_low'] + row['exit_high']
+    row['mean_exit_time'] = float(result.mean)
+    row['std_exit_time'] = float(np.sqrt(result.variance))
+    row['median_exit_time'] = float(result.quantiles(0.5))
+    return row
+
+
+def _point_key(point):
+    """The hashable identity of a grid point."""
+    return tuple(float(point[key]) for key in GRID_KEYS)
+
+
+def _run_key(row):
+    """The hashable identity of a grid point run with the parameters of a sweep."""
+    return _point_key(row) + tuple(row[key] if key in ('integrator', 'backend') \
+                                   else float(row[key]) for key in RUN_KEYS)
+
+
+def _point_stream(point):
+    """The random stream of a grid point, stable across grids and resumes."""
+    return zlib.crc32(repr(_point_key(point)).encode('ascii'))
+
+
+def _number(text):
+    """Convert a CSV field back to an int or a float, leaving names as text."""
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def read_results(path):
+    """
+    Read a results table written by ``sweep``.
+
+    Args:
+        path: the path of the CSV file.
+
+    Returns:
+        rows: a list of dicts, with numbers converted back to numbers.
+    """
+    if not os.path.exists(path):
+        return list()
+    with open(path) as file:
+        return [dict((key, _number(value)) for key, value in row.items()) \
+                for row in csv.DictReader(file)]
+
+
+def sweep(grid, initial_velocity, initial_position, total_time, runs=1000, \
+          workers=None, seed=None, output=None, backend=None, scheme='euler'):
+    """
+    Run ensembles over every point of a parameter grid.
+
+    Grid points are spread over a ``ProcessPoolExecutor``. Each point draws
+    from its own stream of ``seed``, derived from its parameter values, so a
+    point gives the same result whatever worker runs it. Rows are appended
+    to ``output`` as soon as they are done, and points already in ``output``
+    with the same ``RUN_KEYS`` are skipped, so an interrupted sweep can be
+    resumed. The seed is stored in the table and reused on resume when none
+    is given.
+
+    Args:
+        grid: a dict mapping each of ``GRID_KEYS`` to a list of values.
+        initial_velocity: the initial velocity of every particle.
+        initial_position: the initial position of every particle.
+        total_time: the total simulation time.
+        runs: the number of trajectories per grid point.
+        workers: the number of worker processes. 1 runs in this process.
+        seed: the seed of the sweep. Default to None, which reuses the seed
+        of the rows of ``output`` run with the same other parameters, or
+        picks a random one.
+        output: the path of a CSV results table. Default to None.
+        backend: the integration backend of the workers.
+        scheme: the integration scheme of the workers. Default to 'euler'.
+
+    Returns:
+        rows: a list of dicts, one per grid point, in grid order.
+    """
+    previous = read_results(output) if output is not None else list()
+    fixed = {'initial_position': initial_position, 'initial_velocity': initial_velocity, \
+             'total_time': total_time, 'integrator': scheme, \
+             'backend': resolve_backend(backend), 'runs': runs}
+    if seed is None: # pick one so that every point shares it
+        same_run = [row['seed'] for row in previous \
+                    if _run_key(dict(row, seed=0)) == _run_key(dict(row, seed=0, **fixed))]
+        seed = same_run[0] if same_run else \
+            int(np.random.SeedSequence().entropy % (2 ** 32))
+    fixed['seed'] = seed
+    points = parameter_grid(grid)
+    finished = dict((_run_key(row), row) for row in previous)
+    todo = [(_point_stream(point), point) for point in points \
+            if _run_key(dict(point, **fixed)) not in finished]
+
+    writer = None
+    if output is not None:
+        new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+        file = open(output, 'a', newline='')
+        writer = csv.DictWriter(file, fieldnames=RESULT_KEYS)
+        if new_file:
+            writer.writeheader()
+
+    def record(row):
+        finished[_run_key(row)] = row
+        if writer is not None:
+            writer.writerow(row)
+            file.flush()
+
+    try:
+        arguments = (initial_velocity, initial_position, total_time, runs, seed)
+        if workers == 1:
+            for stream, point in todo:
+                record(run_point(point, *arguments, stream=stream, backend=backend, \
+                                 scheme=scheme))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(run_point, point, *arguments, stream=stream, \
+                           backend=backend, scheme=scheme) for stream, point in todo]
+                for future in as_completed(futures):
+                    record(future.result())
+    finally:
+        if writer is not None:
+            file.close()
+    return [finished[_run_key(dict(point, **fixed))] for point in points]
+
+
+def main(args):
+    grid = dict((key, args[key]) for key in GRID_KEYS)
+    rows = sweep(grid, args['initial_velocity'], args['initial_position'], \
+                 args['total_time'], runs=args['runs'], workers=args['workers'], \
+                 seed=args['seed'], output=args['output'], backend=args['backend'], \
+                 scheme=args['integrator'])
+    print('{0} grid points saved to {1}'.format(len(rows), args['output']))
+    return rows
+
+if __name__ == '__main__':
+    main(parse_args(sys.argv[1:]))
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+Interacting particles in a 1, 2 or 3 dimensional box.
+
+The box spans ``[0, wall]`` along every axis, and each axis has its own kind
+of wall:
+
+* ``'reflecting'``: particles bounce back, their velocity along the axis is
+  reversed.
+* ``'absorbing'``: particles are removed at the wall they hit, like the
+  single particle of ``euler_integrator``.
+* ``'periodic'``: particles leaving at one side come back at the other, and
+  pair distances follow the minimum image convention.
+
+Short-range pair forces are computed with a cell list, so the cost of a step
+grows linearly with the number of particles.
+"""
+
+from itertools import product
+
+import numpy as np
+
+from lds.noise import NoiseSource
+from lds.potentials import as_potential
+from lds.schemes import scheme_coefficients
+
+BOUNDARIES = ('reflecting', 'absorbing', 'periodic')
+
+
+class PairPotential(object):
+    """
+    Base class of short-range pair potentials.
+
+    Subclasses set ``cutoff``, the distance above which the force is zero,
+    and implement ``force`` and ``energy`` for arrays of distances.
+    """
+
+    cutoff = 0.0
+
+    def force(self, r):
+        """
+        Magnitude of the pair force, positive when repulsive.
+
+        Args:
+            r: an array of distances, all below ``cutoff``.
+
+        Returns:
+            an array of forces, minus the derivative of the energy.
+        """
+        raise NotImplementedError
+
+    def energy(self, r):
+        """
+        Pair energy, zero at the cutoff.
+
+        Args:
+            r: an array of distances, all below ``cutoff``.
+
+        Returns:
+            an array of energies.
+        """
+        raise NotImplementedError
+
+
+class LennardJones(PairPotential):
+    """
+    U(r) = 4 epsilon ((sigma / r)^12 - (sigma / r)^6), shifted to 0 at the cutoff.
+
+    Args:
+        epsilon: the depth of the well.
+        sigma: the distance at which the unshifted energy is 0.
+        cutoff: the interaction range. Default to None, which is 2.5 sigma.
+    """
+
+    def __init__(self, epsilon=1.0, sigma=1.0, cutoff=None):
+        self.epsilon = float(epsilon)
+        self.sigma = float(sigma)
+        self.cutoff = 2.5 * self.sigma if cutoff is None else float(cutoff)
+        self._shift = self._unshifted(self.cutoff)
+
+    def _unshifted(self, r):
+        s6 = (self.sigma / r) ** 6
+        return 4 * self.epsilon * (s6 * s6 - s6)
+
+    def force(self, r):
+        s6 = (self.sigma / r) ** 6
+        return 24 * self.epsilon * (2 * s6 * s6 - s6) / r
+
+    def energy(self, r):
+        return self._unshifted(r) - self._shift
+
+
+class SoftSphere(PairPotential):
+    """
+    U(r) = k / 2 * (diameter - r)^2 for overlapping spheres, 0 otherwise.
+
+    Args:
+        k: the stiffness of the spheres.
+        diameter: the diameter of the spheres, which is also the cutoff.
+    """
+
+    def __init__(self, k=10.0, diameter=1.0):
+        self.k = float(k)
+        self.cutoff = float(diameter)
+
+    def force(self, r):
+        return self.k * (self.cutoff - r)
+
+    def energy(self, r):
+        return 0.5 * self.k * (self.cutoff - r) ** 2
+
+
+def _half_stencil(cells):
+    """
+    Offsets to the neighbouring cells, each pair of neighbours once.
+
+    Axes with a single cell only look at offset 0, so no cell is reached
+    twice through a periodic wrap.
+    """
+    axes = [(-1, 0, 1) if n > 1 else (0,) for n in cells]
+    for offset in product(*axes):
+        nonzero = [o for o in offset if o != 0]
+        if not nonzero or nonzero[0] > 0:
+            yield np.array(offset)
+
+
+def cell_list_pairs(positions, box, cutoff, periodic=False):
+    """
+    Find the candidate interacting pairs with a cell list.
+
+    The box is cut in cells at least ``cutoff`` wide, and only particles in
+    the same or in adjacent cells are paired. Every pair closer than
+    ``cutoff`` is returned once, along with some pairs further apart.
+
+    Args:
+        positions: an array of shape (particles, dimensions), inside the box.
+        box: the size of the box along every axis.
+        cutoff: the interaction range.
+        periodic: a boolean, or a boolean per axis, True for periodic axes.
+
+    Returns:
+        first: an integer array with the first particle of each pair.
+        second: an integer array with the second particle of each pair.
+    """
+    positions = np.asarray(positions, dtype=float)
+    count, dimensions = positions.shape
+    periodic = np.broadcast_to(np.asarray(periodic, dtype=bool), (dimensions,))
+    cells = int(box // cutoff) if cutoff > 0 else 1
+    # no more than a few cells per particle in sparse systems
+    cells = max(min(cells, int((8 * count) ** (1.0 / dimensions))), 1)
+    cells = np.full(dimensions, cells, dtype=np.intp)
+    # a periodic axis needs 3 cells for its neighbours to be distinct
+    cells[periodic & (cells < 3)] = 1
+    index = np.clip((positions / (box / cells)).astype(np.intp), 0, cells - 1)
+    cell = np.ravel_multi_index(index.T, cells)
+    order = np.argsort(cell, kind='stable')
+    occupancy = np.bincount(cell, minlength=int(np.prod(cells)))
+    starts = np.cumsum(occupancy) - occupancy
+
+    first = list()
+    second = list()
+    particles = np.arange(count)
+    for offset in _half_stencil(cells):
+        neighbour = index + offset
+        valid = np.ones(count, dtype=bool)
+        for axis in range(dimensions):
+            if periodic[axis]:
+                neighbour[:, axis] %= cells[axis]
+            else:
+                valid &= (neighbour[:, axis] >= 0) & (neighbour[:, axis] < cells[axis])
+        target = np.ravel_multi_index(neighbour[valid].T, cells)
+        size = occupancy[target]
+        i = np.repeat(particles[valid], size)
+        # position of each partner in the cell sorted order
+        rank = np.arange(size.sum()) - np.repeat(np.cumsum(size) - size, size)
+        j = order[np.repeat(starts[target], size) + rank]
+        if not offset.any(): # same cell, keep each pair once
+            keep = i < j
+            i = i[keep]
+            j = j[keep]
+        first.append(i)
+        second.append(j)
+    return np.concatenate(first), np.concatenate(second)
+
+
+def pair_forces(positions, box, pair_potential, periodic=False):
+    """
+    Total pair force on each particle.
+
+    Args:
+        positions: an array of shape (particles, dimensions), inside the box.
+        box: the size of the box along every axis.
+        pair_potential: a PairPotential.
+        periodic: a boolean, or a boolean per axis, True for periodic axes.
+
+    Returns:
+        forces: an array of shape (particles, dimensions).
+    """
+    count, dimensions = positions.shape
+    forces = np.zeros((count, dimensions))
+    first, second = cell_list_pairs(positions, box, pair_potential.cutoff, periodic)
+    separation = positions[first] - positions[second]
+    periodic = np.broadcast_to(np.asarray(periodic, dtype=bool), (dimensions,))
+    if periodic.any(): # minimum image
+        separation[:, periodic] -= box * np.round(separation[:, periodic] / box)
+    distance = np.sqrt(np.sum(separation ** 2, axis=1))
+    close = (distance < pair_potential.cutoff) & (distance > 0)
+    distance = distance[close]
+    pair = separation[close] * (pair_potential.force(distance) / distance)[:, None]
+    for axis in range(dimensions):
+        forces[:, axis] = np.bincount(first[close], pair[:, axis], count) \
+            - np.bincount(second[close], pair[:, axis], count)
+    return forces
+
+
+class ParticleSystem(object):
+    """
+    N interacting particles in a d dimensional box, integrated with BAOAB.
+
+    Args:
+        positions: an array of shape (particles, dimensions), with 1 to 3
+        dimensions, inside ``[0, wall]``. A flat array puts the particles
+        on a line.
+        velocities: an array of the same shape. Default to None, all at rest.
+        wall: the size of the box along every axis.
+        boundary: one of ``BOUNDARIES``, or one per axis. Default to
+        'reflecting'.
+        damping_coefficient: the damping coefficient of the system.
+        temperature: the temperature of the system.
+        time_step: the time step (dt) to be integrated on.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+        pair_potential: a PairPotential between every two particles.
+        Default to None, non-interacting particles.
+        potential: an external ``lds.potentials.Potential``, or a force
+        callable, applied to every coordinate. Default to None.
+        noise: a NoiseSource providing the standard normal numbers. Default
+        to None, which creates an unseeded one.
+
+    Attributes:
+        positions: the (particles, dimensions) array of positions.
+        velocities: the (particles, dimensions) array of velocities.
+        alive: a boolean array, False for particles absorbed by a wall.
+        exit_times: the time each particle was absorbed, nan if it was not.
+        time: the simulated time.
+    """
+
+    def __init__(self, positions, velocities=None, wall=5.0, boundary='reflecting', \
+                 damping_coefficient=1.0, temperature=1.0, time_step=0.01, kB=1, \
+                 dirac_delta=1, pair_potential=None, potential=None, noise=None):
+        self.positions = np.array(positions, dtype=float)
+        if self.positions.ndim == 1: # particles on a line
+            self.positions = self.positions.reshape(-1, 1)
+        if not 1 <= self.dimensions <= 3:
+            raise ValueError('Positions must have 1 to 3 columns, not {0}'\
+                             .format(self.dimensions))
+        self.velocities = np.zeros_like(self.positions) if velocities is None \
+            else np.array(velocities, dtype=float).reshape(self.positions.shape)
+        self.wall = float(wall)
+        if isinstance(boundary, str):
+            boundary = (boundary,) * self.dimensions
+        self.boundary = tuple(boundary)
+        if len(self.boundary) != self.dimensions or \
+                any(kind not in BOUNDARIES for kind in self.boundary):
+            raise ValueError('Boundaries must be one of {0} per axis, not {1}'\
+                             .format(BOUNDARIES, boundary))
+        self.periodic = np.array([kind == 'periodic' for kind in self.boundary])
+        self.time_step = float(time_step)
+        self.pair_potential = pair_potential
+        self.potential = as_potential(potential)
+        if noise is None:
+            noise = NoiseSource(temperature, damping_coefficient, kB, dirac_delta)
+        self.noise = noise
+        # velocity update of BAOAB, the drifts and kicks are half steps
+        self._a, self._c = scheme_coefficients('baoab', damping_coefficient, 0, \
+                           time_step, temperature, kB, dirac_delta)[:2]
+        self.alive = np.ones(self.num_particles, dtype=bool)
+        self.exit_times = np.full(self.num_particles, np.nan)
+        self.time = 0.0
+        self._forces = self.forces()
+
+    @classmethod
+    def random(cls, num_particles, dimensions, wall=5.0, seed=None, **kwargs):
+        """
+        Particles at rest at uniformly random positions in the box.
+
+        Args:
+            num_particles: the number of particles.
+            dimensions: the number of dimensions, 1 to 3.
+            wall: the size of the box along every axis.
+            seed: the seed of the positions. Default to None.
+            kwargs: the other arguments of ParticleSystem.
+
+        Returns:
+            system: a ParticleSystem.
+        """
+        generator = np.random.default_rng(seed)
+        return cls(generator.uniform(0, wall, (int(num_particles), int(dimensions))), \
+                   wall=wall, **kwargs)
+
+    @property
+    def num_particles(self):
+        """the number of particles, absorbed ones included."""
+        return self.positions.shape[0]
+
+    @property
+    def dimensions(self):
+        """the number of dimensions of the box."""
+        return self.positions.shape[1]
+
+    def forces(self):
+        """
+        External and pair forces on the particles still in the box.
+
+        Returns:
+            forces: an array of shape (particles, dimensions), 0 for absorbed
+            particles.
+        """
+        forces = np.zeros_like(self.positions)
+        alive = self.alive
+        positions = self.positions[alive]
+        if self.potential is not None:
+            forces[alive] += self.potential.force(positions)
+        if self.pair_potential is not None and positions.shape[0] > 1:
+            forces[alive] += pair_forces(positions, self.wall, self.pair_potential, \
+                                         self.periodic)
+        return forces
+
+    def _apply_walls(self):
+        """Fold, reflect or absorb the particles that left the box."""
+        x = self.positions
+        v = self.velocities
+        for axis, kind in enumerate(self.boundary):
+            if kind == 'periodic':
+                x[:, axis] %= self.wall
+                continue
+            below = self.alive & (x[:, axis] < 0)
+            above = self.alive & (x[:, axis] > self.wall)
+            if kind == 'reflecting':
+                x[below, axis] = -x[below, axis]
+                x[above, axis] = 2 * self.wall - x[above, axis]
+                v[below | above, axis] *= -1
+                np.clip(x[:, axis], 0, self.wall, out=x[:, axis])
+            else:
+                x[below, axis] = 0.0
+                x[above, axis] = self.wall
+                self.exit_times[below | above] = self.time
+                self.alive &= ~(below | above)
+
+    def step(self, steps=1):
+        """
+        Advance the particles still in the box.
+
+        Args:
+            steps: the number of time steps. Default to 1.
+
+        Returns:
+            self, for chaining.
+        """
+        half = 0.5 * self.time_step
+        for i in range(int(steps)):
+            # noise is drawn for every particle, so streams don't depend on exits
+            z = self.noise.draw(self.positions.size, standard=True)\
+                .reshape(self.positions.shape)
+            live = self.alive[:, None]
+            v = self.velocities + half * self._forces
+            x = self.positions + half * v
+            v = self._a * v + self._c * z
+            x += half * v
+            np.copyto(self.velocities, v, where=live)
+            np.copyto(self.positions, x, where=live)
+            self.time += self.time_step
+            self._apply_walls()
+            self._forces = self.forces()
+            self.velocities += half * self._forces
+        return self
+
+    def run(self, total_time):
+        """
+        Advance the particles for some time.
+
+        Args:
+            total_time: the simulated time, rounded down to whole time steps.
+
+        Returns:
+            self, for chaining.
+        """
+        return self.step(int(total_time // self.time_step))
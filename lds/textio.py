@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk writer of the text output file.
+
+Lines are formatted a block at a time, with a single ``%`` operation over
+all the values of the block, and written with one call per block instead
+of one per step. The result is byte-identical to formatting each line with
+``'{0} {1:.2f} {2:.6f} {3:.6f}\\n'``, since ``%`` and ``str.format`` round
+floats the same way.
+
+The output can be compressed while it is written, with gzip or, if the
+``zstandard`` package is installed, zstd.
+"""
+
+import gzip
+import io
+
+import numpy as np
+
+# one line of the output file: index, time, position, velocity
+LINE_FORMAT = '%d %.2f %.6f %.6f\n'
+# lines formatted and written at once
+BLOCK_LINES = 65536
+# compressions of the output file, with the suffix of their files
+COMPRESSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def format_lines(index, time, position, velocity):
+    """
+    Format steps as lines of the output file.
+
+    Args:
+        index: an array of step indices.
+        time: an array of times.
+        position: an array of positions.
+        velocity: an array of velocities.
+
+    Returns:
+        text: the lines, one per step.
+    """
+    rows = np.empty((len(index), 4))
+    rows[:, 0] = index
+    rows[:, 1] = time
+    rows[:, 2] = position
+    rows[:, 3] = velocity
+    return (LINE_FORMAT * rows.shape[0]) % tuple(rows.ravel().tolist())
+
+
+def write_lines(index, time, position, velocity, file, block_lines=BLOCK_LINES):
+    """
+    Write steps to the output file, a block of lines at a time.
+
+    Args:
+        index: an array of step indices.
+        time: an array of times.
+        position: an array of positions.
+        velocity: an array of velocities.
+        file: a text file writer.
+        block_lines: the number of lines per write. Default to 65536.
+
+    Returns:
+        written: the number of characters written.
+    """
+    written = 0
+    for start in range(0, len(index), block_lines):
+        end = start + block_lines
+        text = format_lines(index[start:end], time[start:end], \
+                            position[start:end], velocity[start:end])
+        file.write(text)
+        written += len(text)
+    return written
+
+
+def open_text(path, compression=None):
+    """
+    Open a text output file, compressed or not.
+
+    Args:
+        path: the path of the file, without the suffix of the compression.
+        compression: None, 'gzip' or 'zstd'. Default to None.
+
+    Returns:
+        file: a text file writer, to be closed once the run is written.
+    """
+    if compression is None:
+        return open(path, 'w')
+    if compression not in COMPRESSIONS:
+        raise ValueError('Unknown compression {0}, choose from {1}'\
+                         .format(compression, sorted(COMPRESSIONS)))
+    path += COMPRESSIONS[compression]
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', compresslevel=6)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError('zstd output needs the zstandard package, '\
+                          'install it or use gzip instead')
+    stream = zstandard.ZstdCompressor().stream_writer(open(path, 'wb'))
+    return io.TextIOWrapper(stream, encoding='ascii')
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Array-backed storage of a single trajectory."""
+
+import numpy as np
+
+
+class Trajectory(object):
+    """
+    Preallocated velocity and position arrays of one simulation run.
+
+    Both arrays hold ``num_steps + 1`` float64 values, the first one being the
+    initial condition. Time is not stored, it is recomputed as
+    ``index * time_step`` so no rounding error accumulates over long runs.
+    A run that stops early on a wall is trimmed with ``trim``.
+
+    Unpacking a trajectory gives the same three sequences as
+    ``euler_integrator``::
+
+        velocity, position, time = trajectory
+
+    A thinned piece of a longer run, as yielded by ``stream_integrator``, is
+    built with ``from_arrays`` and carries the step index of every sample.
+
+    Args:
+        num_steps: the number of integration steps to reserve room for.
+        time_step: the time step (dt) of the run.
+        initial_velocity: the velocity at time 0.
+        initial_position: the position at time 0.
+    """
+
+    def __init__(self, num_steps, time_step, initial_velocity=0.0, initial_position=0.0):
+        self.time_step = time_step
+        self._velocity = np.empty(int(num_steps) + 1)
+        self._position = np.empty(int(num_steps) + 1)
+        self._velocity[0] = initial_velocity
+        self._position[0] = initial_position
+        self._index = None
+        self._length = self._velocity.size
+
+    @classmethod
+    def from_arrays(cls, velocity, position, time_step, index=None):
+        """
+        Wrap already computed arrays in a Trajectory.
+
+        Args:
+            velocity: an array of velocities.
+            position: an array of positions.
+            time_step: the time step (dt) of the run.
+            index: an array with the step index of each sample. Default to
+            None for consecutive steps starting at 0.
+
+        Returns:
+            trajectory: a Trajectory backed by the given arrays.
+        """
+        trajectory = cls.__new__(cls)
+        trajectory.time_step = time_step
+        trajectory._velocity = np.asarray(velocity, dtype=float)
+        trajectory._position = np.asarray(position, dtype=float)
+        trajectory._index = None if index is None else np.asarray(index, dtype=np.int64)
+        trajectory._length = trajectory._velocity.size
+        return trajectory
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return iter((self.velocity, self.position, self.time))
+
+    @property
+    def velocity(self):
+        """a numpy array of the velocity at each recorded step."""
+        return self._velocity[:self._length]
+
+    @property
+    def position(self):
+        """a numpy array of the position at each recorded step."""
+        return self._position[:self._length]
+
+    @property
+    def index(self):
+        """a numpy array of the step index of each recorded step."""
+        if self._index is not None:
+            return self._index[:self._length]
+        return np.arange(self._length)
+
+    @property
+    def time(self):
+        """a numpy array of the time of each recorded step."""
+        return self.index * self.time_step
+
+    def trim(self, length):
+        """
+        Drop the reserved steps after ``length``, e.g. once a wall is hit.
+
+        Args:
+            length: the number of recorded steps to keep, initial one included.
+        """
+        self._length = int(length)
+        self._velocity = self._velocity[:self._length].copy()
+        self._position = self._position[:self._length].copy()
+        if self._index is not None:
+            self._index = self._index[:self._length].copy()
+
+    def tolist(self):
+        """
+        Convert the trajectory to plain python lists.
+
+        Returns:
+            velocity_list: a list of velocities of the particle at each time step.
+            position_list: a list of positions of the partile at each time step.
+            time_list: a list of time steps.
+        """
+        return self.velocity.tolist(), self.position.tolist(), self.time.tolist()
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Regression checks of the integrators against known statistics.
+
+Every backend of ``lds.kernels`` runs every path of the simulator, the
+single trajectory, the ensemble, the first passages and the adaptive time
+steps, with fixed seeds, and the results are compared to:
+
+* the equilibrium velocity variance ``kB * T`` (times ``dirac_delta``);
+* the mean first-passage time of the diffusion limit,
+  ``(x0 + delta) (wall - x0 + delta) / (2 D)`` with ``D = kB T / gamma``;
+* the probability of hitting ``wall`` before 0,
+  ``(x0 + delta) / (wall + 2 delta)``.
+
+``delta`` is the Milne extrapolation length of the Klein-Kramers equation,
+``|zeta(1/2)| / sqrt(2)`` thermal velocities over ``gamma`` (Marshall and
+Watson 1985), the first correction to the diffusion limit. The reference
+cases keep it at about a hundredth of the wall distance.
+
+Only the ``'baoab'`` and ``'ou'`` schemes are checked. ``'euler'`` draws
+its drag from the initial velocity and does not scale its noise with the
+time step, so it has neither an equilibrium nor a diffusion limit; the
+tests of ``lds.kernels`` keep its backends identical instead.
+
+Each case is timed as well, so a change can be judged on accuracy and
+speed together, see ``benchmarks/run_regression.py``.
+"""
+
+import numpy as np
+
+from lds import profiling
+from lds.ensemble import ensemble_integrator
+from lds.first_passage import first_passage
+from lds.kernels import BACKENDS, resolve_backend
+from lds.langevin_dynamics_simulator import integrate_trajectory
+from lds.noise import NoiseSource
+
+# -zeta(1/2) / sqrt(2), the Milne extrapolation length in thermal lengths
+MILNE_FACTOR = 1.4603545088095868 / np.sqrt(2)
+# schemes with an equilibrium and a diffusion limit
+CHECKED_SCHEMES = ('baoab', 'ou')
+# walls far away so that every run lasts the whole simulation
+WALL = 1e12
+# equilibrium runs: damping_coefficient, time_step, temperature
+EQUILIBRIUM = {'damping_coefficient': 1.0, 'time_step': 0.1, 'temperature': 2.0}
+# diffusion-limited runs, with a thermal length of a hundredth of the wall
+DIFFUSION = {'damping_coefficient': 10.0, 'time_step': 0.01, 'temperature': 0.01, \
+             'initial_position': 0.25, 'wall': 1.0, 'total_time': 5000.0}
+# standard errors tolerated around a reference
+SIGMAS = 4.0
+# relative bias tolerated for the corrections beyond the Milne length
+BIAS = 0.01
+# share of the work given to the pure python backend
+PYTHON_SHARE = 0.1
+
+
+def milne_length(damping_coefficient, temperature, kB=1, dirac_delta=1):
+    """
+    Extrapolation length of an absorbing wall in the diffusion limit.
+
+    Args:
+        damping_coefficient: the damping coefficient of the system.
+        temperature: the temperature of the system.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+
+    Returns:
+        delta: the distance beyond each wall where the diffusion limit
+        puts the absorbing boundary.
+    """
+    return MILNE_FACTOR * np.sqrt(kB * temperature * dirac_delta) / damping_coefficient
+
+
+def diffusion_mfpt(damping_coefficient, temperature, initial_position, wall, kB=1, \
+                   dirac_delta=1):
+    """
+    Mean first-passage time between two walls in the diffusion limit.
+
+    Args:
+        damping_coefficient: the damping coefficient of the system.
+        temperature: the temperature of the system.
+        initial_position: the initial position of the runs.
+        wall: the wall boundary for the system.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+
+    Returns:
+        mfpt: the mean time to hit either wall.
+    """
+    delta = milne_length(damping_coefficient, temperature, kB, dirac_delta)
+    diffusion = kB * temperature * dirac_delta / damping_coefficient
+    return (initial_position + delta) * (wall - initial_position + delta) / (2 * diffusion)
+
+
+def exit_split(damping_coefficient, temperature, initial_position, wall, kB=1, \
+               dirac_delta=1):
+    """
+    Probability of hitting ``wall`` before 0 in the diffusion limit.
+
+    Args:
+        damping_coefficient: the damping coefficient of the system.
+        temperature: the temperature of the system.
+        initial_position: the initial position of the runs.
+        wall: the wall boundary for the system.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+
+    Returns:
+        probability: the fraction of runs ending at ``wall``.
+    """
+    delta = milne_length(damping_coefficient, temperature, kB, dirac_delta)
+    return (initial_position + delta) / (wall + 2 * delta)
+
+
+def check(statistic, value, reference, std_error, bias=0.0, sigmas=SIGMAS):
+    """
+    Compare a measured statistic to its reference.
+
+    Args:
+        statistic: the name of the statistic.
+        value: the measured value.
+        reference: the expected value.
+        std_error: the standard error of the measured value.
+        bias: the relative bias tolerated on top of the statistical error.
+        Default to 0.
+        sigmas: the number of standard errors tolerated. Default to 4.
+
+    Returns:
+        result: a dict with the statistic, value, reference, std_error,
+        tolerance and whether the check passed.
+    """
+    tolerance = sigmas * std_error + bias * abs(reference)
+    return {'statistic': statistic, 'value': float(value), 'reference': float(reference), \
+            'std_error': float(std_error), 'tolerance': float(tolerance), \
+            'passed': bool(abs(value - reference) <= tolerance)}
+
+
+def velocity_check(velocities, temperature, kB=1, dirac_delta=1):
+    """
+    Check independent velocity samples against the equilibrium variance.
+
+    Args:
+        velocities: an array of independent velocities.
+        temperature: the temperature of the system.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+
+    Returns:
+        result: see ``check``.
+    """
+    squares = np.asarray(velocities) ** 2
+    return check('velocity_variance', squares.mean(), kB * temperature * dirac_delta, \
+                 squares.std() / np.sqrt(squares.size))
+
+
+def passage_checks(result, damping_coefficient, temperature, initial_position, wall, \
+                   kB=1, dirac_delta=1):
+    """
+    Check first passages against the diffusion limit.
+
+    Args:
+        result: a ``lds.first_passage.FirstPassageResult`` without censored
+        runs.
+        damping_coefficient: the damping coefficient of the system.
+        temperature: the temperature of the system.
+        initial_position: the initial position of the runs.
+        wall: the wall boundary for the system.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+
+    Returns:
+        results: a list of two checks, see ``check``, of the mean
+        first-passage time and of the fraction of runs ending at ``wall``.
+    """
+    split = exit_split(damping_coefficient, temperature, initial_position, wall, kB, \
+                       dirac_delta)
+    high = result.side_fractions()[1]
+    return [check('mfpt', result.mean, diffusion_mfpt(damping_coefficient, temperature, \
+                  initial_position, wall, kB, dirac_delta), result.std_error, BIAS), \
+            check('exit_split', high, split, np.sqrt(split * (1 - split) / result.runs), \
+                  BIAS)]
+
+
+def _trajectory_case(backend, scheme, seed, steps, stride=50):
+    """Velocity variance of one long run, sampled every ``stride`` steps."""
+    p = EQUILIBRIUM
+    trajectory = integrate_trajectory(p['damping_coefficient'], 0.0, steps * p['time_step'], \
+                                      p['time_step'], p['temperature'], WALL / 2, WALL, \
+                                      noise=NoiseSource(p['temperature'], \
+                                                        p['damping_coefficient'], seed=seed), \
+                                      backend=backend, scheme=scheme)
+    # stride steps are five relaxation times, the samples are independent
+    return [velocity_check(trajectory.velocity[stride::stride], p['temperature'])]
+
+
+def _ensemble_case(backend, scheme, seed, particles, steps=100):
+    """Velocity variance of an ensemble after ten relaxation times."""
+    p = EQUILIBRIUM
+    velocities = ensemble_integrator(p['damping_coefficient'], 0.0, steps * p['time_step'], \
+                                     p['time_step'], p['temperature'], WALL / 2, WALL, \
+                                     particles, noise=NoiseSource(p['temperature'], \
+                                     p['damping_coefficient'], seed=seed), backend=backend, \
+                                     scheme=scheme)[0]
+    return [velocity_check(velocities, p['temperature'])]
+
+
+def _passage_case(backend, scheme, seed, runs, max_time_step=None):
+    """Mean first-passage time and exit split of diffusion-limited runs."""
+    p = DIFFUSION
+    result = first_passage(p['damping_coefficient'], 0.0, p['total_time'], p['time_step'], \
+                           p['temperature'], p['initial_position'], p['wall'], runs=runs, \
+                           noise=NoiseSource(p['temperature'], p['damping_coefficient'], \
+                                             seed=seed), backend=backend, scheme=scheme, \
+                           max_time_step=max_time_step)
+    return passage_checks(result, p['damping_coefficient'], p['temperature'], \
+                          p['initial_position'], p['wall'])
+
+
+def cases(backends=None, schemes=CHECKED_SCHEMES, scale=1.0):
+    """
+    Enumerate the regression cases.
+
+    Args:
+        backends: the backends to run. Default to None, every backend
+        available here.
+        schemes: the schemes to run. Default to 'baoab' and 'ou'.
+        scale: a factor on the number of runs and steps of every case.
+        Default to 1.
+
+    Yields:
+        name: a unique name of the case.
+        parameters: a dict describing the case.
+        function: a callable running the case and returning its checks.
+    """
+    if backends is None:
+        backends = [b for b in BACKENDS if resolve_backend(b) == b]
+    for scheme in schemes:
+        if scheme not in CHECKED_SCHEMES:
+            raise ValueError('No reference statistics for the {0} scheme, choose from {1}'\
+                             .format(scheme, CHECKED_SCHEMES))
+    for backend in backends:
+        share = scale * (PYTHON_SHARE if backend == 'python' else 1.0)
+        steps = max(int(200000 * share), 1000)
+        particles = max(int(20000 * share), 100)
+        runs = max(int(2000 * share), 100)
+        for scheme in schemes:
+            # seeds depend on the scheme only, so any selection of cases
+            # gives the same results
+            seed = CHECKED_SCHEMES.index(scheme)
+            def run_trajectory(backend=backend, scheme=scheme, seed=seed, steps=steps):
+                return _trajectory_case(backend, scheme, 100 + seed, steps)
+            yield 'trajectory[{0},{1}]'.format(backend, scheme), \
+                {'backend': backend, 'scheme': scheme, 'steps': steps}, run_trajectory
+
+            def run_ensemble(backend=backend, scheme=scheme, seed=seed, particles=particles):
+                return _ensemble_case(backend, scheme, 200 + seed, particles)
+            yield 'ensemble[{0},{1}]'.format(backend, scheme), \
+                {'backend': backend, 'scheme': scheme, 'particles': particles}, run_ensemble
+
+            def run_passage(backend=backend, scheme=scheme, seed=seed, runs=runs):
+                return _passage_case(backend, scheme, 300 + seed, runs)
+            yield 'first_passage[{0},{1}]'.format(backend, scheme), \
+                {'backend': backend, 'scheme': scheme, 'runs': runs}, run_passage
+
+    if 'ou' in schemes:
+        runs = max(int(2000 * scale), 100)
+        def run_adaptive(runs=runs):
+            return _passage_case(None, 'ou', 400, runs, max_time_step=0.64)
+        yield 'adaptive[ou]', {'scheme': 'ou', 'runs': runs, 'max_time_step': 0.64}, \
+            run_adaptive
+
+
+def _warm_up(parameters):
+    """Compile the kernels of a case, e.g. with Numba, before it is timed."""
+    backend = parameters.get('backend')
+    scheme = parameters['scheme']
+    noise = NoiseSource(1, 1, seed=0)
+    integrate_trajectory(1, 0, 2, 1, 1, WALL / 2, WALL, noise=noise, backend=backend, \
+                         scheme=scheme)
+    ensemble_integrator(1, 0, 2, 1, 1, WALL / 2, WALL, 2, noise=noise, backend=backend, \
+                        scheme=scheme)
+
+
+def run_case(function, parameters, repeat=1):
+    """
+    Run a regression case and time it.
+
+    Args:
+        function: a callable running the case and returning its checks.
+        parameters: a dict describing the case.
+        repeat: how many times to run the case, the fastest one is kept.
+        The seeds are fixed, so every repetition gives the same checks.
+        Default to 1.
+
+    Returns:
+        result: a dict with the parameters, the checks, whether they all
+        passed, the best wall time, the number of steps (single-trajectory
+        and ensemble steps) and the steps per second.
+    """
+    _warm_up(parameters)
+    best = float('inf')
+    for i in range(max(int(repeat), 1)):
+        with profiling.profile(trace_memory=False) as profiler:
+            checks = function()
+        best = min(best, profiler.report()['total_seconds'])
+    steps = profiler.counters.get('steps', 0) + profiler.counters.get('ensemble_steps', 0)
+    result = dict(parameters)
+    result.update({'checks': checks, 'passed': all(c['passed'] for c in checks), \
+                   'seconds': best, 'steps': int(steps), 'steps_per_second': steps / best})
+    return result
+
+
+def run_cases(backends=None, schemes=CHECKED_SCHEMES, scale=1.0, repeat=1):
+    """
+    Run every regression case.
+
+    Args:
+        backends, schemes, scale: see ``cases``.
+        repeat: see ``run_case``. Default to 1.
+
+    Returns:
+        results: a dict of the results of ``run_case`` by case name.
+    """
+    return {name: run_case(function, parameters, repeat) \
+            for name, parameters, function in cases(backends, schemes, scale)}
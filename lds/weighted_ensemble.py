@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Weighted ensemble sampling of rare first passages.
+
+When hitting a wall within ``total_time`` is rare, most brute-force runs are
+censored, and the few exits say little about their distribution. The
+weighted ensemble (Huber and Kim 1996) follows walkers that carry a
+statistical weight instead. The walkers are binned by their distance to the
+nearest wall, the progress coordinate. Every ``resample_every`` steps, each
+occupied bin is resampled to ``walkers_per_bin`` walkers of equal weight:
+
+* walkers in sparse bins close to the walls are cloned, sharing the weight
+  of their parent, so the rare paths towards the walls are followed by many
+  walkers;
+* walkers in crowded bins, stalled in the middle, are pruned, and the
+  survivors take over their weight.
+
+Resampling picks every walker with a probability proportional to its
+weight, so the expected weight of every path is preserved. Walkers that hit
+a wall leave the ensemble with their weight, which makes the weighted exit
+times an unbiased estimate of the first-passage time distribution, down to
+probabilities far below one over the number of walkers.
+"""
+
+import numpy as np
+
+from lds import profiling
+from lds.noise import NoiseSource
+from lds.potentials import as_potential
+from lds.schemes import draw_noise, scheme_coefficients, scheme_kernels
+
+
+class WeightedFirstPassageResult(object):
+    """
+    Weighted first passages of a weighted ensemble run.
+
+    Attributes:
+        exit_times: an array with the first-passage time of each exited walker.
+        exit_side: an int8 array, 1 for walkers that hit the wall at
+        ``wall``, -1 for the wall at 0.
+        weights: an array with the statistical weight of each exited walker.
+        survival: the total weight of the walkers still inside the walls at
+        ``total_time``.
+        steps: the number of walker steps integrated.
+    """
+
+    def __init__(self, exit_times, exit_side, weights, survival, steps):
+        order = np.argsort(exit_times, kind='stable')
+        self.exit_times = exit_times[order]
+        self.exit_side = exit_side[order]
+        self.weights = weights[order]
+        self.survival = survival
+        self.steps = steps
+
+    @property
+    def exit_probability(self):
+        """the probability of hitting a wall within ``total_time``."""
+        return float(self.weights.sum())
+
+    @property
+    def mean(self):
+        """the mean first-passage time of the paths hitting a wall in time."""
+        total = self.weights.sum()
+        return float(np.dot(self.weights, self.exit_times) / total) if total > 0 \
+            else float('nan')
+
+    def cdf(self, t):
+        """
+        Probability of hitting a wall by a given time.
+
+        Args:
+            t: a time or an array of times.
+
+        Returns:
+            the probabilities, P(T <= t).
+        """
+        cumulative = np.concatenate([[0.0], np.cumsum(self.weights)])
+        return cumulative[np.searchsorted(self.exit_times, t, side='right')]
+
+    def quantiles(self, q):
+        """
+        Quantiles of the first-passage time of the paths hitting a wall in time.
+
+        Args:
+            q: a quantile or an array of quantiles, between 0 and 1.
+
+        Returns:
+            the quantiles, nan without any exit.
+        """
+        if self.weights.size == 0:
+            return np.full(np.shape(q), np.nan)
+        cumulative = np.cumsum(self.weights) / self.weights.sum()
+        index = np.searchsorted(cumulative, q, side='left')
+        return self.exit_times[np.minimum(index, self.exit_times.size - 1)]
+
+    def side_fractions(self):
+        """
+        Probability of ending at each wall.
+
+        Returns:
+            low: the probability of hitting the wall at 0 first.
+            high: the probability of hitting the wall at ``wall`` first.
+            censored: the probability of hitting no wall by ``total_time``.
+        """
+        return float(self.weights[self.exit_side == -1].sum()), \
+            float(self.weights[self.exit_side == 1].sum()), float(self.survival)
+
+
+def progress_bins(wall, bins=20):
+    """
+    Edges of equal bins of the distance to the nearest wall.
+
+    Args:
+        wall: the wall boundary for the system.
+        bins: the number of bins. Default to 20.
+
+    Returns:
+        edges: an array of ``bins + 1`` distances, from 0 to ``wall / 2``.
+    """
+    return np.linspace(0, 0.5 * wall, int(bins) + 1)
+
+
+def resample(weights, bin_index, walkers_per_bin, offsets):
+    """
+    Resample every occupied bin to walkers of equal weight.
+
+    Walkers are picked by systematic resampling, with probabilities
+    proportional to their weights, so the expected weight given to each
+    walker is its current weight.
+
+    Args:
+        weights: an array with the weight of each walker.
+        bin_index: an integer array with the bin of each walker.
+        walkers_per_bin: the number of walkers of each occupied bin after
+        resampling.
+        offsets: an array of uniform numbers in [0, 1), one per bin.
+
+    Returns:
+        picked: an integer array with the walker copied into each new walker.
+        new_weights: an array with the weight of each new walker.
+    """
+    order = np.argsort(bin_index, kind='stable')
+    sorted_bins = bin_index[order]
+    cumulative = np.cumsum(weights[order])
+    occupied, first = np.unique(sorted_bins, return_index=True)
+    last = np.append(first[1:], sorted_bins.size) - 1
+    totals = np.bincount(sorted_bins, weights[order])[occupied]
+    start = cumulative[last] - totals
+    count = int(walkers_per_bin)
+    share = totals / count
+    targets = start[:, None] + (offsets[occupied][:, None] + np.arange(count)) * share[:, None]
+    picked = np.searchsorted(cumulative, targets, side='right')
+    # rounding can step over the edge of a bin, stay within it
+    picked = np.clip(picked, first[:, None], last[:, None])
+    return order[picked.ravel()], np.repeat(share, count)
+
+
+def _uniform(noise, size):
+    """Uniform numbers in [0, 1) from pairs of standard normal numbers."""
+    z = noise.draw(2 * size, standard=True).reshape(size, 2)
+    # (z1^2 + z2^2) / 2 is exponential, and exp(-E) uniform
+    return 1.0 - np.exp(-0.5 * (z ** 2).sum(axis=1))
+
+
+def weighted_ensemble(damping_coefficient, initial_velocity, total_time, time_step, \
+                      temperature, initial_position, wall, walkers_per_bin=20, \
+                      bins=20, resample_every=100, kB=1, dirac_delta=1, noise=None, \
+                      backend=None, scheme='euler', potential=None):
+    """
+    Estimate the first-passage time distribution with a weighted ensemble.
+
+    Walkers are integrated ``resample_every`` steps at a time by the ensemble
+    kernel of the scheme, see ``lds.ensemble.ensemble_integrator``, and
+    resampled in between, see the module documentation. The number of
+    walker steps is counted in the ``ensemble_steps`` counter of
+    ``lds.profiling``.
+
+    Args:
+        damping_coefficient: the damping coefficient of the system.
+        initial_velocity: the initial velocity of every walker.
+        total_time: the total simulation time.
+        time_step: the time step (dt) to be integrated on.
+        temperature: the temperature of the system.
+        initial_position: the initial position of every walker.
+        wall: the wall boundary for the system.
+        walkers_per_bin: the number of walkers kept in each occupied bin.
+        Default to 20.
+        bins: the number of bins of the distance to the nearest wall, or an
+        array of bin edges. Default to 20, see ``progress_bins``.
+        resample_every: the number of steps between two resamplings.
+        Default to 100.
+        kB: the Boltzman constant. Default to 1 in reduce unit.
+        dirac_delta: dirac delta distribution of t-t'. Default to 1.
+        noise: a NoiseSource providing the random forces. Default to None,
+        which creates an unseeded one from the given parameters.
+        backend: the integration backend, see ``lds.kernels``.
+        scheme: 'euler', 'baoab' or 'ou', see ``lds.schemes``. Default to
+        'euler'.
+        potential: the external potential, see ``ensemble_integrator``.
+
+    Returns:
+        result: a WeightedFirstPassageResult.
+    """
+    num_steps = int(total_time // time_step) # calculate the number of steps
+    count = int(walkers_per_bin)
+    resample_every = int(resample_every)
+    if count < 1 or resample_every < 1:
+        raise ValueError('Need at least one walker per bin and one step between '\
+                         'resamplings')
+    edges = progress_bins(wall, bins) if np.ndim(bins) == 0 else np.asarray(bins, float)
+    if noise is None:
+        noise = NoiseSource(temperature, damping_coefficient, kB, dirac_delta)
+    potential = as_potential(potential)
+    coefficients = scheme_coefficients(scheme, damping_coefficient, initial_velocity, \
+                                       time_step, temperature, kB, dirac_delta)
+    _, ensemble_chunk = scheme_kernels(scheme, damping_coefficient, time_step, \
+                                       backend, potential)
+
+    v = np.full(count, float(initial_velocity))
+    x = np.full(count, float(initial_position))
+    w = np.full(count, 1.0 / count)
+    exit_step = np.zeros(count, dtype=np.int64)
+    exit_side = np.zeros(count, dtype=np.int64)
+    exit_times = list()
+    exit_sides = list()
+    exit_weights = list()
+    steps = 0
+
+    done = 0
+    while done < num_steps and v.size > 0:
+        size = min(resample_every, num_steps - done)
+        with profiling.stage('ensemble'):
+            noise_block = draw_noise(noise, scheme, size, v.size)
+            ensemble_chunk(v, x, noise_block, coefficients, wall, exit_step, exit_side)
+        exited = exit_step > 0
+        walker_steps = int(np.where(exited, exit_step, size).sum())
+        profiling.count('ensemble_steps', walker_steps)
+        steps += walker_steps
+        if exited.any():
+            exit_times.append((done + exit_step[exited]) * time_step)
+            exit_sides.append(exit_side[exited].astype(np.int8))
+            exit_weights.append(w[exited])
+            keep = ~exited
+            v, x, w = v[keep], x[keep], w[keep]
+        done += size
+        if done < num_steps and v.size > 0:
+            # bin the walkers by their distance to the nearest wall
+            distance = np.minimum(x, wall - x)
+            bin_index = np.clip(np.searchsorted(edges, distance, side='right') - 1, \
+                                0, edges.size - 2)
+            picked, w = resample(w, bin_index, count, _uniform(noise, edges.size - 1))
+            v, x = v[picked], x[picked]
+        exit_step = np.zeros(v.size, dtype=np.int64)
+        exit_side = np.zeros(v.size, dtype=np.int64)
+
+    def joined(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+    return WeightedFirstPassageResult(joined(exit_times, float), joined(exit_sides, np.int8), \
+                                      joined(exit_weights, float), float(w.sum()), steps)
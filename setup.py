@@ -11,7 +11,7 @@ with open('README.rst') as readme_file:
 with open('HISTORY.rst') as history_file:
     history = history_file.read()
 
-requirements = ['Click>=6.0', ]
+requirements = ['Click>=6.0', 'numpy>=1.17', 'scipy', ]
 
 setup_requirements = ['pytest-runner', ]
 
@@ -25,12 +25,7 @@ setup(
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
-        "Programming Language :: Python :: 2",
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
     ],
     description="This is a simulatoof a particle",
@@ -45,6 +40,7 @@ setup(
     include_package_data=True,
     keywords='langevin_dynamics_simulator',
     name='langevin_dynamics_simulator',
+    python_requires='>=3.7',
     packages=find_packages(include=['langevin_dynamics_simulator']),
     setup_requires=setup_requirements,
     test_suite='tests',
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+
+"""Shared fixtures of the test suite."""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_directory(tmpdir, monkeypatch):
+    """Keep every test away from the user's result cache, and from other tests' results."""
+    directory = tmpdir.join('cache')
+    monkeypatch.setenv('LDS_CACHE_DIR', str(directory))
+    return directory
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.adaptive` module."""
+
+import unittest
+
+import numpy as np
+from scipy.stats import ks_2samp
+
+import lds.adaptive as adaptive
+from lds import profiling
+from lds.first_passage import first_passage
+from lds.noise import NoiseSource
+from lds.schemes import scheme_coefficients
+
+
+class Test_Adaptive(unittest.TestCase):
+    def test_levels(self):
+        levels = adaptive.step_levels(2, 0.01, 0.1, 1.5)
+        np.testing.assert_array_equal(levels['ticks'], [1, 2, 4, 8])
+        a, c, d, e, g, h = scheme_coefficients('ou', 2, 0.0, 0.04, 1.5)
+        self.assertEqual((levels['a'][2], levels['c'][2], levels['d'][2], \
+                          levels['g'][2], levels['h'][2]), (a, c, d, g, h))
+        self.assertAlmostEqual(levels['variance'][2], g ** 2 + h ** 2)
+        self.assertTrue(np.all(np.diff(levels['variance']) > 0))
+        with self.assertRaises(ValueError):
+            adaptive.step_levels(2, 0.01, 0.005, 1.5)
+
+    def test_choose_levels(self):
+        levels = adaptive.step_levels(1, 0.001, 0.512, 1)
+        level = adaptive.choose_levels(np.zeros(4), np.array([2.5, 1e-5, 5 - 1e-5, 2.5]), \
+                                       np.array([10 ** 6, 10 ** 6, 10 ** 6, 3]), 5, levels)
+        np.testing.assert_array_equal(level, [9, 0, 0, 1])
+        # a particle flying towards a wall slows down sooner
+        fast = adaptive.choose_levels(np.array([0.0, 50.0]), np.array([2.5, 2.5]), \
+                                      np.array([10 ** 6, 10 ** 6]), 5, levels)
+        self.assertLess(fast[1], fast[0])
+
+    def test_bridge(self):
+        low, high = adaptive.bridge_crossing(np.array([0.1, 2.5, 1.0]), \
+                                             np.array([0.2, 2.5, 1.0]), \
+                                             np.array([0.05, 0.05, 0.0]), 5)
+        self.assertAlmostEqual(low[0], np.exp(-2 * 0.1 * 0.2 / 0.05))
+        self.assertAlmostEqual(high[0], np.exp(-2 * 4.9 * 4.8 / 0.05))
+        self.assertLess(low[1], 1e-100)
+        # without noise over the step, nothing crosses unseen
+        self.assertEqual((low[2], high[2]), (0.0, 0.0))
+
+    def test_matches_fixed_steps(self):
+        runs = 2000
+        with profiling.profile(trace_memory=False) as fixed:
+            reference = first_passage(1, 0, 100, 0.002, 1, 1, 5, runs=runs, \
+                                      noise=NoiseSource(1, 1, seed=71), scheme='ou')
+        with profiling.profile(trace_memory=False) as adaptive_profile:
+            result = first_passage(1, 0, 100, 0.002, 1, 1, 5, runs=runs, \
+                                   noise=NoiseSource(1, 1, seed=72), scheme='ou', \
+                                   max_time_step=0.256)
+        self.assertFalse(result.censored.any())
+        error = np.hypot(reference.std_error, result.std_error)
+        self.assertLess(abs(result.mean - reference.mean), 4 * error)
+        self.assertGreater(ks_2samp(result.exit_times, reference.exit_times).pvalue, 0.01)
+        self.assertAlmostEqual(result.side_fractions()[0], \
+                               reference.side_fractions()[0], delta=0.05)
+        # exit times stay on the grid of the fixed steps
+        np.testing.assert_allclose(np.round(result.exit_times / 0.002) * 0.002, \
+                                   result.exit_times)
+        self.assertLess(adaptive_profile.counters['ensemble_steps'], \
+                        fixed.counters['ensemble_steps'] / 20)
+
+    def test_first_passage(self):
+        first = first_passage(1, 0, 5, 0.01, 1, 2.5, 5, runs=50, \
+                              noise=NoiseSource(1, 1, seed=73), scheme='ou', \
+                              max_time_step=0.16)
+        again = first_passage(1, 0, 5, 0.01, 1, 2.5, 5, runs=50, \
+                              noise=NoiseSource(1, 1, seed=73), scheme='ou', \
+                              max_time_step=0.16)
+        np.testing.assert_array_equal(first.exit_times, again.exit_times)
+        self.assertTrue(np.all(first.exit_times <= 5))
+        with self.assertRaises(ValueError):
+            first_passage(1, 0, 5, 0.01, 1, 2.5, 5, runs=50, max_time_step=0.16)
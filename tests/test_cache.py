@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.cache` module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    # python 3.4+ should use builtin unittest.mock not mock package
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+import numpy as np
+
+import lds
+import lds.cache as cache
+import lds.first_passage
+import lds.langevin_dynamics_simulator as simulator
+from lds.ensemble import ensemble_integrator
+from lds.first_passage import first_passage
+from lds.noise import NoiseSource
+from lds.potentials import HarmonicPotential
+
+
+class Test_Cache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = cache.ResultCache(os.path.join(self.directory, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_first_passage(self, seed=71, **kwargs):
+        noise = NoiseSource(1, 1, seed=seed)
+        result = first_passage(1, 0, 50, 0.1, 1, 2.5, 5, runs=40, noise=noise, \
+                               cache=self.cache, **kwargs)
+        return result, noise.draw(5)
+
+    def test_first_passage(self):
+        expected, after = self.run_first_passage()
+        self.assertEqual(len(self.cache.entries()), 1)
+        with mock.patch.object(lds.first_passage, 'ensemble_integrator') as integrator:
+            result, cached_after = self.run_first_passage()
+            integrator.assert_not_called()
+        np.testing.assert_array_equal(result.exit_times, expected.exit_times)
+        np.testing.assert_array_equal(result.exit_side, expected.exit_side)
+        self.assertEqual((result.mean, result.std_error), (expected.mean, expected.std_error))
+        # the noise source is left where the run would have left it
+        np.testing.assert_array_equal(cached_after, after)
+
+    def test_key(self):
+        self.run_first_passage()
+        self.run_first_passage(seed=72)
+        self.run_first_passage(scheme='baoab')
+        self.run_first_passage(potential=HarmonicPotential(1, 2.5))
+        self.assertEqual(len(self.cache.entries()), 4)
+        # every backend computes its own results
+        self.run_first_passage(backend='python')
+        self.run_first_passage(backend='numpy')
+        self.assertEqual(len(self.cache.entries()), 6 if lds.kernels.HAVE_NUMBA else 5)
+        entries = len(self.cache.entries())
+        with mock.patch.object(lds, '__version__', '99.0'):
+            self.run_first_passage()
+        self.assertEqual(len(self.cache.entries()), entries + 1)
+        # unseeded runs and force callables are not cached
+        first_passage(1, 0, 10, 0.1, 1, 2.5, 5, runs=5, cache=self.cache)
+        self.run_first_passage(potential=lambda x: -x)
+        self.assertEqual(len(self.cache.entries()), entries + 1)
+
+    def test_ensemble(self):
+        runs = [ensemble_integrator(1, 0, 20, 0.1, 1, 2.5, 5, 30, \
+                noise=NoiseSource(1, 1, seed=73), cache=self.cache) for i in range(2)]
+        self.assertEqual(len(self.cache.entries()), 1)
+        for expected, result in zip(*runs):
+            np.testing.assert_array_equal(expected, result)
+
+    def test_lru_eviction(self):
+        arrays = {'values': np.zeros(1000)}
+        for i, key in enumerate('abc'):
+            self.cache.put(key, arrays)
+            os.utime(self.cache._path(key), (i, i))
+        self.assertIsNotNone(self.cache.get('a')) # now the most recently used
+        self.cache.max_bytes = 3 * os.path.getsize(self.cache._path('a'))
+        self.cache.put('d', arrays)
+        self.assertIsNone(self.cache.get('b'))
+        for key in 'acd':
+            self.assertIsNotNone(self.cache.get(key))
+        self.assertLessEqual(self.cache.size(), self.cache.max_bytes)
+        self.cache.clear()
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_bypass(self):
+        bypass = cache.ResultCache(os.path.join(self.directory, 'none'), enabled=False)
+        bypass.put('a', {'values': np.zeros(3)})
+        self.assertIsNone(bypass.get('a'))
+        self.assertFalse(os.path.exists(bypass.directory))
+
+    def test_main(self):
+        options = ['-x0', '2', '-v0', '0', '-temp', '1', '-dc', '1', '-ts', '0.1', \
+                   '-tt', '20', '-ws', '5', '-s', '3', '-n', '20', '--no-plot', \
+                   '--cache-dir', self.cache.directory]
+        simulator.main(simulator.parse_args(options))
+        self.assertEqual(len(self.cache.entries()), 1)
+        with mock.patch.object(lds.first_passage, 'ensemble_integrator') as integrator:
+            simulator.main(simulator.parse_args(options))
+            integrator.assert_not_called()
+        simulator.main(simulator.parse_args(options + ['-s', '4', '--no-cache']))
+        self.assertEqual(len(self.cache.entries()), 1)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.checkpoint` module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import lds.checkpoint as checkpoint
+import lds.langevin_dynamics_simulator as simulator
+from lds.noise import NoiseSource
+
+
+class InterruptedFile(object):
+    """A file writer failing after a number of writes, like a killed run."""
+
+    def __init__(self, file, writes):
+        self.file = file
+        self.writes = writes
+
+    def write(self, text):
+        self.writes -= 1
+        if self.writes < 0:
+            raise KeyboardInterrupt
+        self.file.write(text)
+
+    def flush(self):
+        self.file.flush()
+
+    def tell(self):
+        return self.file.tell()
+
+
+class Test_Checkpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, checkpoint.CHECKPOINT_FILE)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_noise_state(self):
+        for drawn in (0, 10, 64):
+            source = NoiseSource(1, 1, seed=41, block_size=64)
+            source.draw(drawn)
+            state = source.get_state()
+            expected = source.draw(200)
+            restored = NoiseSource(1, 1, seed=42, block_size=64)
+            restored.set_state(state)
+            np.testing.assert_array_equal(restored.draw(200), expected)
+        with self.assertRaises(ValueError):
+            NoiseSource(1, 1, block_size=32).set_state(state)
+
+    def test_save_load(self):
+        source = NoiseSource(1, 1, seed=43)
+        source.draw(5)
+        saved = checkpoint.Checkpoint(12, 0.5, 2.25, source.get_state(), False, 300, \
+                                      {'seed': 43, 'time_step': 0.1})
+        saved.save(self.path)
+        loaded = checkpoint.Checkpoint.load(self.path)
+        self.assertEqual(os.listdir(self.directory), [checkpoint.CHECKPOINT_FILE])
+        self.assertEqual((loaded.step, loaded.velocity, loaded.position, \
+                          loaded.finished, loaded.output_size), (12, 0.5, 2.25, False, 300))
+        self.assertEqual(loaded.noise_state, saved.noise_state)
+        loaded.check({'seed': 43, 'time_step': 0.1})
+        with self.assertRaises(ValueError):
+            loaded.check({'seed': 44, 'time_step': 0.1})
+
+    def test_stream_resume(self):
+        for scheme in ('euler', 'baoab'):
+            full = list(simulator.stream_integrator(1, 0, 100, 0.01, 1, 2.5, 1000, \
+                        noise=NoiseSource(1, 1, seed=45, block_size=256), \
+                        chunk_size=100, record_every=7, scheme=scheme))
+            state = checkpoint.Checkpoint()
+            stream = simulator.stream_integrator(1, 0, 100, 0.01, 1, 2.5, 1000, \
+                     noise=NoiseSource(1, 1, seed=45, block_size=256), \
+                     chunk_size=100, record_every=7, scheme=scheme, checkpoint=state)
+            first = [next(stream) for i in range(4)]
+            state.save(self.path)
+            # the restored state overrides the seed of the new noise source
+            rest = list(simulator.stream_integrator(1, 0, 100, 0.01, 1, 2.5, 1000, \
+                        noise=NoiseSource(1, 1, seed=46, block_size=256), \
+                        chunk_size=100, record_every=7, scheme=scheme, \
+                        checkpoint=checkpoint.Checkpoint.load(self.path)))
+            resumed = first + rest
+            self.assertEqual(len(resumed), len(full))
+            for expected, result in zip(full, resumed):
+                np.testing.assert_array_equal(expected.index, result.index)
+                np.testing.assert_array_equal(expected.position, result.position)
+                np.testing.assert_array_equal(expected.velocity, result.velocity)
+
+    def test_main_resume(self):
+        options = ['-x0', '5e8', '-v0', '0', '-temp', '1', '-dc', '1', '-ts', '0.1', \
+                   '-tt', '20000', '-ws', '1e9', '-s', '7', '-n', '2', '--no-plot', \
+                   '--record-every', '1000', '--checkpoint-every', '0']
+        reference = os.path.join(self.directory, 'reference')
+        args = simulator.parse_args(options + ['-p', self.directory])
+        with open(reference, 'w') as file:
+            simulator.main(args, file)
+        self.assertFalse(os.path.exists(self.path))
+
+        output = os.path.join(self.directory, 'output')
+        with open(output, 'w') as file:
+            with self.assertRaises(KeyboardInterrupt):
+                simulator.main(args, InterruptedFile(file, 2))
+        saved = checkpoint.Checkpoint.load(self.path)
+        self.assertGreater(saved.step, 0)
+        args = simulator.parse_args(options + ['-p', self.directory, '--resume'])
+        with checkpoint.open_output(output, saved.output_size) as file:
+            velocity, position, time = simulator.main(args, file, saved)
+        with open(reference) as expected, open(output) as result:
+            self.assertEqual(expected.read(), result.read())
+        self.assertFalse(os.path.exists(self.path))
+
+        args['seed'] = 8
+        with self.assertRaises(ValueError):
+            simulator.main(args, None, saved)
+
+    def test_resume_without_checkpoint(self):
+        import subprocess
+        import sys
+        command = [sys.executable, '-m', 'lds.langevin_dynamics_simulator', '-x0', '2', \
+                   '-v0', '0', '-temp', '1', '-dc', '1', '-ts', '0.1', '-tt', '1', '-ws', '5', \
+                   '--no-plot', '-p', self.directory, '--resume']
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        _, error = process.communicate()
+        self.assertEqual(process.returncode, 1)
+        self.assertIn(b'No checkpoint to resume from', error)
+        self.assertNotIn(b'Traceback', error)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.decimate` module."""
+
+import unittest
+
+import numpy as np
+
+import lds.decimate as decimate
+
+
+class Test_Decimate(unittest.TestCase):
+    def test_minmax_decimate(self):
+        rng = np.random.default_rng(91)
+        position = np.cumsum(rng.standard_normal(100003))
+        time = np.arange(position.size) * 0.01
+        kept_time, kept_position = decimate.minmax_decimate(time, position, 1000)
+        self.assertLessEqual(kept_time.size, 1000)
+        # in time order, and every extreme of the trajectory is kept
+        self.assertTrue(np.all(np.diff(kept_time) >= 0))
+        self.assertEqual(kept_position.min(), position.min())
+        self.assertEqual(kept_position.max(), position.max())
+        np.testing.assert_array_equal(kept_position, position[np.rint(kept_time / 0.01)\
+                                                              .astype(int)])
+        # short trajectories are drawn whole
+        kept_time, kept_position = decimate.minmax_decimate([0, 1, 2], [3, 4, 5])
+        np.testing.assert_array_equal(kept_position, [3, 4, 5])
+        with self.assertRaises(ValueError):
+            decimate.minmax_decimate(time, position[1:])
+
+    def test_fixed_histogram(self):
+        values = np.random.default_rng(92).exponential(size=200001)
+        histogram = decimate.BinnedHistogram(10, values.min(), values.max())\
+            .update(values, chunk_size=1000)
+        counts, edges = np.histogram(values, 10)
+        np.testing.assert_allclose(histogram.edges, edges)
+        np.testing.assert_array_equal(histogram.counts, counts)
+        empty = decimate.BinnedHistogram(10, 0.0, 0.0).update(np.zeros(5))
+        np.testing.assert_array_equal(empty.counts, np.histogram(np.zeros(5), 10)[0])
+
+    def test_fixed_histogram_upper_edge(self):
+        # 0.1 + 10 * 0.02 rounds below 0.3, the largest value is still counted
+        values = [0.1, 0.2, 0.3]
+        histogram = decimate.BinnedHistogram(10, 0.1, 0.3).update(values)
+        counts, edges = np.histogram(values, 10)
+        self.assertEqual(histogram.edges[-1], 0.3)
+        np.testing.assert_array_equal(histogram.counts, counts)
+        values = np.random.default_rng(93).uniform(0.1, 0.7, 1001)
+        histogram = decimate.BinnedHistogram(7, values.min(), values.max()).update(values)
+        counts, edges = np.histogram(values, 7)
+        np.testing.assert_array_equal(histogram.edges, edges)
+        np.testing.assert_array_equal(histogram.counts, counts)
+
+    def test_growing_histogram(self):
+        histogram = decimate.BinnedHistogram(4)
+        histogram.update([0.5, 1.5, 1.9])
+        self.assertAlmostEqual(histogram.width, 1.9 / 4, places=6)
+        histogram.update([7.0, 0.1])
+        # the range doubled until 7 fits, and no value was lost
+        self.assertGreater(histogram.edges[-1], 7.0)
+        self.assertEqual(histogram.counts.sum(), 5)
+        np.testing.assert_array_equal(histogram.counts, \
+                                      np.histogram([0.5, 1.5, 1.9, 7.0, 0.1], \
+                                                   histogram.edges)[0])
+        with self.assertRaises(ValueError):
+            histogram.update([-1.0])
+        with self.assertRaises(ValueError):
+            decimate.BinnedHistogram(3).update([1.0, 2.0]).update([10.0])
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.ensemble` module."""
+
+import unittest
+
+import numpy as np
+
+import lds.ensemble as ensemble
+
+
+class Test_Ensemble(unittest.TestCase):
+    def test_shapes(self):
+        v, p, t, alive = ensemble.ensemble_integrator(0.1, 0, 10, 0.1, 300, 2, 5, 50)
+        for array in (v, p, t, alive):
+            self.assertEqual(array.shape, (50,))
+        self.assertEqual(alive.dtype, bool)
+
+    def test_no_noise(self):
+        # without damping the velocity never changes and nobody exits
+        v, p, t, alive = ensemble.ensemble_integrator(0, 1e-4, 10, 1, 20, 0, 5, 10)
+        np.testing.assert_array_equal(v, 1e-4)
+        self.assertTrue(alive.all())
+        np.testing.assert_allclose(t, 10)
+
+    def test_exit_clamped_to_wall(self):
+        # deterministic drift to the right wall
+        v, p, t, alive = ensemble.ensemble_integrator(0, 1, 100, 1, 0, 0, 5, 4)
+        self.assertFalse(alive.any())
+        np.testing.assert_array_equal(p, 5)
+        # x reaches 6 > 5 on the sixth step
+        np.testing.assert_allclose(t, 6)
+
+    def test_exit_times_bounded(self):
+        v, p, t, alive = ensemble.ensemble_integrator(0.1, 0, 100, 0.1, 300, 0, 5, 200)
+        self.assertTrue(np.all(t <= 100))
+        # particles that left sit exactly on one of the walls
+        exited = ~alive
+        self.assertTrue(np.all((p[exited] == 0) | (p[exited] == 5)))
+        self.assertTrue(np.all((p[alive] >= 0) & (p[alive] <= 5)))
+
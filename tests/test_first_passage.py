@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.first_passage` module."""
+
+import unittest
+
+import numpy as np
+
+import lds.first_passage as first_passage
+from lds.noise import NoiseSource
+
+
+class Test_First_Passage(unittest.TestCase):
+    def test_running_stats(self):
+        values = np.random.RandomState(0).exponential(3, 1000)
+        stats = first_passage.RunningStats()
+        for batch in np.array_split(values, 7):
+            stats.update(batch)
+        self.assertEqual(stats.count, 1000)
+        self.assertAlmostEqual(stats.mean, np.mean(values))
+        self.assertAlmostEqual(stats.variance, np.var(values, ddof=1))
+        self.assertAlmostEqual(stats.std_error, np.std(values, ddof=1) / np.sqrt(1000))
+        low, high = stats.confidence_interval(0.95)
+        self.assertAlmostEqual((high - low) / 2, 1.959964 * stats.std_error, places=5)
+
+    def test_empty_stats(self):
+        stats = first_passage.RunningStats()
+        stats.update([])
+        self.assertEqual(stats.count, 0)
+        self.assertTrue(np.isnan(stats.std_error))
+
+    def test_sides_and_censoring(self):
+        result = first_passage.first_passage(1, 0, 20, 0.05, 1, 2.5, 5, runs=500, \
+                 noise=NoiseSource(1, 1, seed=1), batch_size=64)
+        self.assertEqual(result.runs, 500)
+        self.assertEqual(result.exit_side.dtype, np.int8)
+        np.testing.assert_array_equal(result.censored, result.exit_side == 0)
+        # censored runs last the whole simulation
+        np.testing.assert_allclose(result.exit_times[result.censored], int(20 // 0.05) * 0.05)
+        self.assertTrue(np.all(result.exit_times[~result.censored] <= 20))
+        self.assertAlmostEqual(sum(result.side_fractions()), 1)
+        self.assertEqual(result.stats.count, np.sum(~result.censored))
+        self.assertAlmostEqual(result.mean, np.mean(result.exit_times[~result.censored]))
+        low, median, high = result.quantiles([0.1, 0.5, 0.9])
+        self.assertLessEqual(low, median)
+        self.assertLessEqual(median, high)
+
+    def test_symmetric_split(self):
+        # starting in the middle, both walls are equally likely
+        result = first_passage.first_passage(1, 0, 200, 0.05, 1, 2.5, 5, runs=2000, \
+                 noise=NoiseSource(1, 1, seed=2))
+        low, high, censored = result.side_fractions()
+        self.assertAlmostEqual(low, 0.5, delta=0.05)
+        self.assertAlmostEqual(high, 0.5, delta=0.05)
+
+    def test_early_stop(self):
+        result = first_passage.first_passage(1, 0, 200, 0.05, 1, 2.5, 5, runs=100000, \
+                 noise=NoiseSource(1, 1, seed=3), batch_size=200, target_std_error=0.5)
+        self.assertLess(result.runs, 100000)
+        self.assertLess(result.std_error, 0.5)
+        self.assertEqual(result.runs % 200, 0)
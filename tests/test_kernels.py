@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.kernels` module."""
+
+import unittest
+import warnings
+try:
+    # python 3.4+ should use builtin unittest.mock not mock package
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+import numpy as np
+
+import lds.kernels as kernels
+import lds.langevin_dynamics_simulator as simulator
+from lds.ensemble import ensemble_integrator
+from lds.noise import NoiseSource
+
+
+class Test_Kernels(unittest.TestCase):
+    def test_single_backends_agree(self):
+        runs = dict()
+        for backend in kernels.BACKENDS:
+            runs[backend] = simulator.euler_trajectory(0.5, 0, 200, 0.01, 1, 2.5, 5, \
+                            noise=NoiseSource(1, 0.5, seed=11), chunk_size=100, \
+                            backend=backend)
+        for backend in kernels.BACKENDS:
+            np.testing.assert_array_equal(runs['python'].position, runs[backend].position)
+            np.testing.assert_array_equal(runs['python'].velocity, runs[backend].velocity)
+
+    def test_ensemble_backends_agree(self):
+        runs = dict()
+        for backend in kernels.BACKENDS:
+            runs[backend] = ensemble_integrator(0.1, 0, 100, 0.1, 300, 0, 5, 300, \
+                            noise=NoiseSource(300, 0.1, seed=12), backend=backend, \
+                            chunk_size=1000)
+        for backend in kernels.BACKENDS:
+            for expected, result in zip(runs['python'], runs[backend]):
+                np.testing.assert_array_equal(expected, result)
+
+    def test_numpy_kernel_exit(self):
+        out_velocity = np.empty(10)
+        out_position = np.empty(10)
+        steps, side = kernels.euler_chunk_numpy(-1.0, 2.0, np.zeros(10), (0.0, 1.0), 5, \
+                                                out_velocity, out_position)
+        # 2 -> 1 -> 0 -> -1 crosses the wall at 0 on the third step
+        self.assertEqual((steps, side), (3, -1))
+        self.assertEqual(out_position[2], 0)
+
+    def test_resolve_backend(self):
+        self.assertIn(kernels.resolve_backend(), ('numba', 'numpy'))
+        self.assertEqual(kernels.resolve_backend('python'), 'python')
+        with self.assertRaises(ValueError):
+            kernels.resolve_backend('fortran')
+
+    def test_numba_fallback(self):
+        with mock.patch.object(kernels, 'HAVE_NUMBA', False):
+            self.assertEqual(kernels.resolve_backend(), 'numpy')
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                self.assertEqual(kernels.resolve_backend('numba'), 'numpy')
+            self.assertEqual(len(caught), 1)
@@ -127,5 +127,42 @@ class Test_Langevin_Dynamics_Simulator(unittest.TestCase):
             self.assertEqual(position_list[0], 0)
             self.assertEqual(time_list[0], 0.0)
 
+    def test_stream_integrator(self):
+        noise = simulator.NoiseSource(1, 1, seed=7)
+        chunks = list(simulator.stream_integrator(1, 0, 50, 0.01, 1, 2.5, 5, \
+                      noise=noise, chunk_size=64, record_every=10))
+        index = np.concatenate([c.index for c in chunks])
+        full = simulator.euler_trajectory(1, 0, 50, 0.01, 1, 2.5, 5, \
+               noise=simulator.NoiseSource(1, 1, seed=7), chunk_size=64)
+        # every 10th step is kept, plus the last one
+        self.assertEqual(index[-1], len(full) - 1)
+        self.assertTrue(np.all(index[:-1] % 10 == 0))
+        position = np.concatenate([c.position for c in chunks])
+        np.testing.assert_array_equal(position, full.position[index])
 
+    def test_main_output(self):
+        args = simulator.parse_args(['-x0', '2', '-v0', '0', '-temp', '1', \
+               '-dc', '1', '-ts', '0.1', '-tt', '20', '-ws', '5', \
+               '-s', '3', '--record-every', '5'])
+        outfile = StringIO()
+        velocity_list, position_list, time_list = simulator.main(args, outfile)
+        lines = outfile.getvalue().strip().split('\n')
+        self.assertEqual(len(lines), len(time_list))
+        self.assertEqual(lines[0], '0 0.00 2.000000 0.000000')
+
+    def test_headless_import(self):
+        # importing the package must not pull in matplotlib, nor the sweep,
+        # server and validation modules with their process pools
+        import subprocess
+        code = 'import sys, lds; print([name for name in ("matplotlib", "lds.sweep", ' \
+               '"lds.server", "lds.validation") if name in sys.modules])'
+        loaded = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(loaded.strip(), b'[]')
 
+    def test_main_no_plot(self):
+        args = simulator.parse_args(['-x0', '2', '-v0', '0', '-temp', '1', \
+               '-dc', '1', '-ts', '0.1', '-tt', '20', '-ws', '5', '--no-plot'])
+        self.assertTrue(args['no_plot'])
+        with mock.patch.object(simulator, 'plot_figures') as plot_figures:
+            simulator.main(args)
+            plot_figures.assert_not_called()
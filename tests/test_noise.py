@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.noise` module."""
+
+import unittest
+
+import numpy as np
+import scipy.stats as ss
+
+import lds.noise as noise
+import lds.langevin_dynamics_simulator as simulator
+
+
+class Test_Noise(unittest.TestCase):
+    def test_zero_variance(self):
+        source = noise.NoiseSource(0, 0, seed=1)
+        self.assertEqual(source.draw(), 0.0)
+        np.testing.assert_array_equal(source.draw(10), 0.0)
+
+    def test_distribution(self):
+        source = noise.NoiseSource(100, 1, seed=2, block_size=1000)
+        forces = source.draw(5000) # crosses several refills
+        self.assertGreater(ss.shapiro(forces)[1], 0.05)
+        self.assertAlmostEqual(np.std(forces) / np.sqrt(200), 1, delta=0.05)
+
+    def test_reproducible(self):
+        first = noise.NoiseSource(10, 1, seed=3, block_size=7)
+        second = noise.NoiseSource(10, 1, seed=3, block_size=7)
+        scalars = [first.draw() for i in range(10)]
+        # scalar and block draws walk the same stream
+        np.testing.assert_array_equal(scalars, second.draw(10))
+
+    def test_streams_independent(self):
+        first = noise.NoiseSource(10, 1, seed=4, stream=0)
+        second = noise.NoiseSource(10, 1, seed=4, stream=1)
+        self.assertFalse(np.array_equal(first.draw(100), second.draw(100)))
+        spawned = first.spawn(2)
+        self.assertEqual([s.stream for s in spawned], [1, 2])
+        np.testing.assert_array_equal(
+            spawned[0].draw(100), noise.NoiseSource(10, 1, seed=4, stream=1).draw(100))
+
+    def test_seeded_integrator(self):
+        runs = [simulator.euler_integrator(1, 0, 50, 0.1, 1, 2.5, 5, \
+                noise=noise.NoiseSource(1, 1, seed=5)) for i in range(2)]
+        self.assertEqual(runs[0], runs[1])
+
+    def test_standard(self):
+        scaled = noise.NoiseSource(2, 1, seed=8, block_size=16)
+        standard = noise.NoiseSource(2, 1, seed=8, block_size=16)
+        # the same stream, scaled by the standard deviation or not
+        np.testing.assert_allclose(scaled.draw(40), 2 * standard.draw(40, standard=True))
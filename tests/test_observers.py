@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.observers` module."""
+
+import unittest
+
+import numpy as np
+
+import lds.observers as observers
+import lds.langevin_dynamics_simulator as simulator
+from lds.noise import NoiseSource
+
+
+def direct_windows(values, window, function):
+    """Per-window estimates with plain loops, for reference."""
+    estimates = list()
+    for w in range(values.size // window):
+        block = values[w * window:(w + 1) * window]
+        estimates.append([np.mean([function(block[t], block[t + k]) \
+                          for t in range(window - k)]) for k in range(window)])
+    return np.array(estimates)
+
+
+class Test_Observers(unittest.TestCase):
+    def setUp(self):
+        self.moments = observers.MomentsObserver('velocity')
+        self.positions = observers.MomentsObserver('position')
+        self.density = observers.DensityObserver(1000, bins=40)
+        self.vacf = observers.AutocorrelationObserver(20)
+        self.msd = observers.MSDObserver(20)
+        self.all = [self.moments, self.positions, self.density, self.vacf, self.msd]
+
+    def test_stream_observes_every_step(self):
+        chunks = list(simulator.stream_integrator(1, 0, 50, 0.1, 1, 500, 1000, \
+                      noise=NoiseSource(1, 1, seed=51), chunk_size=37, \
+                      record_every=10, scheme='baoab', observers=self.all))
+        full = simulator.integrate_trajectory(1, 0, 50, 0.1, 1, 500, 1000, \
+               noise=NoiseSource(1, 1, seed=51), scheme='baoab')
+        self.assertLess(sum(len(c) for c in chunks), len(full))
+        self.assertEqual(self.moments.count, len(full))
+        self.assertAlmostEqual(self.moments.mean, np.mean(full.velocity))
+        self.assertAlmostEqual(self.moments.variance, np.var(full.velocity, ddof=1))
+        self.assertAlmostEqual(self.positions.mean, np.mean(full.position))
+        self.assertAlmostEqual(self.moments.kinetic_temperature(), \
+                               np.mean(full.velocity ** 2))
+        counts, _ = np.histogram(full.position, bins=40, range=(0, 1000))
+        np.testing.assert_array_equal(self.density.counts, counts)
+        self.assertAlmostEqual(np.sum(self.density.density()) * 25, 1)
+
+        # windows don't line up with the chunks of 37 steps
+        self.assertEqual(self.vacf.windows, len(full) // 20)
+        np.testing.assert_allclose(self.vacf.mean(), np.mean(direct_windows( \
+            full.velocity, 20, lambda a, b: a * b), axis=0), atol=1e-10)
+        np.testing.assert_allclose(self.msd.mean(), np.mean(direct_windows( \
+            full.position, 20, lambda a, b: (b - a) ** 2), axis=0), atol=1e-10)
+        np.testing.assert_allclose(self.msd.lags, np.arange(20) * 0.1)
+
+    def test_integrate_trajectory(self):
+        full = simulator.integrate_trajectory(1, 0, 20, 0.1, 1, 2.5, 5, \
+               noise=NoiseSource(1, 1, seed=52), chunk_size=16, observers=self.all)
+        self.assertEqual(self.moments.count, len(full))
+        self.assertEqual(self.density.counts.sum(), len(full))
+
+    def test_ou_correlations(self):
+        # exact scheme far from the walls, started at equilibrium
+        vacf = observers.AutocorrelationObserver(30)
+        msd = observers.MSDObserver(30)
+        moments = observers.MomentsObserver()
+        simulator.integrate_trajectory(0.5, 0, 20000, 0.1, 2, 5e5, 1e6, \
+            noise=NoiseSource(2, 0.5, seed=53), scheme='ou', \
+            observers=[vacf, msd, moments])
+        self.assertAlmostEqual(moments.kinetic_temperature(), 2, delta=0.1)
+        expected = 2 * np.exp(-0.5 * vacf.lags)
+        np.testing.assert_allclose(vacf.mean(), expected, atol=0.15)
+        self.assertTrue((vacf.std_error() > 0).all())
+        # MSD of the Ornstein-Uhlenbeck process, 2 kB T / gamma^2 (gamma t - 1 + exp(-gamma t))
+        t = msd.lags
+        expected = 2 * 2 / 0.5 ** 2 * (0.5 * t - 1 + np.exp(-0.5 * t))
+        np.testing.assert_allclose(msd.mean()[1:], expected[1:], rtol=0.15)
+
+    def test_empty(self):
+        self.assertTrue(np.isnan(self.vacf.mean()).all())
+        self.assertTrue(np.isnan(self.moments.kinetic_temperature()))
+        np.testing.assert_array_equal(self.density.density(), 0)
+        with self.assertRaises(ValueError):
+            observers.MomentsObserver('time')
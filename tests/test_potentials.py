@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.potentials` module."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import lds.potentials as potentials
+import lds.langevin_dynamics_simulator as simulator
+from lds.ensemble import ensemble_integrator
+from lds.noise import NoiseSource
+
+
+class Test_Potentials(unittest.TestCase):
+    def test_force_is_gradient(self):
+        x = np.linspace(0.1, 4.9, 50)
+        for potential in (potentials.HarmonicPotential(2, 2.5), \
+                          potentials.DoubleWellPotential(3, 2.5, 1.5), \
+                          potentials.PeriodicPotential(0.5, 1.3, 0.2)):
+            h = 1e-6
+            gradient = (potential.energy(x + h) - potential.energy(x - h)) / (2 * h)
+            np.testing.assert_allclose(potential.force(x), -gradient, atol=1e-6)
+            np.testing.assert_array_equal(potential(x), potential.force(x))
+
+    def test_tabulated(self):
+        harmonic = potentials.HarmonicPotential(2, 2.5)
+        table = potentials.TabulatedPotential.from_function(harmonic.energy, 0, 5, 1001)
+        x = np.random.uniform(0.01, 4.99, 100)
+        np.testing.assert_allclose(table.force(x), harmonic.force(x), atol=1e-3)
+        np.testing.assert_allclose(table.energy(x), harmonic.energy(x), atol=1e-4)
+        # clamped to the ends of the grid
+        self.assertAlmostEqual(float(table.force(-1.0)), float(table.force(0.0)))
+        self.assertAlmostEqual(float(table.force(7.0)), float(table.force(5.0)))
+        with self.assertRaises(ValueError):
+            potentials.TabulatedPotential(0, 1, [1.0])
+
+    def test_as_potential(self):
+        self.assertIsNone(potentials.as_potential(None))
+        harmonic = potentials.HarmonicPotential()
+        self.assertIs(potentials.as_potential(harmonic), harmonic)
+        wrapped = potentials.as_potential(lambda x: -x)
+        np.testing.assert_array_equal(wrapped.force(np.arange(3.0)), [0, -1, -2])
+        with self.assertRaises(NotImplementedError):
+            wrapped.energy(1.0)
+        with self.assertRaises(TypeError):
+            potentials.as_potential(3)
+
+    def test_from_spec(self):
+        harmonic = potentials.from_spec('harmonic:k=2,center=2.5')
+        self.assertEqual((harmonic.k, harmonic.center), (2, 2.5))
+        self.assertIsInstance(potentials.from_spec('double_well'), \
+                              potentials.DoubleWellPotential)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'table.txt')
+            grid = np.linspace(0, 5, 11)
+            np.savetxt(path, np.column_stack([grid, grid ** 2]))
+            table = potentials.from_spec('tabulated:file=' + path)
+            self.assertAlmostEqual(float(table.energy(2.5)), 6.25)
+        with self.assertRaises(ValueError):
+            potentials.from_spec('coulomb')
+
+    def test_zero_force(self):
+        for scheme in ('euler', 'baoab', 'ou'):
+            free = simulator.integrate_trajectory(1, 0, 20, 0.1, 1, 2.5, 5, \
+                   noise=NoiseSource(1, 1, seed=21), scheme=scheme)
+            zero = simulator.integrate_trajectory(1, 0, 20, 0.1, 1, 2.5, 5, \
+                   noise=NoiseSource(1, 1, seed=21), scheme=scheme, \
+                   potential=lambda x: np.zeros_like(x))
+            np.testing.assert_allclose(free.position, zero.position, atol=1e-9)
+            np.testing.assert_allclose(free.velocity, zero.velocity, atol=1e-9)
+
+    def test_single_matches_ensemble(self):
+        well = potentials.DoubleWellPotential(2, 2.5, 1)
+        for scheme in ('euler', 'baoab', 'ou'):
+            trajectory = simulator.integrate_trajectory(1, 0, 10, 0.05, 1, 2.5, 5, \
+                         noise=NoiseSource(1, 1, seed=22), scheme=scheme, potential=well)
+            velocities, positions, _, _ = ensemble_integrator(1, 0, 10, 0.05, 1, 2.5, \
+                5, 1, noise=NoiseSource(1, 1, seed=22), scheme=scheme, potential=well)
+            self.assertAlmostEqual(trajectory.position[-1], positions[0])
+            self.assertAlmostEqual(trajectory.velocity[-1], velocities[0])
+
+    def test_harmonic_equilibrium(self):
+        # far from the walls the positions sample exp(-U / kB T)
+        harmonic = potentials.HarmonicPotential(2, 50)
+        for scheme in ('baoab', 'ou'):
+            velocities, positions, _, alive = ensemble_integrator(1, 0, 30, 0.05, 1, \
+                50, 100, 4000, noise=NoiseSource(1, 1, seed=23), scheme=scheme, \
+                potential=harmonic)
+            self.assertTrue(alive.all())
+            self.assertAlmostEqual(np.mean(positions), 50, delta=0.1)
+            self.assertAlmostEqual(np.var(positions), 0.5, delta=0.05)
+            self.assertAlmostEqual(np.var(velocities), 1, delta=0.1)
+
+    def test_main_potential(self):
+        args = simulator.parse_args(['-x0', '2.5', '-v0', '0', '-temp', '1', '-dc', '1', \
+                                     '-ts', '0.1', '-tt', '5', '-ws', '5', '-s', '3', \
+                                     '-n', '10', '--no-plot', '-i', 'baoab', \
+                                     '--potential', 'harmonic:k=4,center=2.5'])
+        velocity, position, time = simulator.main(args)
+        self.assertEqual(len(position), len(time))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.profiling` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+
+import lds.profiling as profiling
+import lds.langevin_dynamics_simulator as simulator
+from lds.ensemble import ensemble_integrator
+from lds.noise import NoiseSource
+
+
+class Test_Profiling(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_report(self):
+        path = os.path.join(self.directory, 'profile.json')
+        outfile = StringIO()
+        with profiling.profile(path) as profiler:
+            trajectory = simulator.integrate_trajectory(1, 0, 100, 0.01, 0, 2.5, 5, \
+                         noise=NoiseSource(0, 1, seed=61, block_size=1000), chunk_size=3000)
+            simulator.output_file(trajectory, outfile)
+            ensemble_integrator(1, 0, 10, 0.1, 1, 2.5, 5, 50, \
+                                noise=NoiseSource(1, 1, seed=62))
+        report = profiler.report()
+        with open(path) as file:
+            self.assertEqual(json.load(file)['counters'], report['counters'])
+        counters = report['counters']
+        self.assertEqual(counters['steps'], len(trajectory) - 1)
+        self.assertEqual(counters['bytes_written'], len(outfile.getvalue()))
+        self.assertGreaterEqual(counters['rng_draws'], counters['steps'])
+        self.assertGreater(counters['ensemble_steps'], 0)
+        for stage in ('integrate', 'random_force', 'output', 'ensemble'):
+            self.assertGreater(report['stages'][stage]['seconds'], 0)
+        self.assertEqual(report['stages']['integrate']['calls'], 4)
+        self.assertGreater(report['steps_per_second'], 0)
+        self.assertGreater(report['peak_memory_bytes'], 0)
+        self.assertGreaterEqual(report['total_seconds'], report['stages']['integrate']['seconds'])
+
+    def test_disabled(self):
+        self.assertIsNone(profiling._ACTIVE)
+        with profiling.stage('integrate'):
+            profiling.count('steps', 10)
+        with profiling.profile() as outer:
+            with profiling.profile(trace_memory=False) as inner:
+                profiling.count('steps', 3)
+            self.assertIs(profiling._ACTIVE, outer)
+        self.assertIsNone(profiling._ACTIVE)
+        self.assertEqual(inner.counters, {'steps': 3})
+        self.assertEqual(outer.counters, {})
+
+    def test_main_profile(self):
+        args = simulator.parse_args(['-x0', '2', '-v0', '0', '-temp', '1', '-dc', '1', \
+               '-ts', '0.1', '-tt', '20', '-ws', '5', '-s', '3', '-n', '10', \
+               '--no-plot', '--profile', '-p', self.directory])
+        simulator.main(args, StringIO())
+        with open(os.path.join(self.directory, 'profile.json')) as file:
+            report = json.load(file)
+        self.assertIn('first_passage', report['stages'])
+        self.assertGreater(report['counters']['bytes_written'], 0)
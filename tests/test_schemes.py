@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.schemes` module."""
+
+import unittest
+
+import numpy as np
+
+import lds.schemes as schemes
+import lds.langevin_dynamics_simulator as simulator
+from lds.ensemble import ensemble_integrator
+from lds.kernels import BACKENDS
+from lds.noise import NoiseSource
+
+# walls far away from a particle starting in the middle
+WALL = 2e12
+MIDDLE = 1e6
+
+
+class Test_Schemes(unittest.TestCase):
+    def test_coefficients(self):
+        self.assertEqual(schemes.scheme_coefficients('euler', 0.5, 2, 0.1, 1), (-1.0, 0.1))
+        a, c, d, e, g, h = schemes.scheme_coefficients('baoab', 1, 0, 0.1, 2)
+        self.assertAlmostEqual(a, np.exp(-0.1))
+        self.assertAlmostEqual(c ** 2, 2 * (1 - np.exp(-0.2)))
+        self.assertEqual((d, e, g, h), (0.05, 0.05, 0.0, 0.0))
+        # no friction: free flight for the exact scheme
+        self.assertEqual(schemes.scheme_coefficients('ou', 0, 0, 0.1, 2), \
+                         (1.0, 0.0, 0.1, 0.0, 0.0, 0.0))
+        with self.assertRaises(ValueError):
+            schemes.scheme_coefficients('rk4', 1, 0, 0.1, 1)
+
+    def test_position_variance_factor(self):
+        # the series matches the closed form where both are accurate
+        u = 0.4
+        closed = 2 * u - 3 + 4 * np.exp(-u) - np.exp(-2 * u)
+        self.assertAlmostEqual(schemes._position_variance_factor(u), closed, places=12)
+        self.assertAlmostEqual(schemes._position_variance_factor(1e-4) / (2.0 / 3 * 1e-12), \
+                               1, places=3)
+
+    def test_integrators_signature(self):
+        for name, integrator in simulator.INTEGRATORS.items():
+            v, p, t = integrator(1, 0, 10, 0.5, 1, 2.5, 5, noise=NoiseSource(1, 1, seed=1))
+            self.assertIsInstance(v, list)
+            self.assertEqual(len(v), len(p))
+            self.assertEqual(len(p), len(t))
+            self.assertEqual(p[0], 2.5)
+
+    def test_backends_agree(self):
+        for scheme in ('baoab', 'ou'):
+            runs = [simulator.integrate_trajectory(1, 0, 50, 0.1, 1, 2.5, 5, \
+                    noise=NoiseSource(1, 1, seed=2), chunk_size=64, backend=backend, \
+                    scheme=scheme) for backend in BACKENDS]
+            ensembles = [ensemble_integrator(1, 0, 20, 0.5, 1, 2.5, 5, 100, \
+                         noise=NoiseSource(1, 1, seed=3), backend=backend, \
+                         scheme=scheme) for backend in BACKENDS]
+            for run, ensemble in zip(runs[1:], ensembles[1:]):
+                np.testing.assert_allclose(run.position, runs[0].position, rtol=1e-12)
+                np.testing.assert_allclose(ensemble[1], ensembles[0][1], rtol=1e-12)
+
+    def test_equilibrium_large_time_step(self):
+        # velocity variance is kB * T whatever the time step
+        for scheme in ('baoab', 'ou'):
+            v, x, t, alive = ensemble_integrator(1, 0, 20, 1.0, 2, MIDDLE, WALL, 20000, \
+                             noise=NoiseSource(2, 1, seed=4), scheme=scheme)
+            self.assertAlmostEqual(np.var(v) / 2, 1, delta=0.05)
+
+    def test_exact_diffusion(self):
+        # position variance of the exact scheme matches the analytic one
+        v, x, t, alive = ensemble_integrator(1, 0, 4, 2.0, 2, MIDDLE, WALL, 40000, \
+                         noise=NoiseSource(2, 1, seed=5), scheme='ou')
+        expected = 2 * schemes._position_variance_factor(4.0)
+        self.assertAlmostEqual(np.mean((x - MIDDLE) ** 2) / expected, 1, delta=0.05)
+
+    def test_noise_width(self):
+        noise = NoiseSource(1, 1, seed=6)
+        self.assertEqual(schemes.draw_noise(noise, 'euler', 5).shape, (5,))
+        self.assertEqual(schemes.draw_noise(noise, 'baoab', 5, 3).shape, (5, 3, 1))
+        self.assertEqual(schemes.draw_noise(noise, 'ou', 5).shape, (5, 2))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.server` module."""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+try:
+    # python 3.4+ should use builtin unittest.mock not mock package
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+import numpy as np
+
+import lds.server as server
+import lds.langevin_dynamics_simulator as simulator
+
+SPEC = {'initial_position': 2.5, 'initial_velocity': 0, 'temperature': 1, \
+        'damping_coefficient': 1, 'time_step': 0.05, 'total_time': 50, \
+        'wall_size': 5, 'runs': 40, 'no_cache': True}
+
+
+async def request(port, method, path, payload=None):
+    """Send an HTTP request and read the status and the JSON lines of the answer."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write('{0} {1} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {2}\r\n\r\n'\
+                 .format(method, path, len(body)).encode('latin-1') + body)
+    await writer.drain()
+    answer = (await reader.read()).decode('utf-8')
+    writer.close()
+    await writer.wait_closed()
+    head, _, content = answer.partition('\r\n\r\n')
+    return int(head.split()[1]), [json.loads(line) for line in content.splitlines()]
+
+
+class Test_Server(unittest.TestCase):
+    def test_job_args(self):
+        kind, args = server.job_args(dict(SPEC, seed=3, integrator='ou', exit_times=True))
+        self.assertEqual(kind, 'first_passage')
+        self.assertEqual((args['seed'], args['integrator'], args['runs']), (3, 'ou', 40))
+        self.assertTrue(args['no_cache'])
+        self.assertTrue(args['exit_times'])
+        for spec in (dict(SPEC, kind='movie'), dict(SPEC, integrator='rk4'), \
+                     dict(SPEC, unknown=1), {'runs': 3}, [SPEC], \
+                     # clients cannot choose where the server reads and writes
+                     dict(SPEC, path='/tmp'), dict(SPEC, cache_dir='/tmp'), \
+                     dict(SPEC, potential='tabulated:file=/etc/passwd')):
+            with self.assertRaises(ValueError):
+                server.job_args(spec)
+
+    def test_warm_worker(self):
+        with mock.patch('lds.first_passage.first_passage') as first_passage:
+            server._warm_worker()
+        schemes = set(call[1]['scheme'] for call in first_passage.call_args_list)
+        self.assertEqual(schemes, set(server.SCHEMES))
+        self.assertTrue(any(call[1].get('max_time_step') for call in first_passage.call_args_list))
+
+    def test_same_as_command_line(self):
+        spec = dict(SPEC, seed=5, exit_times=True)
+        expected = simulator.histogram_runs(server.job_args(spec)[1])
+
+        async def submit():
+            jobs = server.JobServer(workers=1, warm=False)
+            try:
+                return await jobs.submit(spec)
+            finally:
+                await jobs.close()
+        result = asyncio.run(submit())
+        np.testing.assert_array_equal(result['exit_times'], expected.exit_times)
+        self.assertEqual(result['exited'], int(np.sum(~expected.censored)))
+        self.assertAlmostEqual(result['mean_exit_time'], expected.mean)
+
+    def test_batching(self):
+        async def submit():
+            jobs = server.JobServer(workers=1, batch_delay=0.05, batch_runs=100, warm=False)
+            try:
+                return await asyncio.gather(*[jobs.submit(dict(SPEC, runs=runs)) \
+                                              for runs in (10, 20, 30, 50)] + \
+                                            [jobs.submit(dict(SPEC, seed=1))])
+            finally:
+                await jobs.close()
+        with mock.patch.object(server, 'run_jobs', wraps=server.run_jobs) as run_jobs:
+            results = asyncio.run(submit())
+        self.assertEqual([result['runs'] for result in results], [10, 20, 30, 50, 40])
+        # up to 100 unseeded runs share an ensemble, seeded jobs run alone
+        self.assertEqual(sorted(len(call[0][1]) for call in run_jobs.call_args_list), \
+                         [1, 1, 3])
+
+    def test_close_cancels_queued_jobs(self):
+        release = threading.Event()
+
+        def blocking_jobs(kind, batch):
+            release.wait(10)
+            return [dict() for _ in batch]
+
+        async def submit():
+            jobs = server.JobServer(workers=1, batch_delay=0, warm=False)
+            # seeded jobs run alone, the second waits for the first
+            tasks = [asyncio.ensure_future(jobs.submit(dict(SPEC, seed=seed))) \
+                     for seed in (1, 2)]
+            while len(jobs._pending) < 2:
+                await asyncio.sleep(0.001)
+            pending = list(jobs._pending)
+            await jobs.close()
+            release.set()
+            for task in tasks:
+                task.cancel()
+            return pending
+        with mock.patch.object(server, 'run_jobs', blocking_jobs):
+            pending = asyncio.run(submit())
+        self.assertEqual(sorted(future.cancelled() for future in pending), [False, True])
+
+    def test_http(self):
+        async def exchange():
+            jobs = server.JobServer(workers=1, warm=False)
+            listener = await jobs.start(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            try:
+                health = await request(port, 'GET', '/health')
+                streamed = await request(port, 'POST', '/jobs', \
+                    [SPEC, dict(SPEC, kind='trajectory', seed=2, record_every=10), \
+                     dict(SPEC, temperature='hot')])
+                missing = await request(port, 'GET', '/nothing')
+            finally:
+                listener.close()
+                await jobs.close()
+            return health, streamed, missing
+        health, streamed, missing = asyncio.run(exchange())
+        self.assertEqual(health[0], 200)
+        self.assertEqual(health[1][0]['status'], 'ok')
+        self.assertEqual(missing[0], 404)
+        status, lines = streamed
+        self.assertEqual(status, 200)
+        lines = dict((line['job'], line) for line in lines)
+        self.assertEqual(sorted(lines), [0, 1, 2])
+        self.assertEqual(lines[0]['result']['runs'], 40)
+        self.assertEqual(lines[1]['status'], 'done')
+        self.assertEqual(lines[1]['result']['index'][:3], [0, 10, 20])
+        self.assertEqual(lines[2]['status'], 'error')
+        self.assertIn('temperature', lines[2]['error'])
+
+    @unittest.skipUnless(hasattr(asyncio, 'start_unix_server'), 'no Unix sockets')
+    def test_unix_socket(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'lds.sock')
+
+        async def exchange():
+            jobs = server.JobServer(workers=1, warm=False)
+            listener = await jobs.start(path=path)
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+                body = json.dumps(SPEC).encode('utf-8')
+                writer.write('POST /jobs HTTP/1.1\r\nContent-Length: {0}\r\n\r\n'\
+                             .format(len(body)).encode('latin-1') + body)
+                answer = await reader.read()
+                writer.close()
+                await writer.wait_closed()
+            finally:
+                listener.close()
+                await listener.wait_closed()
+                await jobs.close()
+            return answer.decode('utf-8')
+        try:
+            answer = asyncio.run(exchange())
+        finally:
+            shutil.rmtree(directory)
+        line = json.loads(answer.partition('\r\n\r\n')[2])
+        self.assertEqual(line['result']['runs'], 40)
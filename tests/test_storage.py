@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.storage` module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import lds.storage as storage
+import lds.langevin_dynamics_simulator as simulator
+from lds.noise import NoiseSource
+
+
+class Test_Storage(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'output.npy')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        traj = simulator.euler_trajectory(1, 0, 20, 0.01, 1, 2.5, 5, \
+                                          noise=NoiseSource(1, 1, seed=1))
+        storage.write_binary(traj, self.path)
+        columns = storage.read_binary(self.path)
+        self.assertIsInstance(columns['position'], np.memmap)
+        np.testing.assert_array_equal(columns['index'], traj.index)
+        np.testing.assert_array_equal(columns['time'], traj.time)
+        np.testing.assert_array_equal(columns['position'], traj.position)
+        np.testing.assert_array_equal(columns['velocity'], traj.velocity)
+        # the file is a plain .npy file as well
+        self.assertEqual(np.load(self.path).shape, (len(traj), 4))
+
+    def test_streamed_chunks(self):
+        chunks = list(simulator.stream_integrator(1, 0, 20, 0.01, 1, 2.5, 5, \
+                      noise=NoiseSource(1, 1, seed=2), chunk_size=50, record_every=3))
+        with storage.BinaryWriter(self.path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+        columns = storage.read_binary(self.path)
+        np.testing.assert_array_equal(columns['index'], \
+                                      np.concatenate([c.index for c in chunks]))
+        np.testing.assert_array_equal(columns['position'], \
+                                      np.concatenate([c.position for c in chunks]))
+
+    def test_empty_and_invalid(self):
+        storage.BinaryWriter(self.path).close()
+        self.assertEqual(storage.read_binary(self.path)['time'].size, 0)
+        with open(self.path, 'w') as file:
+            file.write('0 0.00 0.000000 0.000000\n')
+        with self.assertRaises(ValueError):
+            storage.read_binary(self.path)
+
+    def test_resume(self):
+        chunks = list(simulator.stream_integrator(1, 0, 20, 0.01, 1, 2.5, 5, \
+                      noise=NoiseSource(1, 1, seed=4), chunk_size=300))
+        with storage.BinaryWriter(self.path) as writer:
+            writer.write(chunks[0])
+            writer.flush()
+            # a flushed file is readable while it is still written
+            self.assertEqual(len(storage.read_binary(self.path)['index']), len(chunks[0]))
+            size = writer.tell()
+            writer.write(chunks[1]) # lost by the interruption
+        with storage.BinaryWriter(self.path, size) as writer:
+            for chunk in chunks[1:]:
+                writer.write(chunk)
+        columns = storage.read_binary(self.path)
+        np.testing.assert_array_equal(columns['position'], \
+                                      np.concatenate([c.position for c in chunks]))
+
+    def test_binary_not_compressed(self):
+        options = ['-x0', '2', '-v0', '0', '-temp', '1', '-dc', '1', '-ts', '0.1', \
+                   '-tt', '1', '-ws', '5', '-f', 'binary']
+        self.assertEqual(simulator.parse_args(options)['format'], 'binary')
+        with self.assertRaises(SystemExit):
+            simulator.parse_args(options + ['-z', 'gzip'])
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.sweep` module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    # python 3.4+ should use builtin unittest.mock not mock package
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+import lds.sweep as sweep
+
+
+class Test_Sweep(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, 'sweep.csv')
+        self.grid = {'temperature': [1, 2], 'damping_coefficient': [1], \
+                     'wall_size': [5], 'time_step': [0.1]}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parse_args(self):
+        args = sweep.parse_args(['-x0', '2.5', '-v0', '0', '-tt', '10', \
+               '-temp', '1', '2', '-dc', '1', '-ws', '5', '-ts', '0.1', '0.01', \
+               '-w', '3'])
+        self.assertEqual(args['temperature'], [1, 2])
+        self.assertEqual(args['time_step'], [0.1, 0.01])
+        self.assertEqual(args['workers'], 3)
+
+    def test_parameter_grid(self):
+        points = sweep.parameter_grid(self.grid)
+        self.assertEqual(len(points), 2)
+        self.assertEqual(points[1]['temperature'], 2)
+
+    def test_sweep_and_resume(self):
+        rows = sweep.sweep(self.grid, 0, 2.5, 50, runs=200, workers=1, \
+                           seed=1, output=self.output)
+        self.assertEqual(len(rows), 2)
+        for row in rows:
+            self.assertEqual(row['exited'], row['exit_low'] + row['exit_high'])
+        # points already in the table are not run again
+        self.grid['temperature'].append(3)
+        with mock.patch.object(sweep, 'run_point', wraps=sweep.run_point) as run_point:
+            rows_again = sweep.sweep(self.grid, 0, 2.5, 50, runs=200, workers=1, \
+                                     output=self.output)
+            self.assertEqual(run_point.call_count, 1)
+        self.assertEqual(len(rows_again), 3)
+        self.assertEqual(rows_again[0]['mean_exit_time'], rows[0]['mean_exit_time'])
+        self.assertEqual(rows_again[2]['seed'], 1) # seed read back from the table
+        self.assertEqual(len(sweep.read_results(self.output)), 3)
+
+    def test_resume_other_parameters(self):
+        sweep.sweep(self.grid, 0, 2.5, 50, runs=100, workers=1, seed=1, output=self.output)
+        # points run with other fixed parameters are not reused
+        with mock.patch.object(sweep, 'run_point', wraps=sweep.run_point) as run_point:
+            rows = sweep.sweep(self.grid, 0, 2.5, 50, runs=200, workers=1, \
+                               output=self.output)
+            self.assertEqual(run_point.call_count, 2)
+            sweep.sweep(self.grid, 0, 2.5, 50, runs=100, workers=1, seed=1, \
+                        scheme='baoab', output=self.output)
+            self.assertEqual(run_point.call_count, 4)
+        self.assertEqual([row['runs'] for row in rows], [200, 200])
+        self.assertEqual(len(sweep.read_results(self.output)), 6)
+
+    def test_process_pool(self):
+        serial = sweep.sweep(self.grid, 0, 2.5, 50, runs=100, workers=1, seed=2)
+        parallel = sweep.sweep(self.grid, 0, 2.5, 50, runs=100, workers=2, seed=2)
+        # each point has its own stream, whatever the worker
+        self.assertEqual(serial, parallel)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.system` module."""
+
+import unittest
+
+import numpy as np
+
+import lds.system as system
+from lds.noise import NoiseSource
+from lds.potentials import HarmonicPotential
+
+
+def direct_forces(positions, box, pair_potential, periodic):
+    """O(N^2) pair forces, for reference."""
+    separation = positions[:, None] - positions[None]
+    if periodic:
+        separation -= box * np.round(separation / box)
+    distance = np.sqrt(np.sum(separation ** 2, axis=-1))
+    np.fill_diagonal(distance, np.inf)
+    close = distance < pair_potential.cutoff
+    magnitude = np.zeros_like(distance)
+    magnitude[close] = pair_potential.force(distance[close]) / distance[close]
+    return np.sum(separation * magnitude[..., None], axis=1)
+
+
+class Test_System(unittest.TestCase):
+    def test_cell_list_pairs(self):
+        generator = np.random.default_rng(31)
+        for dimensions in (1, 2, 3):
+            for periodic in (False, True):
+                positions = generator.uniform(0, 10, (300, dimensions))
+                first, second = system.cell_list_pairs(positions, 10, 1.3, periodic)
+                found = set(zip(np.minimum(first, second), np.maximum(first, second)))
+                self.assertEqual(len(found), first.size) # each pair once
+                separation = positions[:, None] - positions[None]
+                if periodic:
+                    separation -= 10 * np.round(separation / 10)
+                close = np.sum(separation ** 2, axis=-1) < 1.3 ** 2
+                expected = set(zip(*np.nonzero(np.triu(close, 1))))
+                self.assertTrue(expected <= found)
+
+    def test_pair_forces(self):
+        generator = np.random.default_rng(32)
+        positions = generator.uniform(0, 8, (200, 2))
+        for pair_potential in (system.SoftSphere(5, 1.0), system.LennardJones(1, 0.4)):
+            for periodic in (False, True):
+                np.testing.assert_allclose(
+                    system.pair_forces(positions, 8, pair_potential, periodic),
+                    direct_forces(positions, 8, pair_potential, periodic), atol=1e-9)
+
+    def test_lennard_jones(self):
+        lj = system.LennardJones(2, 1)
+        r = np.linspace(0.9, 2.4, 20)
+        h = 1e-6
+        np.testing.assert_allclose(lj.force(r), \
+            -(lj.energy(r + h) - lj.energy(r - h)) / (2 * h), rtol=1e-5, atol=1e-6)
+        self.assertAlmostEqual(float(lj.energy(lj.cutoff)), 0)
+
+    def test_reflecting_temperature(self):
+        particles = system.ParticleSystem.random(500, 2, wall=20, seed=33, \
+                    temperature=2, damping_coefficient=1, time_step=0.05, \
+                    pair_potential=system.SoftSphere(10, 0.5), \
+                    noise=NoiseSource(2, 1, seed=34))
+        particles.run(20)
+        self.assertTrue(particles.alive.all())
+        self.assertTrue(((particles.positions >= 0) & (particles.positions <= 20)).all())
+        self.assertAlmostEqual(np.mean(particles.velocities ** 2), 2, delta=0.2)
+
+    def test_periodic(self):
+        particles = system.ParticleSystem(np.full((100, 3), 4.9), \
+                    velocities=np.full((100, 3), 10.0), wall=5, boundary='periodic', \
+                    time_step=0.01, noise=NoiseSource(1, 1, seed=35))
+        particles.step(5)
+        self.assertTrue(((particles.positions >= 0) & (particles.positions <= 5)).all())
+        self.assertTrue(particles.alive.all())
+
+    def test_absorbing(self):
+        particles = system.ParticleSystem(np.linspace(0.5, 4.5, 50), wall=5, \
+                    boundary='absorbing', temperature=5, time_step=0.1, \
+                    noise=NoiseSource(5, 1, seed=36))
+        self.assertEqual(particles.dimensions, 1)
+        particles.run(200)
+        self.assertFalse(particles.alive.any())
+        positions = particles.positions[:, 0]
+        self.assertTrue(np.isin(positions, (0.0, 5.0)).all())
+        self.assertTrue((particles.exit_times > 0).all())
+
+    def test_mixed_boundaries(self):
+        particles = system.ParticleSystem.random(50, 2, wall=5, seed=37, \
+                    boundary=('periodic', 'reflecting'), \
+                    potential=HarmonicPotential(1, 2.5), noise=NoiseSource(1, 1, seed=38))
+        particles.run(1)
+        self.assertEqual(particles.boundary, ('periodic', 'reflecting'))
+        with self.assertRaises(ValueError):
+            system.ParticleSystem(np.zeros((3, 2)), boundary=('periodic',))
+        with self.assertRaises(ValueError):
+            system.ParticleSystem(np.zeros((3, 4)))
+
+    def test_reproducible(self):
+        runs = [system.ParticleSystem.random(64, 3, wall=4, seed=39, \
+                pair_potential=system.SoftSphere(), \
+                noise=NoiseSource(1, 1, seed=40)).run(1) for i in range(2)]
+        np.testing.assert_array_equal(runs[0].positions, runs[1].positions)
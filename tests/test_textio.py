@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.textio` module."""
+
+import gzip
+import io
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+
+import lds.textio as textio
+import lds.langevin_dynamics_simulator as simulator
+from lds.noise import NoiseSource
+
+
+def reference_lines(index, time, position, velocity):
+    return ''.join('{0} {1:.2f} {2:.6f} {3:.6f}\n'.format(*line) \
+                   for line in zip(index, time, position, velocity))
+
+
+class Test_Textio(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'output')
+        self.traj = simulator.euler_trajectory(1, 0, 20, 0.01, 1, 2.5, 5, \
+                                               noise=NoiseSource(1, 1, seed=3))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_same_lines(self):
+        index = [0, 1, 2, 3, 4]
+        time = [0.0, 0.005, 0.015, 1e6, 2.675]
+        position = [-1.5, 1e-7, -0.0000005, float('nan'), 3]
+        velocity = [float('inf'), -2.0000005, 123456.7890125, 0, -0.0]
+        self.assertEqual(textio.format_lines(index, time, position, velocity), \
+                         reference_lines(index, time, position, velocity))
+
+    def test_blocks(self):
+        traj = self.traj
+        expected = reference_lines(traj.index, traj.time, traj.position, traj.velocity)
+        for block_lines in (1, 7, len(traj), 10 * len(traj)):
+            file = io.StringIO()
+            written = textio.write_lines(traj.index, traj.time, traj.position, \
+                                         traj.velocity, file, block_lines)
+            self.assertEqual(file.getvalue(), expected)
+            self.assertEqual(written, len(expected))
+        file = io.StringIO()
+        simulator.output_file(traj, file)
+        self.assertEqual(file.getvalue(), expected)
+
+    def test_gzip(self):
+        with textio.open_text(self.path, 'gzip') as file:
+            simulator.output_file(self.traj, file)
+        with gzip.open(self.path + '.gz', 'rt') as file:
+            lines = file.read()
+        traj = self.traj
+        self.assertEqual(lines, reference_lines(traj.index, traj.time, \
+                                                traj.position, traj.velocity))
+
+    @unittest.skipUnless(importlib.util.find_spec('zstandard'), 'zstandard not installed')
+    def test_zstd(self):
+        import zstandard
+        with textio.open_text(self.path, 'zstd') as file:
+            simulator.output_file(self.traj, file)
+        with open(self.path + '.zst', 'rb') as file:
+            reader = zstandard.ZstdDecompressor().stream_reader(file)
+            lines = io.TextIOWrapper(reader, encoding='ascii').read()
+        traj = self.traj
+        self.assertEqual(lines, reference_lines(traj.index, traj.time, \
+                                                traj.position, traj.velocity))
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            textio.open_text(self.path, 'bzip2')
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.trajectory` module."""
+
+import unittest
+from io import StringIO
+
+import numpy as np
+
+import lds.trajectory as trajectory
+import lds.langevin_dynamics_simulator as simulator
+
+
+class Test_Trajectory(unittest.TestCase):
+    def test_preallocated(self):
+        traj = trajectory.Trajectory(10, 0.5, 1.0, 2.0)
+        self.assertEqual(len(traj), 11)
+        self.assertEqual(traj.velocity.dtype, np.float64)
+        self.assertEqual(traj.velocity[0], 1.0)
+        self.assertEqual(traj.position[0], 2.0)
+        np.testing.assert_array_equal(traj.time, np.arange(11) * 0.5)
+
+    def test_trim(self):
+        traj = trajectory.Trajectory(10, 0.1)
+        traj.trim(4)
+        v, p, t = traj
+        self.assertEqual(len(v), 4)
+        self.assertEqual(len(p), 4)
+        self.assertAlmostEqual(t[-1], 0.3)
+
+    def test_tolist(self):
+        traj = trajectory.Trajectory(2, 1, 3.0, 4.0)
+        traj.velocity[1:] = 5.0
+        traj.position[1:] = 6.0
+        v, p, t = traj.tolist()
+        self.assertEqual(v, [3.0, 5.0, 5.0])
+        self.assertEqual(p, [4.0, 6.0, 6.0])
+        self.assertEqual(t, [0.0, 1.0, 2.0])
+
+    def test_euler_trajectory(self):
+        # deterministic drift hits the wall at the sixth step
+        traj = simulator.euler_trajectory(0, 1, 100, 1, 0, 0, 5)
+        self.assertEqual(len(traj), 7)
+        self.assertEqual(traj.position[-1], 5)
+        self.assertEqual(traj.time[-1], 6)
+
+    def test_output_file(self):
+        traj = simulator.euler_trajectory(0, 1, 3, 1, 0, 0, 5)
+        from_trajectory = StringIO()
+        simulator.output_file(traj, from_trajectory)
+        from_lists = StringIO()
+        simulator.output_file(*(traj.tolist() + (from_lists,)))
+        self.assertEqual(from_trajectory.getvalue(), from_lists.getvalue())
+        self.assertEqual(from_trajectory.getvalue().split('\n')[1], \
+                         '1 1.00 1.000000 1.000000')
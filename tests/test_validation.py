@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.validation` module."""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import lds.ensemble
+import lds.validation as validation
+
+
+class Test_Validation(unittest.TestCase):
+    def test_references(self):
+        # far in the diffusion limit, the classic results come back
+        self.assertLess(validation.milne_length(1e6, 1), 1e-5)
+        self.assertAlmostEqual(validation.diffusion_mfpt(1e6, 1, 1, 5), 1 * 4 / 2 * 1e6, \
+                               delta=10)
+        self.assertAlmostEqual(validation.exit_split(1e6, 1, 1, 5), 0.2, places=6)
+        self.assertAlmostEqual(validation.exit_split(10, 1, 2.5, 5), 0.5)
+        # the walls act further away with inertia
+        self.assertGreater(validation.diffusion_mfpt(1, 1, 1, 5), 1 * 4 / 2)
+
+    def test_check(self):
+        self.assertTrue(validation.check('x', 1.3, 1.0, 0.1)['passed'])
+        self.assertFalse(validation.check('x', 1.5, 1.0, 0.1)['passed'])
+        self.assertTrue(validation.check('x', 1.5, 1.0, 0.1, bias=0.1)['passed'])
+        rng = np.random.default_rng(101)
+        self.assertTrue(validation.velocity_check(rng.normal(0, 2, 10000), 4)['passed'])
+        self.assertFalse(validation.velocity_check(rng.normal(0, 2.2, 10000), 4)['passed'])
+
+    def test_run_cases(self):
+        results = validation.run_cases(['numpy'], scale=0.1)
+        self.assertEqual(sorted(results), sorted([
+            'trajectory[numpy,baoab]', 'ensemble[numpy,baoab]', 'first_passage[numpy,baoab]',
+            'trajectory[numpy,ou]', 'ensemble[numpy,ou]', 'first_passage[numpy,ou]',
+            'adaptive[ou]']))
+        for name, result in results.items():
+            self.assertTrue(result['passed'], (name, result['checks']))
+            self.assertGreater(result['steps_per_second'], 0)
+        self.assertEqual([c['statistic'] for c in results['first_passage[numpy,ou]']['checks']], \
+                         ['mfpt', 'exit_split'])
+        # fixed seeds, whatever cases run
+        name, parameters, function = next(validation.cases(['numpy'], ['ou'], 0.1))
+        self.assertEqual(validation.run_case(function, parameters)['checks'], \
+                         results[name]['checks'])
+        with self.assertRaises(ValueError):
+            list(validation.cases(schemes=['euler']))
+
+    def test_catches_wrong_noise(self):
+        coefficients = lds.ensemble.scheme_coefficients
+        def louder(*args):
+            a, c, d, e, g, h = coefficients(*args)
+            return a, 1.1 * c, d, e, g, h
+        name, parameters, function = [case for case in validation.cases(['numpy'], ['ou'], 0.1) \
+                                      if case[0] == 'ensemble[numpy,ou]'][0]
+        with mock.patch.object(lds.ensemble, 'scheme_coefficients', louder):
+            result = validation.run_case(function, parameters)
+        self.assertFalse(result['passed'])
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `lds.weighted_ensemble` module."""
+
+import unittest
+
+import numpy as np
+
+import lds.weighted_ensemble as we
+from lds.first_passage import first_passage
+from lds.noise import NoiseSource
+
+
+class Test_WeightedEnsemble(unittest.TestCase):
+    def test_resample(self):
+        weights = np.array([0.1, 0.4, 0.05, 0.3, 0.15])
+        bins = np.array([2, 0, 2, 0, 2])
+        expected = np.zeros(5)
+        offsets = (np.arange(1000) + 0.5) / 1000
+        for offset in offsets:
+            picked, new_weights = we.resample(weights, bins, 4, np.full(3, offset))
+            self.assertEqual(picked.size, 8)
+            # every bin keeps its walkers and its weight
+            np.testing.assert_array_equal(np.sort(bins[picked]), [0] * 4 + [2] * 4)
+            self.assertAlmostEqual(new_weights[bins[picked] == 0].sum(), 0.7)
+            self.assertAlmostEqual(new_weights[bins[picked] == 2].sum(), 0.3)
+            expected += np.bincount(picked, new_weights, minlength=5)
+        # each walker gets its own weight on average
+        np.testing.assert_allclose(expected / offsets.size, weights, atol=1e-3)
+
+    def test_result(self):
+        result = we.WeightedFirstPassageResult(np.array([3.0, 1.0, 2.0]), \
+                                               np.array([1, -1, 1], dtype=np.int8), \
+                                               np.array([0.1, 0.2, 0.1]), 0.6, 100)
+        self.assertAlmostEqual(result.exit_probability, 0.4)
+        self.assertAlmostEqual(result.mean, (0.2 * 1 + 0.1 * 2 + 0.1 * 3) / 0.4)
+        np.testing.assert_allclose(result.cdf([0.5, 1.0, 2.5, 10]), [0, 0.2, 0.3, 0.4])
+        np.testing.assert_array_equal(result.quantiles([0.5, 0.6, 1.0]), [1.0, 2.0, 3.0])
+        np.testing.assert_allclose(result.side_fractions(), (0.2, 0.2, 0.6))
+
+    def test_unbiased(self):
+        # exits within total_time are rare, about one run in eleven
+        runs = 20000
+        reference = first_passage(1, 0, 5, 0.01, 0.3, 2.5, 5, runs=runs, \
+                                  noise=NoiseSource(0.3, 1, seed=81), scheme='ou')
+        expected = np.mean(~reference.censored)
+        estimates = list()
+        steps = 0
+        for seed in range(20):
+            result = we.weighted_ensemble(1, 0, 5, 0.01, 0.3, 2.5, 5, resample_every=20, \
+                                          noise=NoiseSource(0.3, 1, seed=seed), scheme='ou')
+            self.assertAlmostEqual(result.exit_probability + result.survival, 1.0)
+            estimates.append(result.exit_probability)
+            steps += result.steps
+        error = np.hypot(np.std(estimates) / np.sqrt(len(estimates)), \
+                         np.sqrt(expected * (1 - expected) / runs))
+        self.assertLess(abs(np.mean(estimates) - expected), 4 * error)
+        self.assertLess(steps, runs * 500 / 2)
+
+    def test_rare(self):
+        result = we.weighted_ensemble(1, 0, 5, 0.01, 0.05, 2.5, 5, resample_every=20, \
+                                      noise=NoiseSource(0.05, 1, seed=82), scheme='ou')
+        # far below one over the number of walkers
+        self.assertGreater(result.exit_probability, 0)
+        self.assertLess(result.exit_probability, 1e-4)
+        cdf = result.cdf(np.linspace(0, 5, 11))
+        self.assertTrue(np.all(np.diff(cdf) >= 0))
+        self.assertAlmostEqual(cdf[-1], result.exit_probability)
+        again = we.weighted_ensemble(1, 0, 5, 0.01, 0.05, 2.5, 5, resample_every=20, \
+                                     noise=NoiseSource(0.05, 1, seed=82), scheme='ou')
+        np.testing.assert_array_equal(result.exit_times, again.exit_times)
+        np.testing.assert_array_equal(result.weights, again.weights)